@@ -0,0 +1,188 @@
+"""
+ASGIでの起動（main.py と同じエンドポイント）
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 2
+
+計算（Flaskのエンドポイント）は同期のまま計算用のスレッドで実行し、イベントループは
+リクエストの受信・応答の送信と、応答後のI/O（deferred_io.defer_io で登録された
+Google Sheetsへの保存など）の待機だけを行う。I/OはI/O用のスレッドプールで並行に実行するため、
+ストレージの遅延があっても計算用のスレッドは次のリクエストを処理できる。
+
+ワーカーモデルの詳細とWSGI（gunicorn）との比較は docs/serving.md を参照。
+"""
+
+import asyncio
+import contextvars
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from main import app as flask_app
+from deferred_io import DEFERRED_IO_KEY, run_deferred
+
+# 計算用のスレッド数（計算はGILを保持するため、1プロセスあたり1で十分）
+COMPUTE_THREADS = int(os.getenv('ASGI_COMPUTE_THREADS', 1))
+
+# I/O用のスレッド数（同時に待機できるI/Oの数）
+IO_THREADS = int(os.getenv('ASGI_IO_THREADS', 32))
+
+# リクエストボディをメモリに保持する上限（超えた分は一時ファイルに書き出す）
+BODY_SPOOL_BYTES = 1024 * 1024
+
+
+def _next_chunk(iterator: Iterator[bytes]) -> Optional[bytes]:
+    """WSGIのレスポンスの次のチャンク（終わりはNone）"""
+    return next(iterator, None)
+
+
+class AsgiBridge:
+    """WSGIアプリケーション（Flask）をASGIで提供するクラス"""
+
+    def __init__(
+        self,
+        wsgi_app: Callable,
+        compute_threads: int = COMPUTE_THREADS,
+        io_threads: int = IO_THREADS
+    ):
+        """
+        初期化
+
+        Args:
+            wsgi_app: WSGIアプリケーション
+            compute_threads: 計算用のスレッド数
+            io_threads: I/O用のスレッド数
+        """
+        self.wsgi_app = wsgi_app
+        self._compute = ThreadPoolExecutor(max_workers=compute_threads, thread_name_prefix='compute')
+        self._io = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix='io')
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        """ASGIのエントリーポイント"""
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        """起動・終了（終了時は実行中のI/Oを待つ）"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.to_thread(self.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self) -> None:
+        """スレッドプールを終了（実行中の計算・I/Oは完了を待つ）"""
+        self._compute.shutdown(wait=True)
+        self._io.shutdown(wait=True)
+
+    async def _http(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        """HTTPリクエストを計算用のスレッドで処理し、応答後のI/Oを並行に実行"""
+        loop = asyncio.get_running_loop()
+        body = await self._read_body(receive)
+
+        tasks: List[Callable[[], object]] = []
+        environ = self._environ(scope, body)
+        environ[DEFERRED_IO_KEY] = tasks
+
+        response = {}
+
+        # 計算の各段階（呼び出し・チャンクの取得・close）は同じコンテキストで実行する
+        # （ストリーミングのジェネレーターが保持するFlaskのコンテキストを、スレッドを跨いで参照するため）
+        context = contextvars.copy_context()
+
+        def compute(func, *args):
+            return loop.run_in_executor(self._compute, context.run, func, *args)
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+            ]
+            return self._write_not_supported
+
+        try:
+            iterable = await compute(self.wsgi_app, environ, start_response)
+            try:
+                iterator = iter(iterable)
+                started = False
+                while True:
+                    chunk = await compute(_next_chunk, iterator)
+                    if not started and (chunk is not None or 'status' in response):
+                        await send({'type': 'http.response.start', 'status': response['status'],
+                                    'headers': response['headers']})
+                        started = True
+                    if chunk is None:
+                        break
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            finally:
+                if hasattr(iterable, 'close'):
+                    await compute(iterable.close)
+        finally:
+            body.close()
+
+        # 応答後のI/O（計算用のスレッドを塞がずに並行して待つ）
+        if tasks:
+            await asyncio.gather(*(loop.run_in_executor(self._io, run_deferred, task) for task in tasks))
+
+    @staticmethod
+    def _write_not_supported(data: bytes) -> None:
+        raise NotImplementedError("start_response の write() には対応していません")
+
+    @staticmethod
+    async def _read_body(receive: Callable) -> tempfile.SpooledTemporaryFile:
+        """リクエストボディを読み込む（大きいボディは一時ファイルに書き出す）"""
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_BYTES)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    @staticmethod
+    def _environ(scope: Dict[str, Any], body) -> Dict[str, Any]:
+        """ASGIのscopeからWSGIのenvironを作る（PEP 3333）"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.input_terminated': True,  # ボディは全て読み込み済み（Content-Lengthがなくても読める）
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[name] = value
+                continue
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+
+# uvicorn asgi:app で起動するアプリケーション
+app = AsgiBridge(flask_app)
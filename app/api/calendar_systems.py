@@ -0,0 +1,352 @@
+"""
+暦法レジストリモジュール
+
+Kin番号の計算方式（暦法）を名前で登録し、同じ日付を複数の方式で引けるようにする。
+各方式は対象期間（1900〜2100年）の全日付のKin番号の配列を初回参照時に用意し、
+以降の参照は配列の添字アクセスのみで済む。配列はKin換算表ファイル（kin_table.bin）があれば
+mmapしたファイルをそのまま参照し、なければ一括計算する。対象期間外の日付は都度計算する。
+
+Kin換算表ファイルの生成:
+    python calendar_systems.py [出力先のパス]
+
+分析結果（analysis）は KIN_TABLE の行を共有する。ガイド・類似・反対・神秘のKinはDreamspellの
+オラクルのため、古典マヤ暦（GMT相関）の方式は Kin・紋章・音・ウェイブスペルだけを返す。
+
+iter_calendar は期間内の日付ごとのKin番号・太陽の紋章・銀河の音・日柱を、
+一定の日数ずつ配列で計算しながら1行ずつ返す（長い期間でもメモリ使用量は一定）。
+
+登録済みの方式:
+    "dreamspell": 13の月暦（1987年7月26日 = Kin 1、2月29日を数えない）
+    "gmt584283": 古典マヤ暦（GMT相関 584283）
+    "gmt584285": 古典マヤ暦（GMT相関 584285、天文学的相関）
+    "table": マヤ暦表のCSV（1962年1月1日 = Kin 63、2月29日も1日と数える）
+    "plain": 1987年7月26日 = Kin 1 から2月29日も1日と数える方式（maya.py）
+"""
+
+import numpy as np
+from datetime import datetime, date
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from maya_improved import (
+    GMT_CORRELATION,
+    KIN_TABLE,
+    MAYA_BASE_DATE,
+    calculate_kin_batch,
+    KIN_TABLE_PATH,
+    SOLAR_SEALS,
+    date_to_jdn_array,
+    get_kin_table_file,
+    write_kin_table_file,
+)
+
+if TYPE_CHECKING:
+    from suanming import SuanmingCalculator
+
+# 配列を保持する対象期間
+CALENDAR_START = date(1900, 1, 1)
+CALENDAR_END = date(2100, 12, 31)
+
+# マヤ暦表（CSV）の基準日とKin番号
+TABLE_BASE_DATE = date(1962, 1, 1)
+TABLE_BASE_KIN = 63
+
+DEFAULT_CALENDAR_SYSTEM = "dreamspell"
+
+# Kin換算表ファイルの配列を計算結果と照合する間隔（日）
+KIN_TABLE_CHECK_STRIDE = 997
+
+# iter_calendar で一度に計算する日数
+CALENDAR_CHUNK_DAYS = 366
+
+# Dreamspellのオラクルを持たない方式の分析結果の項目（analyze_maya_classical と同じ）
+CLASSICAL_FIELDS = ("kin", "solar_seal", "tone", "wavespell")
+
+
+class CalendarSystem:
+    """Kin番号の計算方式"""
+
+    def __init__(
+        self,
+        name: str,
+        label: str,
+        kin_function: Callable[[np.ndarray], np.ndarray],
+        oracle: bool = True
+    ):
+        """
+        初期化
+
+        Args:
+            name: 方式名（APIで指定する名前）
+            label: 分析結果の "system" に入れる表示名
+            kin_function: date.toordinal() の整数序数の配列からKin番号（1-260）の配列を計算する関数
+            oracle: 分析結果にDreamspellのオラクル（ガイド・類似・反対・神秘）を含めるか
+        """
+        self.name = name
+        self.label = label
+        self.oracle = oracle
+        self._kin_function = kin_function
+        self._kin_array: Optional[np.ndarray] = None
+
+        # Kin番号ごとの分析結果（初回参照時に作成し、読み取り専用の行を共有する）
+        self._rows: Optional[Tuple[Mapping, ...]] = None
+
+    def kin_array(self) -> np.ndarray:
+        """対象期間の全日付のKin番号（uint16、CALENDAR_START からの日数が添字）"""
+        if self._kin_array is None:
+            kin = self._load_kin_array()
+            if kin is None:
+                ordinals = np.arange(CALENDAR_START.toordinal(), CALENDAR_END.toordinal() + 1, dtype=np.int64)
+                kin = self._kin_function(ordinals).astype(np.uint16)
+                kin.flags.writeable = False
+            self._kin_array = kin
+        return self._kin_array
+
+    def _load_kin_array(self) -> Optional[np.ndarray]:
+        """
+        Kin換算表ファイルから対象期間の配列を取得
+
+        計算方式とファイルの食い違いを避けるため、一定間隔の日付と期間の両端を計算結果と照合する。
+
+        Returns:
+            ファイルを参照する配列（ファイルがない・未収録・照合で一致しない場合はNone）
+        """
+        table = get_kin_table_file()
+        kin = table.kin_array(self.name, CALENDAR_START, CALENDAR_END) if table is not None else None
+        if kin is None:
+            return None
+
+        offsets = np.append(np.arange(0, len(kin), KIN_TABLE_CHECK_STRIDE), len(kin) - 1)
+        if not (kin[offsets] == self._kin_function(offsets + CALENDAR_START.toordinal())).all():
+            return None
+        return kin
+
+    def kin_batch(self, ordinals) -> np.ndarray:
+        """
+        日付の配列からKin番号を一括取得
+
+        Args:
+            ordinals: date.toordinal() の整数序数の配列
+
+        Returns:
+            Kin番号（1-260）の配列（uint16）
+        """
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        offsets = ordinals - CALENDAR_START.toordinal()
+        kin = self.kin_array()
+        if offsets.size and offsets.min() >= 0 and offsets.max() < len(kin):
+            return kin[offsets]
+        return self._kin_function(ordinals).astype(np.uint16)
+
+    def kin(self, birthdate: str) -> int:
+        """
+        生年月日からKin番号を取得
+
+        Args:
+            birthdate: 生年月日（YYYY-MM-DD形式）
+
+        Returns:
+            Kin番号（1-260）
+        """
+        ordinal = datetime.strptime(birthdate, "%Y-%m-%d").toordinal()
+        offset = ordinal - CALENDAR_START.toordinal()
+        kin = self.kin_array()
+        if 0 <= offset < len(kin):
+            return int(kin[offset])
+        return int(self._kin_function(np.array([ordinal], dtype=np.int64))[0])
+
+    def analyze(self, birthdate: str) -> Mapping:
+        """
+        マヤ暦の総合分析（maya_improved.analyze_maya と同じ項目）
+
+        Args:
+            birthdate: 生年月日（YYYY-MM-DD形式）
+
+        Returns:
+            マヤ暦の分析結果（読み取り専用。"system" はこの方式の表示名。
+            oracle=False の方式は CLASSICAL_FIELDS と "system" のみ）
+        """
+        return self.analysis(self.kin(birthdate))
+
+    def analysis(self, kin: int) -> Mapping:
+        """
+        Kin番号の分析結果（analyze の結果。kin_batch と組み合わせて一括分析に使う）
+
+        Args:
+            kin: Kin番号（1-260）
+
+        Returns:
+            マヤ暦の分析結果（全リクエストで共有する読み取り専用の行。変更する場合は dict() でコピーする）
+        """
+        rows = self._rows
+        if rows is None:
+            # KIN_TABLE の表示名を差し替えた行（オラクルを持たない方式は項目を絞る）
+            fields = KIN_TABLE[0].keys() if self.oracle else CLASSICAL_FIELDS
+            rows = self._rows = tuple(
+                MappingProxyType({**{field: row[field] for field in fields}, "system": self.label})
+                for row in KIN_TABLE
+            )
+        return rows[kin - 1]
+
+
+def _correlation_kin(correlation: int) -> Callable[[np.ndarray], np.ndarray]:
+    """GMT相関（ロングカウント起点のJDN）からKin番号を計算する関数"""
+    def kin_function(ordinals: np.ndarray) -> np.ndarray:
+        return (date_to_jdn_array(ordinals) - correlation) % 260 + 1
+    return kin_function
+
+
+def _plain_kin(base_date: date, base_kin: int) -> Callable[[np.ndarray], np.ndarray]:
+    """基準日のKin番号から、2月29日も1日と数えてKin番号を計算する関数"""
+    def kin_function(ordinals: np.ndarray) -> np.ndarray:
+        return (ordinals - base_date.toordinal() + base_kin - 1) % 260 + 1
+    return kin_function
+
+
+# 登録済みの方式
+CALENDAR_SYSTEMS: Dict[str, CalendarSystem] = {}
+
+
+def register_calendar_system(system: CalendarSystem) -> None:
+    """
+    方式を登録（同名の方式は置き換える）
+
+    Args:
+        system: 登録する方式
+    """
+    CALENDAR_SYSTEMS[system.name] = system
+
+
+def get_calendar_system(name: str = DEFAULT_CALENDAR_SYSTEM) -> CalendarSystem:
+    """
+    方式名から方式を取得
+
+    Args:
+        name: 方式名
+
+    Returns:
+        CalendarSystem
+
+    Raises:
+        ValueError: 未登録の方式の場合
+    """
+    system = CALENDAR_SYSTEMS.get(name) if isinstance(name, str) else None
+    if system is None:
+        raise ValueError(f"未対応の暦法です: {name}（{' / '.join(CALENDAR_SYSTEMS)}）")
+    return system
+
+
+def get_calendar_systems(names) -> List[CalendarSystem]:
+    """
+    方式名（またはそのリスト）から方式のリストを取得（重複は除く）
+
+    Args:
+        names: 方式名、または方式名のリスト
+
+    Returns:
+        CalendarSystem のリスト（指定順）
+
+    Raises:
+        ValueError: 未登録の方式、または空のリストの場合
+    """
+    if not isinstance(names, (list, tuple)):
+        names = [names]
+    if not names:
+        raise ValueError("暦法を1つ以上指定してください")
+    systems = []
+    for name in names:
+        system = get_calendar_system(name)
+        if system not in systems:
+            systems.append(system)
+    return systems
+
+
+register_calendar_system(CalendarSystem(
+    "dreamspell", KIN_TABLE[0]["system"], calculate_kin_batch))
+register_calendar_system(CalendarSystem(
+    "gmt584283", "Classical Maya (GMT Correlation)", _correlation_kin(GMT_CORRELATION),
+    oracle=False))
+register_calendar_system(CalendarSystem(
+    "gmt584285", "Classical Maya (GMT Correlation 584285)", _correlation_kin(584285),
+    oracle=False))
+register_calendar_system(CalendarSystem(
+    "table", "Maya Calendar Table (1962-01-01 = Kin 63)", _plain_kin(TABLE_BASE_DATE, TABLE_BASE_KIN)))
+register_calendar_system(CalendarSystem(
+    "plain", "Tzolkin Day Count (1987-07-26 = Kin 1)", _plain_kin(MAYA_BASE_DATE, 1)))
+
+
+def iter_calendar(
+    start: date,
+    end: date,
+    systems: Optional[List[CalendarSystem]] = None,
+    calculator: Optional["SuanmingCalculator"] = None,
+    chunk_days: int = CALENDAR_CHUNK_DAYS
+) -> Iterator[Dict[str, Any]]:
+    """
+    期間内の日付ごとのマヤ暦と日柱を1行ずつ返す
+
+    chunk_days 日ずつKin番号と日柱を配列で取得し、行に変換して返す。
+
+    Args:
+        start: 開始日
+        end: 終了日（この日を含む）
+        systems: 暦法のリスト（省略時はDreamspell方式のみ）
+        calculator: 日柱の名前に使う SuanmingCalculator（省略時は共有インスタンス）
+        chunk_days: 一度に計算する日数
+
+    Yields:
+        {
+            "date": "YYYY-MM-DD",
+            "kin", "solar_seal", "tone": 先頭の暦法の値,
+            "day_pillar": 日柱（例: "甲子"）,
+            "systems": {方式名: {"kin", "solar_seal", "tone"}} (暦法を複数指定した場合のみ)
+        }
+    """
+    # 日柱の計算は算命学モジュールを使う（maya.py など暦法だけを使うモジュールからは読み込まない）
+    from suanming import day_kanshi_indices, get_calculator
+
+    if systems is None:
+        systems = [get_calendar_system()]
+    if calculator is None:
+        calculator = get_calculator()
+    pillars = [gan + shi for gan, shi in calculator.ROKUJIKKANSHI]
+
+    for chunk_start in range(start.toordinal(), end.toordinal() + 1, chunk_days):
+        ordinals = np.arange(chunk_start, min(chunk_start + chunk_days, end.toordinal() + 1), dtype=np.int64)
+        kanshi = day_kanshi_indices(ordinals).tolist()
+        kins = [system.kin_batch(ordinals).tolist() for system in systems]
+
+        for i, ordinal in enumerate(ordinals.tolist()):
+            values = [{
+                "kin": kin[i],
+                "solar_seal": SOLAR_SEALS[(kin[i] - 1) % 20],
+                "tone": (kin[i] - 1) % 13 + 1
+            } for kin in kins]
+            row = {"date": date.fromordinal(ordinal).isoformat(), **values[0], "day_pillar": pillars[kanshi[i]]}
+            if len(systems) > 1:
+                row["systems"] = {system.name: value for system, value in zip(systems, values)}
+            yield row
+
+
+def build_kin_table_file(path=KIN_TABLE_PATH) -> int:
+    """
+    登録済みの全暦法の対象期間のKin番号をKin換算表ファイルに書き出す
+
+    Args:
+        path: 出力先のパス
+
+    Returns:
+        日数
+    """
+    ordinals = np.arange(CALENDAR_START.toordinal(), CALENDAR_END.toordinal() + 1, dtype=np.int64)
+    return write_kin_table_file(path, CALENDAR_START, {
+        name: system._kin_function(ordinals) for name, system in CALENDAR_SYSTEMS.items()
+    })
+
+
+if __name__ == "__main__":
+    import sys
+
+    output = sys.argv[1] if len(sys.argv) > 1 else KIN_TABLE_PATH
+    days = build_kin_table_file(output)
+    print(f"Kin換算表ファイルを生成しました: {output}（{len(CALENDAR_SYSTEMS)}方式 × {days}日）")
@@ -0,0 +1,222 @@
+"""
+命式検索インデックスモジュール
+
+期間内の全日付について、四柱の天干・地支、守護神・忌神、マヤ暦（Kin・太陽の紋章・銀河の音）
+ごとに該当日のビットマップ（numpy.packbits で8日/バイトに詰めたもの）を作成し、
+検索条件のビットマップの論理積で該当日を求める。
+
+命式は日付ごとに基準時刻（既定 12:00）で計算する。節入り当日の年柱・月柱、
+およびそれらに依存する守護神・忌神は基準時刻での値となる。時柱は基準時刻の値にしかならないため
+検索条件に含めない（未対応の検索条件としてエラーにする）。
+
+検索条件:
+    "year_gan" など干支の位置（年・月・日）ごとの天干・地支: "甲" または ["甲", "乙"]（いずれか）
+    "year_pillar" など柱（年・月・日）ごとの干支: "甲子" または ["甲子", "乙丑"]（いずれか）
+    "guardian_gods", "taboo_elements": "火" または ["火", "木"]（全てを含む）
+    "kin", "tone": 整数またはそのリスト（いずれか）
+    "solar_seal": 紋章名またはそのリスト（いずれか）
+"""
+
+import numpy as np
+from datetime import date
+from typing import Dict, List, Optional, Any
+
+from suanming import SuanmingCalculator, get_calculator
+from maya_improved import calculate_kin_batch, SOLAR_SEALS
+
+# インデックスの対象期間
+INDEX_START = date(1900, 1, 1)
+INDEX_END = date(2100, 12, 31)
+
+# 基準時刻（0時からの経過分）
+REFERENCE_MINUTES = 12 * 60
+
+# 検索できる干支の位置（analyze_batch のキー。時柱は基準時刻の値しか持たないため除く）
+PILLAR_POSITIONS = ("year", "month", "day")
+GAN_FIELDS = tuple(f"{position}_gan" for position in PILLAR_POSITIONS)
+SHI_FIELDS = tuple(f"{position}_shi" for position in PILLAR_POSITIONS)
+PILLAR_FIELDS = tuple(f"{position}_pillar" for position in PILLAR_POSITIONS)
+
+# 五行の集合で、指定した全ての五行を含む日を検索する条件
+ELEMENT_SET_FIELDS = ("guardian_gods", "taboo_elements")
+
+# マヤ暦の条件
+MAYA_FIELDS = ("kin", "solar_seal", "tone")
+
+SEARCH_FIELDS = GAN_FIELDS + SHI_FIELDS + PILLAR_FIELDS + ELEMENT_SET_FIELDS + MAYA_FIELDS
+
+
+def _as_list(value) -> List:
+    """単一値をリストに揃える"""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+class ChartIndex:
+    """命式の転置インデックス（日付ごとのビットマップ）"""
+
+    def __init__(
+        self,
+        calculator: Optional[SuanmingCalculator] = None,
+        start: date = INDEX_START,
+        end: date = INDEX_END,
+        reference_minutes: int = REFERENCE_MINUTES
+    ):
+        """
+        初期化（インデックスの構築）
+
+        Args:
+            calculator: 命式計算に使う SuanmingCalculator（省略時は共有インスタンス）
+            start: 対象期間の開始日
+            end: 対象期間の終了日
+            reference_minutes: 命式計算の基準時刻（0時からの経過分）
+        """
+        if calculator is None:
+            calculator = get_calculator()
+
+        self.start = start
+        self.end = end
+        self.reference_minutes = reference_minutes
+        self.days = end.toordinal() - start.toordinal() + 1
+
+        self._tenkan_index = {gan: i for i, gan in enumerate(calculator.TENKAN)}
+        self._chishi_index = {shi: i for i, shi in enumerate(calculator.CHISHI)}
+        self._element_index = {elem: i for i, elem in enumerate(calculator.FIVE_ELEMENTS)}
+        self._seal_index = {seal: i for i, seal in enumerate(SOLAR_SEALS)}
+
+        ordinals = np.arange(start.toordinal(), end.toordinal() + 1, dtype=np.int64)
+        batch = calculator.analyze_batch(ordinals, np.full(self.days, reference_minutes))
+        kin = calculate_kin_batch(ordinals).astype(np.int64) - 1
+
+        # 項目ごとのビットマップ (値の種類, 日数/8)
+        self._bitmaps: Dict[str, np.ndarray] = {}
+        for field in GAN_FIELDS:
+            self._bitmaps[field] = self._pack_values(batch[field], len(calculator.TENKAN))
+        for field in SHI_FIELDS:
+            self._bitmaps[field] = self._pack_values(batch[field], len(calculator.CHISHI))
+        for field in ELEMENT_SET_FIELDS:
+            self._bitmaps[field] = np.packbits(batch[field].T, axis=1)
+        self._bitmaps["kin"] = self._pack_values(kin, 260)
+        self._bitmaps["solar_seal"] = self._pack_values(kin % 20, 20)
+        self._bitmaps["tone"] = self._pack_values(kin % 13, 13)
+
+    def _pack_values(self, values: np.ndarray, size: int) -> np.ndarray:
+        """値ごとの該当日をビットマップにする"""
+        one_hot = np.zeros((size, self.days), dtype=bool)
+        one_hot[values, np.arange(self.days)] = True
+        return np.packbits(one_hot, axis=1)
+
+    def _value_indices(self, field: str, values) -> List[int]:
+        """検索条件の値をビットマップの行番号に変換"""
+        indices = []
+        for value in _as_list(values):
+            # bool は int のサブクラスのため明示的に除く（true が Kin 1 にならないように）
+            if not isinstance(value, (str, int)) or isinstance(value, bool):
+                raise ValueError(f"{field}の値が不正です: {value}")
+            if field in GAN_FIELDS:
+                index = self._tenkan_index.get(value)
+            elif field in SHI_FIELDS:
+                index = self._chishi_index.get(value)
+            elif field in ELEMENT_SET_FIELDS:
+                index = self._element_index.get(value)
+            elif field == "solar_seal":
+                index = self._seal_index.get(value)
+            elif field == "kin":
+                index = value - 1 if isinstance(value, int) and 1 <= value <= 260 else None
+            else:
+                index = value - 1 if isinstance(value, int) and 1 <= value <= 13 else None
+            if index is None:
+                raise ValueError(f"{field}の値が不正です: {value}")
+            indices.append(index)
+        return indices
+
+    def search(
+        self,
+        criteria: Dict[str, Any],
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        検索条件に一致する日付を検索
+
+        Args:
+            criteria: 検索条件（モジュールの説明を参照。項目間は全て満たす日を返す）
+            start: 検索期間の開始日（省略時はインデックスの開始日）
+            end: 検索期間の終了日（省略時はインデックスの終了日）
+            limit: 返す日付の最大件数（省略時は全件）
+
+        Returns:
+            {
+                "count": 該当件数,
+                "dates": [該当日（YYYY-MM-DD形式、昇順）],
+                "truncated": limitで打ち切ったか
+            }
+
+        Raises:
+            ValueError: 検索条件・期間が不正な場合
+        """
+        unknown = sorted(set(criteria) - set(SEARCH_FIELDS))
+        if unknown:
+            raise ValueError(f"未対応の検索条件です: {', '.join(unknown)}")
+
+        start = start or self.start
+        end = end or self.end
+        if start < self.start or end > self.end or start > end:
+            raise ValueError(
+                f"検索期間は{self.start.isoformat()}〜{self.end.isoformat()}の範囲で指定してください"
+            )
+
+        # 検索期間を含むバイトだけを演算する
+        first = start.toordinal() - self.start.toordinal()
+        last = end.toordinal() - self.start.toordinal()
+        byte_slice = slice(first // 8, last // 8 + 1)
+
+        result = np.full(byte_slice.stop - byte_slice.start, 0xFF, dtype=np.uint8)
+        for field, values in criteria.items():
+            if field in PILLAR_FIELDS:
+                position = field[:-len("_pillar")]
+                gan_bitmaps = self._bitmaps[f"{position}_gan"][:, byte_slice]
+                shi_bitmaps = self._bitmaps[f"{position}_shi"][:, byte_slice]
+                matched = np.zeros_like(result)
+                for pillar in _as_list(values):
+                    if not isinstance(pillar, str) or len(pillar) != 2:
+                        raise ValueError(f"{field}の値が不正です: {pillar}")
+                    gan, = self._value_indices(f"{position}_gan", pillar[0])
+                    shi, = self._value_indices(f"{position}_shi", pillar[1])
+                    matched |= gan_bitmaps[gan] & shi_bitmaps[shi]
+                result &= matched
+            elif field in ELEMENT_SET_FIELDS:
+                for index in self._value_indices(field, values):
+                    result &= self._bitmaps[field][index, byte_slice]
+            else:
+                result &= np.bitwise_or.reduce(
+                    self._bitmaps[field][self._value_indices(field, values), byte_slice], axis=0
+                )
+
+        offsets = np.flatnonzero(np.unpackbits(result)) + byte_slice.start * 8
+        offsets = offsets[(offsets >= first) & (offsets <= last)]
+
+        count = len(offsets)
+        if limit is not None:
+            offsets = offsets[:limit]
+
+        base = self.start.toordinal()
+        return {
+            "count": count,
+            "dates": [date.fromordinal(base + offset).isoformat() for offset in offsets.tolist()],
+            "truncated": count > len(offsets)
+        }
+
+
+# 共有インスタンス（初回の検索時に構築）
+_chart_index = None
+
+
+def get_chart_index() -> ChartIndex:
+    """命式検索インデックスを取得（プロセス内で共有）"""
+    global _chart_index
+    if _chart_index is None:
+        _chart_index = ChartIndex()
+    return _chart_index
@@ -0,0 +1,248 @@
+"""
+命式ストアモジュール
+
+1900〜2100年の全日付 × 12時支の命式を固定長レコードのバイナリファイルに
+事前計算し、mmapで参照する。レコードの位置は日付の序数と時支から
+直接計算できるため、参照はオフセット計算と1回のunpackのみで済む。
+ファイルはmmap（読み取り専用）で開くため、gunicornの各ワーカーは
+OSのページキャッシュを共有する。
+
+ファイル形式（リトルエンディアン）:
+    ヘッダー64バイト: マジック(8) + バージョン uint32 + レコード長 uint32
+                      + 開始日の序数 int32 + 日数 int32 + 生成元のSHA-256(32) + 予約(8)
+    レコード24バイト × 日数 × 12:
+        四柱の干支インデックス uint8 × 8
+        五行配点 uint16 × 5
+        守護神（優先順に 五行+1 を3ビットずつ詰めたもの） uint16
+        忌神・不足五行・過剰五行のビットマスク uint8 × 3
+        フラグ uint8（bit0: 節入り時刻を含む時支。分単位の計算が必要）
+
+ビルド手順:
+    python chart_store.py
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import numpy as np
+from datetime import date
+from pathlib import Path
+from typing import Optional, Tuple
+
+from sekki import SEKKI_TABLE_PATH, RISSHUN, JST_OFFSET_MINUTES
+
+# ストアファイルのパス
+CHART_STORE_PATH = Path(__file__).parent / "chart_store.bin"
+
+# 対象期間
+CHART_STORE_START = date(1900, 1, 1)
+CHART_STORE_END = date(2100, 12, 31)
+
+CHART_STORE_MAGIC = b"CHARTSTR"
+CHART_STORE_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIii32s8x")
+_RECORD = struct.Struct("<8B5HH3BB")
+
+# レコードのフラグ
+FLAG_SEKKI_BOUNDARY = 0x01
+
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# ビットマスク → 五行インデックスのタプル
+_MASK_ELEMENTS = tuple(tuple(i for i in range(5) if mask >> i & 1) for mask in range(32))
+
+
+def source_digest(knowledge_version: str) -> bytes:
+    """
+    ストアの生成元（ナレッジと節気テーブル）のSHA-256を計算
+
+    Args:
+        knowledge_version: ナレッジYAMLのSHA-256（16進）
+
+    Returns:
+        SHA-256ダイジェスト
+    """
+    digest = hashlib.sha256(knowledge_version.encode('ascii'))
+    with open(SEKKI_TABLE_PATH, 'rb') as f:
+        digest.update(f.read())
+    return digest.digest()
+
+
+def encode_order(elements: Tuple[int, ...]) -> int:
+    """五行インデックスの並びを uint16 に詰める（各要素 +1 を3ビットずつ）"""
+    code = 0
+    for shift, elem in enumerate(elements):
+        code |= (elem + 1) << (3 * shift)
+    return code
+
+
+def decode_order(code: int) -> Tuple[int, ...]:
+    """encode_order で詰めた uint16 を五行インデックスの並びに戻す"""
+    elements = []
+    while code:
+        elements.append((code & 7) - 1)
+        code >>= 3
+    return tuple(elements)
+
+
+class ChartStore:
+    """事前計算済み命式ストア（mmapで参照）"""
+
+    def __init__(self, path: Path = CHART_STORE_PATH, knowledge_version: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            path: ストアファイルのパス
+            knowledge_version: 照合するナレッジのSHA-256（16進、省略時は照合しない）
+
+        Raises:
+            ValueError: ファイル形式が不正、または生成元と一致しない場合
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"命式ストアの形式が不正です: {path}")
+        magic, version, record_size, self.start_ordinal, self.days, digest = _HEADER.unpack_from(self._mmap, 0)
+        if (magic != CHART_STORE_MAGIC or version != CHART_STORE_VERSION
+                or record_size != _RECORD.size
+                or len(self._mmap) != _HEADER.size + self.days * 12 * _RECORD.size):
+            raise ValueError(f"命式ストアの形式が不正です: {path}")
+        if knowledge_version is not None and digest != source_digest(knowledge_version):
+            raise ValueError(f"命式ストアがナレッジ・節気テーブルと一致しません: {path}")
+
+    def get(self, ordinal: int, hour_shi_index: int) -> Optional[Tuple]:
+        """
+        日付の序数と時支からレコードを取得
+
+        Args:
+            ordinal: 日付の序数（date.toordinal()）
+            hour_shi_index: 時支インデックス（子時=0 … 亥時=11）
+
+        Returns:
+            (pillars, scores, guardian_gods, taboo_elements, deficient, excess)
+            対象期間外、または節入り時刻を含む時支（分単位の計算が必要）の場合はNone
+        """
+        day = ordinal - self.start_ordinal
+        if day < 0 or day >= self.days:
+            return None
+
+        record = _RECORD.unpack_from(self._mmap, _HEADER.size + (day * 12 + hour_shi_index) * _RECORD.size)
+        if record[17] & FLAG_SEKKI_BOUNDARY:
+            return None
+
+        return (
+            record[0:8],
+            record[8:13],
+            decode_order(record[13]),
+            _MASK_ELEMENTS[record[14]],
+            _MASK_ELEMENTS[record[15]],
+            _MASK_ELEMENTS[record[16]],
+        )
+
+
+def build_chart_store(calculator, path: Path = CHART_STORE_PATH,
+                      start: date = CHART_STORE_START, end: date = CHART_STORE_END) -> int:
+    """
+    命式ストアを生成してファイルに保存
+
+    各時支の代表時刻（子時は0:00、それ以外は時支の開始時刻）で一括計算する。
+    節入り時刻を含む時支は分によって月柱・年柱が変わるため、フラグを立てて
+    参照時に通常計算させる。子時は0時台と23時台に分かれるため、節入りの日は常にフラグを立てる。
+
+    Args:
+        calculator: SuanmingCalculator
+        path: 出力先のパス
+        start: 開始日
+        end: 終了日
+
+    Returns:
+        書き込んだレコード数
+    """
+    days = end.toordinal() - start.toordinal() + 1
+    ordinals = np.repeat(np.arange(start.toordinal(), end.toordinal() + 1, dtype=np.int64), 12)
+    branches = np.tile(np.arange(12), days)
+    minutes = np.where(branches == 0, 0, (branches * 2 - 1) * 60)
+
+    batch = calculator.analyze_batch(ordinals, minutes)
+
+    weights = 1 << np.arange(5)
+    deficient = batch["deficient"] @ weights
+    excess = batch["excess"] @ weights
+    taboo = batch["taboo_elements"] @ weights
+
+    # 守護神の並びは不足・過剰五行の組で決まるため、組ごとに1度だけ求める
+    guardian = np.zeros(len(ordinals), dtype=np.uint16)
+    pairs = deficient * 32 + excess
+    for pair in np.unique(pairs):
+        scores = [0] * 5
+        for i in _MASK_ELEMENTS[pair // 32]:
+            scores[i] = -1
+        for i in _MASK_ELEMENTS[pair % 32]:
+            scores[i] = 1
+        guardian[pairs == pair] = encode_order(calculator._select_guardian_indices(tuple(scores))[0])
+
+    # 節入り（節気のうち月が替わるもの）の時刻を含む時支にフラグを立てる
+    flags = np.zeros(len(ordinals), dtype=np.uint8)
+    sekki = calculator.sekki
+    for position in range(len(sekki)):
+        if (sekki.term_at(position) - RISSHUN) % 2:
+            continue
+        local = sekki.instants[position] + JST_OFFSET_MINUTES
+        day = local // 1440 + _UNIX_EPOCH_ORDINAL - start.toordinal()
+        if 0 <= day < days:
+            hour = local % 1440 // 60
+            flags[day * 12] = FLAG_SEKKI_BOUNDARY
+            flags[day * 12 + calculator._get_hour_shi_index(hour)] = FLAG_SEKKI_BOUNDARY
+
+    records = np.zeros(len(ordinals), dtype=np.dtype([
+        ("pillars", "u1", 8), ("scores", "<u2", 5), ("guardian", "<u2"),
+        ("taboo", "u1"), ("deficient", "u1"), ("excess", "u1"), ("flags", "u1"),
+    ]))
+    records["pillars"] = np.stack([
+        batch[key] for key in ("year_gan", "year_shi", "month_gan", "month_shi",
+                               "day_gan", "day_shi", "hour_gan", "hour_shi")
+    ], axis=1)
+    records["scores"] = batch["five_elements_score"]
+    records["guardian"] = guardian
+    records["taboo"] = taboo
+    records["deficient"] = deficient
+    records["excess"] = excess
+    records["flags"] = flags
+
+    header = _HEADER.pack(CHART_STORE_MAGIC, CHART_STORE_VERSION, _RECORD.size,
+                          start.toordinal(), days, source_digest(calculator.knowledge_version))
+    # 一時ファイルに書いてから置き換える（参照中のワーカーのmmapは旧ファイルのまま有効）
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(records.tobytes())
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+def load_chart_store(knowledge_version: str, path: Path = CHART_STORE_PATH) -> Optional[ChartStore]:
+    """
+    命式ストアを読み込む
+
+    Args:
+        knowledge_version: ナレッジYAMLのSHA-256（16進）
+        path: ストアファイルのパス
+
+    Returns:
+        ChartStore（ファイルが存在しない・生成元と一致しない場合はNone）
+    """
+    try:
+        return ChartStore(path, knowledge_version)
+    except (OSError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    from suanming import SuanmingCalculator
+
+    count = build_chart_store(SuanmingCalculator())
+    print(f"命式ストアを生成しました: {CHART_STORE_PATH}（{count}件）")
@@ -0,0 +1,237 @@
+"""
+相性計算モジュール
+ナレッジベース: suanming_knowledge.yaml（compatibility、lookup_tables.kango/shigo/chuu）
+
+複数人の命式（SuanmingCalculator.analyze_batch）とKin（maya_improved.calculate_kin_batch）から、
+全ての組の相性を行列演算で計算する。
+- 日干同士の干合、日支同士の支合・対冲
+- 五行補完（相手の五行配点が自分の守護神を満たし、忌神を避ける度合い）
+- 太陽の紋章の関係（同じ紋章・類似・反対・神秘）
+
+日柱（六十干支）同士・紋章同士の関係は種類が限られるため、初期化時にスコア表
+（60×60、20×20）を作り、行列計算では表の参照と五行補完の行列積だけを行う。
+上位k件の検索は行を分割して計算するため、N×N全体を保持しない。
+"""
+
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+
+from suanming import SuanmingCalculator, get_calculator
+from maya_improved import calculate_kin_batch, SOLAR_SEALS
+
+
+class CompatibilityEngine:
+    """相性計算クラス"""
+
+    def __init__(self, calculator: Optional[SuanmingCalculator] = None):
+        """
+        初期化
+
+        Args:
+            calculator: 命式計算に使う SuanmingCalculator（省略時は共有インスタンス）
+        """
+        if calculator is None:
+            calculator = get_calculator()
+        self.calculator = calculator
+
+        rules = calculator.knowledge['compatibility']
+        self.weights = rules['weights']
+        self.suanming_weights = rules['suanming']
+        self.maya_weights = rules['maya']
+
+        tables = calculator.tables
+        self._kango = np.array(tables['kango'])
+        self._shigo = np.array(tables['shigo'])
+        self._chuu = np.array(tables['chuu'])
+
+        # 日柱（六十干支番号）同士・紋章番号同士のスコア表
+        kanshi = np.arange(60)
+        days = {"day_gan": kanshi % 10, "day_shi": kanshi % 12}
+        seals = {"seal": np.arange(20)}
+        self._day_scores = self.weights['suanming'] * sum(
+            self.suanming_weights[key] * relation for key, relation in self._day_relations(days, days).items()
+        )
+        self._seal_scores = self.weights['maya'] * sum(
+            self.maya_weights[key] * relation for key, relation in self._seal_relations(seals, seals).items()
+        )
+
+    def build_profiles(self, birthdates: List[str], birthtimes: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        相性計算用のプロフィール（列指向）を作成
+
+        Args:
+            birthdates: 生年月日（YYYY-MM-DD形式）のリスト
+            birthtimes: 生時刻（HH:MM形式）のリスト（省略時は全員12:00）
+
+        Returns:
+            {
+                "day_gan", "day_shi": 日干・日支インデックス,
+                "day_kanshi": 日柱の六十干支番号,
+                "elements": 五行配点の比率 (N, 5),
+                "affinity": 守護神=1・忌神=-1 の五行ごとの重み (N, 5),
+                "kin": Kin番号, "seal": 紋章番号（Kin mod 20）
+            }
+
+        Raises:
+            ValueError: 日付・時刻の形式、または対応範囲が不正な場合
+        """
+        if birthtimes is None:
+            birthtimes = ["12:00"] * len(birthdates)
+        if len(birthtimes) != len(birthdates):
+            raise ValueError("birthdatesとbirthtimesの件数が一致しません")
+
+        ordinals = np.empty(len(birthdates), dtype=np.int64)
+        minutes = np.empty(len(birthdates), dtype=np.int64)
+        for i, (birthdate, birthtime) in enumerate(zip(birthdates, birthtimes)):
+            dt = datetime.strptime(f"{birthdate} {birthtime}", "%Y-%m-%d %H:%M")
+            ordinals[i] = dt.toordinal()
+            minutes[i] = dt.hour * 60 + dt.minute
+
+        batch = self.calculator.analyze_batch(ordinals, minutes)
+        scores = batch["five_elements_score"]
+        kin = calculate_kin_batch(ordinals).astype(np.int64)
+
+        day_gan = batch["day_gan"].astype(np.int64)
+        day_shi = batch["day_shi"].astype(np.int64)
+
+        return {
+            "day_gan": day_gan,
+            "day_shi": day_shi,
+            "day_kanshi": (6 * day_gan - 5 * day_shi) % 60,
+            "elements": scores / scores.sum(axis=1, keepdims=True),
+            "affinity": batch["guardian_gods"].astype(np.float64) - batch["taboo_elements"],
+            "kin": kin,
+            "seal": kin % 20,
+        }
+
+    def _day_relations(self, a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """日干・日支の関係（干合・支合・対冲）を行列 (len(a), len(b)) で計算"""
+        return {
+            "kango": self._kango[a["day_gan"]][:, None] == b["day_gan"][None, :],
+            "shigo": self._shigo[a["day_shi"]][:, None] == b["day_shi"][None, :],
+            "chuu": self._chuu[a["day_shi"]][:, None] == b["day_shi"][None, :],
+        }
+
+    def _seal_relations(self, a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """太陽の紋章の関係を行列 (len(a), len(b)) で計算"""
+        seal_a = a["seal"][:, None]
+        seal_b = b["seal"][None, :]
+        return {
+            "same_seal": seal_a == seal_b,
+            "analog": (seal_a + seal_b) % 20 == 19,
+            "antipode": (seal_a - seal_b) % 20 == 10,
+            "occult": (seal_a + seal_b) % 20 == 1,
+        }
+
+    def _complement(self, a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> np.ndarray:
+        """五行補完：相手の五行比率と自分の守護神・忌神の内積を双方向で平均 (len(a), len(b))"""
+        return (a["affinity"] @ b["elements"].T + a["elements"] @ b["affinity"].T) / 2
+
+    def score_matrix(self, a: Dict[str, np.ndarray], b: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """
+        相性スコアの行列を計算
+
+        Args:
+            a: build_profiles の結果
+            b: 相手側のプロフィール（省略時は a 同士）
+
+        Returns:
+            相性スコア (len(a), len(b))
+        """
+        if b is None:
+            b = a
+        scores = self._day_scores[a["day_kanshi"][:, None], b["day_kanshi"][None, :]]
+        scores += self._seal_scores[a["seal"][:, None], b["seal"][None, :]]
+        scores += self.weights['suanming'] * self.suanming_weights['complement'] * self._complement(a, b)
+        return scores
+
+    def top_k(
+        self,
+        profiles: Dict[str, np.ndarray],
+        k: int = 5,
+        chunk_size: int = 1024
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        各人について相性の良い相手を上位k人まで検索（自分自身は除く）
+
+        行を chunk_size 人ずつに分けて計算し、各行の上位k件だけを残す。
+
+        Args:
+            profiles: build_profiles の結果
+            k: 相手の人数
+            chunk_size: 一度に計算する行数
+
+        Returns:
+            (相手のインデックス (N, k), 相性スコア (N, k))。スコアの降順
+        """
+        count = len(profiles["kin"])
+        k = min(k, count - 1)
+        indices = np.empty((count, max(k, 0)), dtype=np.int64)
+        scores = np.empty((count, max(k, 0)))
+        if k <= 0:
+            return indices, scores
+
+        for start in range(0, count, chunk_size):
+            rows = slice(start, min(start + chunk_size, count))
+            chunk = {key: value[rows] for key, value in profiles.items()}
+            matrix = self.score_matrix(chunk, profiles)
+            matrix[np.arange(matrix.shape[0]), np.arange(rows.start, rows.stop)] = -np.inf
+
+            best = np.argpartition(-matrix, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(matrix, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind='stable')
+            indices[rows] = np.take_along_axis(best, order, axis=1)
+            scores[rows] = np.take_along_axis(best_scores, order, axis=1)
+
+        return indices, scores
+
+    def pair_detail(self, profiles: Dict[str, np.ndarray], i: int, j: int) -> Dict[str, Any]:
+        """
+        2人の相性の内訳
+
+        Args:
+            profiles: build_profiles の結果
+            i: 1人目のインデックス
+            j: 2人目のインデックス
+
+        Returns:
+            {
+                "score": 相性スコア,
+                "suanming": {"kango", "shigo", "chuu": 該当するか, "complement": 五行補完},
+                "maya": {"seals": [紋章, 紋章], "same_seal", "analog", "antipode", "occult": 該当するか}
+            }
+        """
+        a = {key: value[[i]] for key, value in profiles.items()}
+        b = {key: value[[j]] for key, value in profiles.items()}
+        relations = {**self._day_relations(a, b), **self._seal_relations(a, b), "complement": self._complement(a, b)}
+        relations = {key: value[0, 0] for key, value in relations.items()}
+
+        return {
+            "score": round(float(self.score_matrix(a, b)[0, 0]), 3),
+            "suanming": {
+                "kango": bool(relations["kango"]),
+                "shigo": bool(relations["shigo"]),
+                "chuu": bool(relations["chuu"]),
+                "complement": round(float(relations["complement"]), 3),
+            },
+            "maya": {
+                "seals": [SOLAR_SEALS[(int(profiles["kin"][n]) - 1) % 20] for n in (i, j)],
+                "same_seal": bool(relations["same_seal"]),
+                "analog": bool(relations["analog"]),
+                "antipode": bool(relations["antipode"]),
+                "occult": bool(relations["occult"]),
+            },
+        }
+
+
+# 共有インスタンス
+_engine = None
+
+
+def get_compatibility_engine() -> CompatibilityEngine:
+    """相性計算インスタンスを取得（プロセス内で共有）"""
+    global _engine
+    if _engine is None:
+        _engine = CompatibilityEngine()
+    return _engine
@@ -0,0 +1,53 @@
+"""
+応答後に実行するI/O（Google Sheetsへの計算履歴の保存など）
+
+エンドポイントは defer_io() でI/Oを登録するだけで、実行方法は起動方法によって変わる。
+- WSGI（gunicorn main:app）: 応答を送り終えた後、同じワーカーで同期的に実行する
+  （その間ワーカーは次のリクエストを受け付けない）
+- ASGI（uvicorn asgi:app）: asgi.py が environ にリストを置き、応答を送り終えた後に
+  I/O用のスレッドプールで並行して実行・待機する（計算用のスレッドは塞がない）
+"""
+
+import logging
+from functools import partial
+from typing import Callable
+
+from flask import after_this_request, request
+
+# ASGIモードで、リクエストのI/Oを積むリストを置く environ のキー
+DEFERRED_IO_KEY = 'suanming.deferred_io'
+
+logger = logging.getLogger(__name__)
+
+
+def run_deferred(task: Callable[[], object]) -> None:
+    """
+    登録されたI/Oを実行（例外は記録して握りつぶす。応答は送信済みのため）
+
+    Args:
+        task: 引数なしで呼び出せる関数
+    """
+    try:
+        task()
+    except Exception:
+        logger.exception("応答後のI/Oに失敗しました")
+
+
+def defer_io(func: Callable, *args) -> None:
+    """
+    応答を送り終えた後に実行するI/Oを登録（リクエストの処理中に呼び出す）
+
+    Args:
+        func: I/Oを行う関数（同期関数）
+        *args: func の引数
+    """
+    task = partial(func, *args)
+    tasks = request.environ.get(DEFERRED_IO_KEY)
+    if tasks is not None:
+        tasks.append(task)
+        return
+
+    @after_this_request
+    def run_after_response(response):
+        response.call_on_close(partial(run_deferred, task))
+        return response
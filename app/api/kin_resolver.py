@@ -0,0 +1,177 @@
+"""
+マヤ暦表（52年周期）のKin参照モジュール
+
+マヤ暦表の年別CSVは 1962〜2013年の52年分で、フォルダ名（例: 1962年_1910年_2014年）のとおり
+1つの表が52年前・52年後の年にも対応する。任意の年を52年周期で表の年に対応付け、
+表のKin番号に両年の同じ月日の日数差（mod 260）を加えて求める。
+
+対応する年の日数差は、1月・2月は1月1日同士、3月以降は3月1日同士の差を使う
+（1900年・2100年など閏年でない100年単位の年では、対応する表の年が閏年のため2月29日を除く）。
+
+読み込んだ表（31日 × 12か月の配列）は上限付きのLRUキャッシュに保持するため、
+同じ周期の年を繰り返し参照してもCSVは1度しか解析しない。
+
+kin_verifier が 1900〜2100年の全日を "table" 方式と照合する際の参照元として使う。
+"""
+
+import csv
+import calendar
+import numpy as np
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+# マヤ暦表のフォルダ
+MAYA_TABLE_DIR = Path(__file__).parent.parent.parent / "マヤ暦表"
+
+# 表の年の範囲（52年周期）
+TABLE_FIRST_YEAR = 1962
+CYCLE_YEARS = 52
+
+# 読み込んだ表を保持する年数
+YEAR_CACHE_SIZE = 16
+
+
+def table_year(year: int) -> int:
+    """
+    年を52年周期で表の年（1962〜2013年）に対応付ける
+
+    Args:
+        year: 西暦年
+
+    Returns:
+        表の年
+    """
+    return TABLE_FIRST_YEAR + (year - TABLE_FIRST_YEAR) % CYCLE_YEARS
+
+
+class KinTableResolver:
+    """マヤ暦表を52年周期で参照するクラス"""
+
+    def __init__(self, table_dir: Path = MAYA_TABLE_DIR, cache_size: int = YEAR_CACHE_SIZE):
+        """
+        初期化
+
+        Args:
+            table_dir: マヤ暦表のフォルダ
+            cache_size: 読み込んだ表を保持する年数
+        """
+        self.table_dir = Path(table_dir)
+
+        # 表のキャッシュ：表の年 → (31, 12) のKin番号
+        self._grid_cache = lru_cache(maxsize=cache_size)(self._load_grid)
+
+    def cache_info(self):
+        """
+        表のキャッシュの統計を取得
+
+        Returns:
+            (hits, misses, maxsize, currsize) の名前付きタプル
+        """
+        return self._grid_cache.cache_info()
+
+    def cache_clear(self) -> None:
+        """表のキャッシュを消去"""
+        self._grid_cache.cache_clear()
+
+    def table_path(self, year: int) -> Path:
+        """
+        表の年のCSVのパス
+
+        Args:
+            year: 表の年（1962〜2013年）
+
+        Returns:
+            {年}年_{年-52}年_{年+52}年/{年}年_Kin換算表.csv
+        """
+        folder = f"{year}年_{year - CYCLE_YEARS}年_{year + CYCLE_YEARS}年"
+        return self.table_dir / folder / f"{year}年_Kin換算表.csv"
+
+    def _load_grid(self, year: int) -> np.ndarray:
+        """
+        表の年のCSVを (31, 12) の配列として読み込む（空欄は0）
+
+        Raises:
+            ValueError: CSVが存在しない、または形式が不正な場合
+        """
+        grid = np.zeros((31, 12), dtype=np.int64)
+        path = self.table_path(year)
+        try:
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # ヘッダー行（日,1月,...,12月）をスキップ
+                for row in reader:
+                    if not row:
+                        continue
+                    day = int(row[0])
+                    for month, value in enumerate(row[1:13]):
+                        if value.strip():
+                            grid[day - 1, month] = int(value)
+        except OSError as e:
+            raise ValueError(f"マヤ暦表が見つかりません: {path}") from e
+        except (ValueError, IndexError) as e:
+            raise ValueError(f"マヤ暦表の形式が不正です: {path}") from e
+
+        grid.flags.writeable = False
+        return grid
+
+    def _day_shifts(self, year: int) -> tuple:
+        """表の年から指定年までの日数差（1・2月用, 3月以降用）"""
+        base = table_year(year)
+        return (
+            date(year, 1, 1).toordinal() - date(base, 1, 1).toordinal(),
+            date(year, 3, 1).toordinal() - date(base, 3, 1).toordinal(),
+        )
+
+    def year_grid(self, year: int) -> np.ndarray:
+        """
+        指定年のKin換算表
+
+        Args:
+            year: 西暦年
+
+        Returns:
+            Kin番号の配列 (31, 12)。[日 - 1, 月 - 1] で参照し、存在しない日は0
+
+        Raises:
+            ValueError: 表が読み込めない場合
+        """
+        grid = self._grid_cache(table_year(year))
+        before_march, after_march = self._day_shifts(year)
+        shifts = np.where(np.arange(12) < 2, before_march, after_march)
+
+        days_in_month = np.array([calendar.monthrange(year, month)[1] for month in range(1, 13)])
+        exists = (np.arange(1, 32)[:, None] <= days_in_month[None, :]) & (grid > 0)
+        return np.where(exists, (grid - 1 + shifts[None, :]) % 260 + 1, 0)
+
+    def kin(self, d: date) -> Optional[int]:
+        """
+        日付のKin番号を表から求める
+
+        Args:
+            d: 日付
+
+        Returns:
+            Kin番号（1-260）。表のセルが空欄の場合はNone
+
+        Raises:
+            ValueError: 表が読み込めない場合
+        """
+        value = int(self._grid_cache(table_year(d.year))[d.day - 1, d.month - 1])
+        if value == 0:
+            return None
+        before_march, after_march = self._day_shifts(d.year)
+        return (value - 1 + (before_march if d.month < 3 else after_march)) % 260 + 1
+
+
+# 共有インスタンス
+_resolver = None
+
+
+def get_kin_resolver() -> KinTableResolver:
+    """マヤ暦表の参照インスタンスを取得（プロセス内で共有）"""
+    global _resolver
+    if _resolver is None:
+        _resolver = KinTableResolver()
+    return _resolver
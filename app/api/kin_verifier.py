@@ -0,0 +1,208 @@
+"""
+Kin換算表の照合モジュール
+
+マヤ暦表の統合CSV（全年代統合_Kin換算表.csv、1962〜2013年の18,993行）を列ごとの配列として読み込み、
+calendar_systems に登録された全ての暦法でKin番号を一括計算して、一致しない日付を暦法ごとに集計する。
+CSVと同じ規則の暦法（"table"）が全行一致することを、Kin計算の変更時の確認に使う。
+
+あわせて、1962〜2013年以外の年（1900〜2100年）は年別CSVを52年周期で参照した値
+（kin_resolver.KinTableResolver）と "table" 方式を照合する。
+
+実行方法:
+    python kin_verifier.py [CSVのパス]
+    （基準の暦法に不一致があれば終了コード1。照合時間も表示する。目標は VERIFY_TIME_BUDGET 秒以内）
+"""
+
+import calendar
+import sys
+import time
+import numpy as np
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from calendar_systems import CALENDAR_END, CALENDAR_START, CALENDAR_SYSTEMS
+from kin_resolver import KinTableResolver, get_kin_resolver, table_year
+
+# 統合CSVのパス
+CONSOLIDATED_KIN_TABLE_PATH = (
+    Path(__file__).parent.parent.parent / "マヤ暦表" / "マヤ暦表すべて換算表" / "全年代統合_Kin換算表.csv"
+)
+
+# CSVと同じ規則の暦法
+REFERENCE_CALENDAR_SYSTEM = "table"
+
+# 暦法ごとに報告する不一致の最大件数
+MAX_MISMATCH_EXAMPLES = 20
+
+# 照合時間の目標（秒）。Kin計算の変更のたびに実行できるよう、CLIで実測値と比較して表示する
+VERIFY_TIME_BUDGET = 1.0
+
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def load_kin_table(path: Path = CONSOLIDATED_KIN_TABLE_PATH) -> Dict[str, np.ndarray]:
+    """
+    統合CSV（年,月,日,Kin）を列ごとの配列として読み込む
+
+    Args:
+        path: CSVのパス
+
+    Returns:
+        {"year", "month", "day", "kin": 各列の配列, "ordinal": 日付の序数（存在しない日付は-1）}
+
+    Raises:
+        ValueError: CSVの形式が不正な場合
+    """
+    columns = np.loadtxt(path, delimiter=",", skiprows=1, dtype=np.int64, ndmin=2, encoding="utf-8-sig")
+    if columns.shape[1] != 4:
+        raise ValueError(f"Kin換算表の列数が不正です（年,月,日,Kin）: {path}")
+    year, month, day, kin = columns.T
+
+    # 年月の初日 + (日 - 1) で序数を求め、月が変わった行（存在しない日付）は-1にする
+    valid = (month >= 1) & (month <= 12) & (day >= 1)
+    months = (year - 1970) * 12 + np.where(valid, month, 1) - 1
+    days = months.astype("datetime64[M]").astype("datetime64[D]") + np.where(valid, day, 1) - 1
+    valid &= days.astype("datetime64[M]").astype(np.int64) == months
+    ordinal = np.where(valid, days.astype(np.int64) + _UNIX_EPOCH_ORDINAL, -1)
+
+    return {"year": year, "month": month, "day": day, "kin": kin, "ordinal": ordinal}
+
+
+def verify_cycle_tables(
+    resolver: Optional[KinTableResolver] = None,
+    start_year: int = CALENDAR_START.year,
+    end_year: int = CALENDAR_END.year
+) -> Dict[str, Any]:
+    """
+    年別CSVを52年周期で参照したKin番号を "table" 方式と照合
+
+    Args:
+        resolver: マヤ暦表の参照インスタンス（省略時は共有インスタンス）
+        start_year: 開始年
+        end_year: 終了年（この年を含む）
+
+    Returns:
+        {"years": 年数, "days": 日数, "mismatches": 不一致の件数,
+         "examples": [{"date", "expected", "actual"}, ...]}
+
+    Raises:
+        ValueError: 年別CSVが読み込めない場合
+    """
+    if resolver is None:
+        resolver = get_kin_resolver()
+
+    # 表の年ごとにまとめて参照する（LRUの大きさによらず、各CSVの解析は1度）
+    years = range(start_year, end_year + 1)
+    grids = {year: resolver.year_grid(year) for year in sorted(years, key=lambda y: (table_year(y), y))}
+
+    # 日付順（年・月・日）に並べる。存在しない日は year_grid で0
+    days = np.arange(1, 32)[:, None]
+    table_kin = np.concatenate([
+        grids[year].T[(days <= np.array([calendar.monthrange(year, m)[1] for m in range(1, 13)])).T]
+        for year in years
+    ])
+    ordinals = np.arange(date(start_year, 1, 1).toordinal(), date(end_year, 12, 31).toordinal() + 1)
+    computed = CALENDAR_SYSTEMS[REFERENCE_CALENDAR_SYSTEM].kin_batch(ordinals).astype(np.int64)
+
+    mismatched = np.flatnonzero(table_kin != computed)
+    return {
+        "years": len(years),
+        "days": len(ordinals),
+        "mismatches": len(mismatched),
+        "examples": [
+            {"date": date.fromordinal(ordinal).isoformat(), "expected": kin, "actual": value}
+            for ordinal, kin, value in zip(
+                ordinals[mismatched[:MAX_MISMATCH_EXAMPLES]].tolist(),
+                table_kin[mismatched[:MAX_MISMATCH_EXAMPLES]].tolist(),
+                computed[mismatched[:MAX_MISMATCH_EXAMPLES]].tolist(),
+            )
+        ],
+    }
+
+
+def verify_kin_table(
+    path: Path = CONSOLIDATED_KIN_TABLE_PATH,
+    table: Optional[Dict[str, np.ndarray]] = None,
+    resolver: Optional[KinTableResolver] = None
+) -> Dict[str, Any]:
+    """
+    統合CSVのKin番号を登録済みの全暦法と照合し、52年周期の参照も照合
+
+    Args:
+        path: CSVのパス
+        table: load_kin_table の結果（省略時は path から読み込む）
+        resolver: 52年周期の照合に使うマヤ暦表の参照インスタンス（省略時は共有インスタンス）
+
+    Returns:
+        {
+            "rows": 行数,
+            "invalid_rows": [存在しない日付・範囲外のKinの行（年-月-日）],
+            "systems": {方式名: {"mismatches": 不一致の件数,
+                                 "examples": [{"date", "expected", "actual"}, ...]}},
+            "reference_system": 基準の暦法,
+            "cycle": verify_cycle_tables の結果,
+            "ok": 不正な行がなく、基準の暦法が全行・52年周期の参照の全日と一致するか
+        }
+    """
+    if table is None:
+        table = load_kin_table(path)
+
+    valid = (table["ordinal"] >= 0) & (table["kin"] >= 1) & (table["kin"] <= 260)
+    invalid_rows = [f"{y}-{m:02d}-{d:02d}" for y, m, d in zip(
+        table["year"][~valid].tolist(), table["month"][~valid].tolist(), table["day"][~valid].tolist()
+    )]
+
+    ordinals = table["ordinal"][valid]
+    expected = table["kin"][valid]
+    systems = {}
+    for name, system in CALENDAR_SYSTEMS.items():
+        actual = system.kin_batch(ordinals).astype(np.int64)
+        mismatched = np.flatnonzero(actual != expected)
+        systems[name] = {
+            "mismatches": len(mismatched),
+            "examples": [
+                {"date": date.fromordinal(ordinal).isoformat(), "expected": kin, "actual": value}
+                for ordinal, kin, value in zip(
+                    ordinals[mismatched[:MAX_MISMATCH_EXAMPLES]].tolist(),
+                    expected[mismatched[:MAX_MISMATCH_EXAMPLES]].tolist(),
+                    actual[mismatched[:MAX_MISMATCH_EXAMPLES]].tolist(),
+                )
+            ],
+        }
+
+    cycle = verify_cycle_tables(resolver)
+
+    return {
+        "rows": len(table["kin"]),
+        "invalid_rows": invalid_rows,
+        "systems": systems,
+        "reference_system": REFERENCE_CALENDAR_SYSTEM,
+        "cycle": cycle,
+        "ok": (not invalid_rows and systems[REFERENCE_CALENDAR_SYSTEM]["mismatches"] == 0
+               and cycle["mismatches"] == 0),
+    }
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    report = verify_kin_table(Path(sys.argv[1]) if len(sys.argv) > 1 else CONSOLIDATED_KIN_TABLE_PATH)
+    elapsed = time.perf_counter() - started
+
+    print(f"行数: {report['rows']}（不正な行: {len(report['invalid_rows'])}）")
+    for row in report["invalid_rows"][:MAX_MISMATCH_EXAMPLES]:
+        print(f"  不正な行: {row}")
+    for name, result in report["systems"].items():
+        marker = "（基準）" if name == report["reference_system"] else ""
+        print(f"{name}{marker}: 不一致 {result['mismatches']}件")
+        if name == report["reference_system"]:
+            for example in result["examples"]:
+                print(f"  {example['date']}: 表 {example['expected']} / 計算 {example['actual']}")
+    cycle = report["cycle"]
+    print(f"52年周期の参照（{cycle['years']}年・{cycle['days']}日）: 不一致 {cycle['mismatches']}件")
+    for example in cycle["examples"]:
+        print(f"  {example['date']}: 表 {example['expected']} / 計算 {example['actual']}")
+    marker = "" if elapsed < VERIFY_TIME_BUDGET else "（目標超過）"
+    print(f"照合時間: {elapsed:.3f}秒（目標: {VERIFY_TIME_BUDGET:g}秒以内）{marker}")
+
+    sys.exit(0 if report["ok"] else 1)
@@ -0,0 +1,273 @@
+"""
+ナレッジベース・スナップショットモジュール
+
+suanming_knowledge.yaml をコンパイルし、整数インデックス化した参照テーブルと
+元のナレッジを1つのバイナリスナップショットに保存する。
+起動時はYAMLを解析せずにスナップショットを読み込み、YAMLが変更されていれば
+（SHA-256が一致しなければ）自動的に再生成する。
+
+ファイル形式:
+    ヘッダー44バイト: マジック(8) + バージョン uint32 + YAMLのSHA-256(32)
+    本体: pickle化したスナップショット辞書
+
+ビルド手順:
+    python knowledge_snapshot.py
+"""
+
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# デフォルトのパス
+KNOWLEDGE_PATH = Path(__file__).parent / "suanming_knowledge.yaml"
+SNAPSHOT_PATH = Path(__file__).parent / "suanming_knowledge.snapshot"
+
+# スナップショット形式のバージョン（テーブル構成を変えたら上げる）
+SNAPSHOT_VERSION = 3
+
+SNAPSHOT_MAGIC = b"SMKBSNAP"
+_HEADER = struct.Struct("<8sI32s")
+
+
+def _source_digest(knowledge_path: Path) -> bytes:
+    """YAMLファイルのSHA-256を計算"""
+    with open(knowledge_path, 'rb') as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def compile_knowledge(knowledge: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ナレッジから整数インデックス化した参照テーブルを生成
+
+    天干・地支はconstants.tenkan/chishiの添字、五行はconstants.five_elementsの添字で表す。
+
+    Args:
+        knowledge: YAMLから読み込んだナレッジ
+
+    Returns:
+        参照テーブルの辞書
+    """
+    constants = knowledge['constants']
+    lookup_tables = knowledge['lookup_tables']
+
+    tenkan_index = {gan: i for i, gan in enumerate(constants['tenkan'])}
+    chishi_index = {shi: i for i, shi in enumerate(constants['chishi'])}
+    element_index = {elem: i for i, elem in enumerate(constants['five_elements'])}
+
+    gan_element = [element_index[constants['tenkan_to_element'][gan]] for gan in constants['tenkan']]
+
+    # 天干・地支ごとの五行配点
+    gan_scores = [[0] * 5 for _ in constants['tenkan']]
+    for i, elem in enumerate(gan_element):
+        gan_scores[i][elem] = constants['tenkan_score']
+    shi_scores = [[0] * 5 for _ in constants['chishi']]
+    zokkan = []
+    for shi, i in chishi_index.items():
+        items = []
+        for zokkan_item in lookup_tables['zokkan'][shi]:
+            gan = tenkan_index[zokkan_item['gan']]
+            shi_scores[i][gan_element[gan]] += zokkan_item['ratio']
+            items.append((gan, zokkan_item['ratio']))
+        zokkan.append(tuple(items))
+
+    # 五行の関係：[五行] = 生じる/制する相手、および逆引き
+    shosho = [element_index[lookup_tables['shosho_relation'][elem]] for elem in constants['five_elements']]
+    sokoku = [element_index[lookup_tables['sokoku_relation'][elem]] for elem in constants['five_elements']]
+    controlled_by = [[False] * 5 for _ in range(5)]
+    nourished_by = [[False] * 5 for _ in range(5)]
+    for elem in range(5):
+        controlled_by[sokoku[elem]][elem] = True
+        nourished_by[shosho[elem]][elem] = True
+
+    tables = {
+        "goko_ton": [tenkan_index[lookup_tables['goko_ton'][gan]] for gan in constants['tenkan']],
+        "goso_ton": [tenkan_index[lookup_tables['goso_ton'][gan]] for gan in constants['tenkan']],
+        "month_shi": [chishi_index[shi] for shi in lookup_tables['month_shi_order']],
+        "hour_shi": [chishi_index[shi] for shi in lookup_tables['hour_shi_order']],
+        "kango": [tenkan_index[lookup_tables['kango'][gan]] for gan in constants['tenkan']],
+        "shigo": [chishi_index[lookup_tables['shigo'][shi]] for shi in constants['chishi']],
+        "chuu": [chishi_index[lookup_tables['chuu'][shi]] for shi in constants['chishi']],
+        "gan_element": gan_element,
+        "zokkan": zokkan,
+        "gan_scores": gan_scores,
+        "shi_scores": shi_scores,
+        "shosho": shosho,
+        "sokoku": sokoku,
+        "controlled_by": controlled_by,
+        "nourished_by": nourished_by,
+    }
+    tables["guardian_table"] = compile_guardian_table(tables)
+    return tables
+
+
+def _select_guardian(deficient, excess, sokoku, shosho):
+    """不足・過剰五行から守護神を優先順に選定（SuanmingCalculator._select_guardian_indices と同じ規則）"""
+    guardian_gods = list(deficient)
+    for excess_elem in excess:
+        for control_elem in range(5):
+            if sokoku[control_elem] == excess_elem and control_elem not in guardian_gods:
+                guardian_gods.append(control_elem)
+    for deficient_elem in deficient:
+        for nourish_elem in range(5):
+            if shosho[nourish_elem] == deficient_elem and nourish_elem not in guardian_gods:
+                guardian_gods.append(nourish_elem)
+    return tuple(guardian_gods), excess, deficient, excess
+
+
+def compile_guardian_table(tables: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    出現しうる全ての五行配点から守護神・忌神の選定表を生成
+
+    五行配点は四柱（六十干支 × 4）の配点の和なので、2柱の和の集合を求めてから
+    その和を取ることで全組み合わせを列挙する。選定結果は不足・過剰五行の組で決まるため、
+    結果は組ごとに1つだけ保持し、配点からは結果の番号を引く。
+
+    Args:
+        tables: compile_knowledge の参照テーブル
+
+    Returns:
+        {
+            "bits": 1五行あたりのビット数,
+            "keys": 五行配点を bits ビットずつ詰めた整数（昇順）,
+            "codes": keys に対応する結果の番号,
+            "results": (守護神, 忌神, 不足五行, 過剰五行) の五行インデックスのタプル
+        }
+    """
+    # 一括計算のため、ビルド時のみimportする
+    import numpy as np
+
+    gan_scores = np.array(tables['gan_scores'], dtype=np.int64)
+    shi_scores = np.array(tables['shi_scores'], dtype=np.int64)
+    kanshi = np.arange(60)
+    pillar_scores = gan_scores[kanshi % 10] + shi_scores[kanshi % 12]
+
+    pair_scores = np.unique((pillar_scores[:, None] + pillar_scores[None, :]).reshape(-1, 5), axis=0)
+    bits = int(pair_scores.max() * 2).bit_length()
+    shifts = bits * np.arange(5, dtype=np.int64)
+    pair_keys = (pair_scores << shifts).sum(axis=1)
+    keys = np.unique((pair_keys[:, None] + pair_keys[None, :]).ravel())
+
+    scores = (keys[:, None] >> shifts) & ((1 << bits) - 1)
+    weights = 1 << np.arange(5)
+    deficient = (scores == scores.min(axis=1, keepdims=True)) @ weights
+    excess = (scores == scores.max(axis=1, keepdims=True)) @ weights
+    masks, codes = np.unique(deficient * 32 + excess, return_inverse=True)
+
+    results = tuple(
+        _select_guardian(
+            tuple(i for i in range(5) if mask // 32 >> i & 1),
+            tuple(i for i in range(5) if mask % 32 >> i & 1),
+            tables['sokoku'], tables['shosho'],
+        )
+        for mask in masks.tolist()
+    )
+
+    return {
+        "bits": bits,
+        "keys": array('q', keys.tolist()),
+        "codes": array('H', codes.tolist()),
+        "results": results,
+    }
+
+
+def build_snapshot(knowledge_path: Path = KNOWLEDGE_PATH,
+                   snapshot_path: Path = SNAPSHOT_PATH) -> Dict[str, Any]:
+    """
+    YAMLを解析してスナップショットを生成・保存
+
+    書き込みは一時ファイル経由で置き換える。書き込めない環境（読み取り専用など）では
+    保存せずにスナップショット辞書のみを返す。
+
+    Args:
+        knowledge_path: YAMLナレッジベースのパス
+        snapshot_path: スナップショットの出力先
+
+    Returns:
+        スナップショット辞書 {"version", "source_sha256", "knowledge", "tables"}
+    """
+    # YAMLの読み込みは再生成時のみ必要なため、ここでimportする
+    import yaml
+
+    with open(knowledge_path, 'rb') as f:
+        source = f.read()
+    knowledge = yaml.safe_load(source.decode('utf-8'))
+    digest = hashlib.sha256(source).digest()
+
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "source_sha256": digest.hex(),
+        "knowledge": knowledge,
+        "tables": compile_knowledge(knowledge),
+    }
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, digest)
+
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=Path(snapshot_path).parent, suffix=".tmp")
+    except OSError:
+        return snapshot
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    except OSError:
+        os.unlink(tmp_path)
+
+    return snapshot
+
+
+def read_snapshot(snapshot_path: Path, digest: bytes) -> Optional[Dict[str, Any]]:
+    """
+    スナップショットを読み込む
+
+    Args:
+        snapshot_path: スナップショットのパス
+        digest: 現在のYAMLのSHA-256
+
+    Returns:
+        スナップショット辞書（存在しない・バージョン不一致・YAML変更時はNone）
+    """
+    try:
+        with open(snapshot_path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, version, source_digest = _HEADER.unpack(header)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or source_digest != digest:
+                return None
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def load_snapshot(knowledge_path: Path = KNOWLEDGE_PATH,
+                  snapshot_path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    ナレッジベースのスナップショットを取得（必要に応じて再生成）
+
+    Args:
+        knowledge_path: YAMLナレッジベースのパス
+        snapshot_path: スナップショットのパス（省略時はYAMLと同じ場所の .snapshot）
+
+    Returns:
+        スナップショット辞書 {"version", "source_sha256", "knowledge", "tables"}
+    """
+    knowledge_path = Path(knowledge_path)
+    if snapshot_path is None:
+        snapshot_path = knowledge_path.with_suffix(".snapshot")
+
+    snapshot = read_snapshot(snapshot_path, _source_digest(knowledge_path))
+    if snapshot is None:
+        snapshot = build_snapshot(knowledge_path, snapshot_path)
+    return snapshot
+
+
+if __name__ == "__main__":
+    build_snapshot()
+    print(f"スナップショットを生成しました: {SNAPSHOT_PATH}")
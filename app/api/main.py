@@ -3,19 +3,29 @@ Flask API エンドポイント
 算命学×マヤ暦コンサルシステムAPI
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+import json
 import traceback
+import os
 import uuid
-from suanming import SuanmingCalculator
-from maya_improved import analyze_maya
+import numpy as np
+from suanming import DAY_TABLE_END, DAY_TABLE_START, SuanmingCalculator
+from chart_store import CHART_STORE_PATH
+from chart_index import get_chart_index
+from compatibility import get_compatibility_engine
+from calendar_systems import DEFAULT_CALENDAR_SYSTEM, get_calendar_systems, iter_calendar
+from response_cache import RESPONSE_CACHE_SIZE, ResponseCache
+from deferred_io import defer_io
 
 app = Flask(__name__)
 CORS(app)  # フロントエンドからのアクセスを許可
 
 # 算命学計算インスタンスの初期化
-calculator = SuanmingCalculator()
+# （命式ストアはビルド時に生成される。存在しなければ都度計算する）
+calculator = SuanmingCalculator(chart_store_path=os.getenv('CHART_STORE_PATH', CHART_STORE_PATH))
 
 
 @app.route('/api/v1/health', methods=['GET'])
@@ -28,22 +38,27 @@ def health_check():
     }), 200
 
 
-@app.route('/api/v1/analyze', methods=['POST'])
+@app.route('/api/v1/analyze', methods=['GET', 'POST'])
 def analyze():
     """
     算命学×マヤ暦総合分析エンドポイント
 
-    Request Body:
+    Request Body (POST):
         {
             "birthdate": "YYYY-MM-DD",
             "birth_time": "HH:MM" (optional, default: "12:00"),
             "categories": ["仕事", "恋愛"] (optional),
+            "calendar_system": "dreamspell" または ["dreamspell", "gmt584283"] (optional,
+                default: "dreamspell"。calendar_systems に登録された暦法名),
             "llm_prefs": {
                 "temperature": 0.5,
                 "intensity": 6
             } (optional)
         }
 
+    Query Parameters (GET):
+        birthdate, birth_time, categories（カンマ区切り）, calendar_system（カンマ区切り）
+
     Response:
         {
             "request_id": "uuid",
@@ -51,14 +66,23 @@ def analyze():
             "data": {
                 "suanming": {...},
                 "maya": {...},
+                "maya_systems": {"dreamspell": {...}, ...} (暦法を複数指定した場合のみ),
                 "scores": {...},
                 "insights": [...]
             }
         }
+
+    スコア・インサイトは先頭に指定した暦法の結果で計算する。
+
+    Note:
+        "data" は入力（命式のキー・暦法・カテゴリ・llm_prefs）とナレッジのバージョンだけで
+        決まるため、シリアライズ済みの結果を response_cache に保持し、ETag を付けて返す。
+        If-None-Match が一致すれば 304（本文なし）を返す。
+        計算履歴（CALC_LOGS_ENABLED の場合）は応答後に deferred_io で保存する。
     """
     try:
-        # リクエストボディの取得
-        data = request.get_json()
+        # リクエストボディ（GETはクエリパラメータ）の取得
+        data = _analyze_query() if request.method == 'GET' else request.get_json()
 
         if not data:
             return jsonify({
@@ -67,62 +91,57 @@ def analyze():
             }), 400
 
         # 入力検証
-        birthdate = data.get('birthdate')
-        birthtime = data.get('birth_time', '12:00')
-        categories = data.get('categories', ['仕事'])
-        llm_prefs = data.get('llm_prefs', {})
-
-        if not birthdate:
+        try:
+            birthdate, birthtime, categories = parse_analyze_input(data)
+        except ValueError as e:
             return jsonify({
                 "status": "error",
-                "message": "birthdateは必須です（形式: YYYY-MM-DD）"
+                "message": str(e)
             }), 400
 
-        # 日時形式の検証
+        llm_prefs = data.get('llm_prefs') or {}
+        calendar_system = data.get('calendar_system', DEFAULT_CALENDAR_SYSTEM)
+
         try:
-            datetime.strptime(birthdate, "%Y-%m-%d")
-        except ValueError:
+            calendar_systems = get_calendar_systems(calendar_system)
+        except ValueError as e:
             return jsonify({
                 "status": "error",
-                "message": "birthdateの形式が不正です（正しい形式: YYYY-MM-DD）"
+                "message": str(e)
             }), 400
 
+        llm = {
+            "used_tokens": 0,  # TODO: LLM統合後に実装
+            "temperature": llm_prefs.get('temperature', 0.5),
+            "intensity": llm_prefs.get('intensity', 6)
+        }
+
+        # 算命学命式・マヤ暦の計算（同じキーはキャッシュ済みの結果を使う）
         try:
-            datetime.strptime(birthtime, "%H:%M")
-        except ValueError:
+            key = (
+                _chart_key(birthdate, birthtime),
+                tuple(system.name for system in calendar_systems),
+                tuple(categories),
+                json.dumps(llm, sort_keys=True),
+            )
+            result, etag = response_cache.get(key)
+        except ValueError as e:
             return jsonify({
                 "status": "error",
-                "message": "birth_timeの形式が不正です（正しい形式: HH:MM）"
+                "message": str(e)
             }), 400
 
-        # 算命学命式計算の実行
-        suanming_result = calculator.analyze(birthdate, birthtime)
-
-        # マヤ暦計算の実行
-        maya_result = analyze_maya(birthdate)
-
-        # 統合スコアの計算
-        scores = calculate_scores(suanming_result, maya_result)
+        headers = {"ETag": f'"{etag}"', "Cache-Control": RESPONSE_CACHE_CONTROL}
+        if request.if_none_match.contains_weak(etag):
+            return Response(status=304, headers=headers)
 
-        # インサイトの生成
-        insights = generate_insights(suanming_result, maya_result, categories)
+        # 計算履歴の保存（応答を送り終えた後に実行）
+        if CALC_LOGS_ENABLED:
+            defer_io(save_calc_log, data, result)
 
-        # レスポンスの返却
-        return jsonify({
-            "request_id": str(uuid.uuid4()),
-            "ts": datetime.now().isoformat(),
-            "data": {
-                "suanming": suanming_result,
-                "maya": maya_result,
-                "scores": scores,
-                "insights": insights,
-                "llm": {
-                    "used_tokens": 0,  # TODO: LLM統合後に実装
-                    "temperature": llm_prefs.get('temperature', 0.5),
-                    "intensity": llm_prefs.get('intensity', 6)
-                }
-            }
-        }), 200
+        # レスポンスの返却（request_id・ts だけをリクエストごとに付ける）
+        body = f'{{"data":{result},"request_id":"{uuid.uuid4()}","ts":"{datetime.now().isoformat()}"}}\n'
+        return Response(body, status=200, headers=headers, mimetype='application/json')
 
     except Exception as e:
         # エラーハンドリング
@@ -136,6 +155,565 @@ def analyze():
         }), 500
 
 
+def _analyze_query() -> dict:
+    """GETのクエリパラメータを総合分析のリクエストボディの形式にする"""
+    data = {}
+    for name in ('birthdate', 'birth_time'):
+        if name in request.args:
+            data[name] = request.args[name]
+    for name in ('categories', 'calendar_system'):
+        values = [value for arg in request.args.getlist(name) for value in arg.split(',') if value]
+        if values:
+            data[name] = values
+    return data
+
+
+def _render_analysis(key: tuple) -> str:
+    """
+    総合分析の "data" をシリアライズ（response_cache に渡す関数）
+
+    Args:
+        key: (命式のキー, 暦法名, カテゴリ, llm のJSON)
+
+    Returns:
+        "data" のJSON文字列（jsonify と同じ形式）
+    """
+    chart_key, system_names, categories, llm = key
+    birthdate = date.fromordinal(chart_key[0]).isoformat()
+
+    maya_results = {system.name: system.analyze(birthdate) for system in get_calendar_systems(list(system_names))}
+    result = build_analysis(calculator.chart(chart_key), maya_results, list(categories))
+    result["llm"] = json.loads(llm)
+    return app.json.dumps(result, separators=(",", ":"))
+
+
+def save_calc_log(request_data: dict, result: str) -> None:
+    """
+    計算履歴をGoogle Sheets（CalcLogs）に保存（defer_io で応答後に実行）
+
+    Args:
+        request_data: リクエストボディ
+        result: シリアライズ済みの "data"
+    """
+    from sheets import get_calc_logs_manager
+
+    get_calc_logs_manager().save_log(CALC_LOG_USER_ID, request_data, json.loads(result))
+
+
+# 計算履歴の保存（Google Sheetsの設定がある場合のみ）
+CALC_LOGS_ENABLED = bool(os.getenv('SHEETS_SPREADSHEET_ID'))
+
+# ユーザー認証の導入までは全ての計算履歴をこのIDで保存する
+CALC_LOG_USER_ID = 'anonymous'
+
+# スコア・インサイトの計算方法を変えたら上げる（ETagが全て変わる）
+RESPONSE_CACHE_VERSION = 1
+
+# 総合分析のレスポンスに付けるCache-Control（ブラウザは保存し、再利用時はETagで再検証する）
+RESPONSE_CACHE_CONTROL = "private, no-cache"
+
+# 入力の文字列の解析・命式のキーの計算（同じ入力の再リクエストでは strptime を繰り返さない）
+_parse_datetime = lru_cache(maxsize=RESPONSE_CACHE_SIZE)(datetime.strptime)
+_chart_key = lru_cache(maxsize=RESPONSE_CACHE_SIZE)(calculator.chart_key)
+
+# 総合分析のレスポンスキャッシュ（バージョンはスコア計算とナレッジのSHA-256）
+response_cache = ResponseCache(
+    _render_analysis,
+    f"{RESPONSE_CACHE_VERSION}:{calculator.knowledge_version}",
+    int(os.getenv('RESPONSE_CACHE_SIZE', RESPONSE_CACHE_SIZE))
+)
+
+
+# 一括分析の1リクエストあたりの最大件数と、一度に計算する件数
+MAX_BATCH_RECORDS = 100000
+BATCH_CHUNK_SIZE = 1000
+
+
+@app.route('/api/v1/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    一括分析エンドポイント（NDJSONでストリーミング）
+
+    Request Body (application/json: 配列、または application/x-ndjson: 1行1件):
+        [
+            {"id": "crm-001" (optional), "birthdate": "YYYY-MM-DD",
+             "birth_time": "HH:MM" (optional), "categories": [...] (optional)},
+            ...
+        ]
+
+    Query Parameters:
+        calendar_system: 暦法名（optional, default: "dreamspell"。カンマ区切りで複数）
+
+    Response (application/x-ndjson, 1行1件、入力順):
+        {"index": 0, "id": "crm-001", "data": {"suanming": {...}, "maya": {...}, "scores": {...}, "insights": [...]}}
+        {"index": 1, "status": "error", "message": "birthdateの形式が不正です（正しい形式: YYYY-MM-DD）"}
+        ...
+
+    Note:
+        BATCH_CHUNK_SIZE 件ずつ、同じ入力をまとめて1度だけ計算して送信する。
+        NDJSONの入力は1行ずつ読み込むため、件数が多くてもメモリ使用量は一定
+    """
+    names = [name for value in request.args.getlist('calendar_system') for name in value.split(',') if name]
+    try:
+        systems = get_calendar_systems(names or DEFAULT_CALENDAR_SYSTEM)
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    if request.mimetype == 'application/x-ndjson':
+        records = _iter_ndjson_records(request.stream)
+    else:
+        records = request.get_json(silent=True)
+        if not isinstance(records, list) or not records:
+            return jsonify({
+                "status": "error",
+                "message": "リクエストボディは分析する入力の配列（またはNDJSON）で指定してください"
+            }), 400
+        if len(records) > MAX_BATCH_RECORDS:
+            return jsonify({
+                "status": "error",
+                "message": f"一度に分析できるのは{MAX_BATCH_RECORDS}件までです"
+            }), 400
+
+    def generate():
+        chunk = []
+        for index, record in enumerate(records):
+            if index >= MAX_BATCH_RECORDS:
+                if chunk:
+                    yield _analyze_chunk(index - len(chunk), chunk, systems)
+                yield json.dumps({
+                    "index": index, "status": "error",
+                    "message": f"一度に分析できるのは{MAX_BATCH_RECORDS}件までです"
+                }, ensure_ascii=False) + "\n"
+                return
+            chunk.append(record)
+            if len(chunk) == BATCH_CHUNK_SIZE:
+                yield _analyze_chunk(index + 1 - len(chunk), chunk, systems)
+                chunk = []
+        if chunk:
+            yield _analyze_chunk(index + 1 - len(chunk), chunk, systems)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def _iter_ndjson_records(stream):
+    """NDJSONのリクエストボディを1行ずつ読み込む（解析できない行は ValueError を返す）"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield ValueError("JSONとして解析できない行です")
+
+
+def _analyze_chunk(first_index: int, records: list, systems: list) -> str:
+    """
+    一括分析の1チャンク分を計算してNDJSONにする
+
+    同じ命式と categories の入力は1度だけ計算・シリアライズし、
+    Kin番号はチャンク内の日付をまとめて暦法ごとに一括取得する。
+    """
+    results = {}
+    keys = []
+    for record in records:
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            birthdate, birthtime, categories = parse_analyze_input(record)
+            key = (_chart_key(birthdate, birthtime), tuple(categories))
+        except ValueError as e:
+            key = e
+        keys.append(key)
+        if not isinstance(key, ValueError):
+            results.setdefault(key, None)
+
+    unique = list(results)
+    if unique:
+        ordinals = np.array([chart_key[0] for chart_key, _ in unique])
+        kins = [system.kin_batch(ordinals).tolist() for system in systems]
+        for i, (chart_key, categories) in enumerate(unique):
+            maya_results = {system.name: system.analysis(kin[i]) for system, kin in zip(systems, kins)}
+            try:
+                analysis = build_analysis(calculator.chart(chart_key), maya_results, list(categories))
+            except ValueError as e:
+                # 日柱の対応範囲外などはその入力だけエラーにする
+                results[unique[i]] = e
+                continue
+            results[unique[i]] = json.dumps(analysis, ensure_ascii=False)
+
+    lines = []
+    for offset, (record, key) in enumerate(zip(records, keys)):
+        head = {"index": first_index + offset}
+        if isinstance(record, dict) and 'id' in record:
+            head["id"] = record['id']
+
+        result = key if isinstance(key, ValueError) else results[key]
+        if isinstance(result, ValueError):
+            lines.append(json.dumps({**head, "status": "error", "message": str(result)}, ensure_ascii=False))
+        else:
+            lines.append(json.dumps(head, ensure_ascii=False)[:-1] + ', "data": ' + result + "}")
+    return "\n".join(lines) + "\n"
+
+
+@app.route('/api/v1/search', methods=['POST'])
+def search():
+    """
+    命式検索エンドポイント（条件に一致する日付を検索）
+
+    Request Body:
+        {
+            "criteria": {
+                "day_pillar": "甲子",
+                "guardian_gods": ["火"],
+                "kin": [1, 2]
+            },
+            "from": "YYYY-MM-DD" (optional, default: 1900-01-01),
+            "to": "YYYY-MM-DD" (optional, default: 2100-12-31),
+            "limit": 1000 (optional)
+        }
+
+    Response:
+        {
+            "request_id": "uuid",
+            "ts": "2025-10-23T...",
+            "data": {
+                "count": 72,
+                "dates": ["1960-10-03", ...],
+                "truncated": false
+            }
+        }
+
+    Note:
+        命式は各日の12:00で計算した値で検索する（時柱は検索条件に指定できない）
+    """
+    data = request.get_json(silent=True)
+
+    if not data or not isinstance(data.get('criteria'), dict):
+        return jsonify({
+            "status": "error",
+            "message": "criteriaは必須です"
+        }), 400
+
+    limit = data.get('limit', 1000)
+    if not isinstance(limit, int) or limit < 0:
+        return jsonify({
+            "status": "error",
+            "message": "limitは0以上の整数で指定してください"
+        }), 400
+
+    try:
+        start = datetime.strptime(data['from'], "%Y-%m-%d").date() if data.get('from') else None
+        end = datetime.strptime(data['to'], "%Y-%m-%d").date() if data.get('to') else None
+    except (TypeError, ValueError):
+        return jsonify({
+            "status": "error",
+            "message": "from/toの形式が不正です（正しい形式: YYYY-MM-DD）"
+        }), 400
+
+    try:
+        result = get_chart_index().search(data['criteria'], start, end, limit)
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    return jsonify({
+        "request_id": str(uuid.uuid4()),
+        "ts": datetime.now().isoformat(),
+        "data": result
+    }), 200
+
+
+@app.route('/api/v1/luck', methods=['POST'])
+def luck_timeline():
+    """
+    大運・年運・月運のタイムラインエンドポイント（NDJSONでストリーミング）
+
+    Request Body:
+        {
+            "birthdate": "YYYY-MM-DD",
+            "birth_time": "HH:MM" (optional, default: "12:00"),
+            "gender": "male" | "female",
+            "years": 100 (optional, 1〜120),
+            "monthly": false (optional)
+        }
+
+    Response (application/x-ndjson, 1行1オブジェクト、時系列順):
+        {"type": "period", "period": 0, "start_age": 0, "end_age": 2, "gan": "己", "shi": "卯", "score": 0.735}
+        {"type": "year", "year": 1985, "age": 0, "period": 0, "start": "1985-02-04T06:12", ...}
+        {"type": "month", "year": 1985, "month": 0, "start": "1985-02-04T06:12", ...}
+        ...
+
+    Note:
+        大運ごとに計算して送信するため、最初の10年分はすぐに届く
+    """
+    data = request.get_json(silent=True)
+
+    if not data or not data.get('birthdate'):
+        return jsonify({
+            "status": "error",
+            "message": "birthdateは必須です（形式: YYYY-MM-DD）"
+        }), 400
+
+    years = data.get('years', 100)
+    if not isinstance(years, int) or not 1 <= years <= 120:
+        return jsonify({
+            "status": "error",
+            "message": "yearsは1〜120の整数で指定してください"
+        }), 400
+
+    try:
+        timeline = calculator.luck_timeline(
+            data['birthdate'],
+            data.get('birth_time', '12:00'),
+            data.get('gender'),
+            years=years,
+            monthly=bool(data.get('monthly', False))
+        )
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    def generate():
+        for entry in timeline:
+            yield json.dumps(entry, ensure_ascii=False) + "\n"
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+@app.route('/api/v1/calendar', methods=['GET'])
+def kin_calendar():
+    """
+    期間内の日ごとのKin・太陽の紋章・銀河の音・日柱のエンドポイント（ストリーミング）
+
+    Query Parameters:
+        from: 開始日（YYYY-MM-DD）
+        to: 終了日（YYYY-MM-DD、この日を含む）
+        system: 暦法名（optional, default: "dreamspell"。カンマ区切りまたは複数指定で複数の暦法）
+        format: "ndjson"（既定、1行1日）または "json"（日の配列）
+
+    Response (application/x-ndjson):
+        {"date": "2024-01-01", "kin": 40, "solar_seal": "黄色い太陽", "tone": 1, "day_pillar": "甲子"}
+        ...
+        （暦法を複数指定した場合は "systems": {方式名: {"kin", "solar_seal", "tone"}} を追加）
+
+    Note:
+        1年分ずつ計算して送信するため、長い期間でもメモリ使用量は一定で、最初の行はすぐに届く
+    """
+    try:
+        start = datetime.strptime(request.args.get('from', ''), "%Y-%m-%d").date()
+        end = datetime.strptime(request.args.get('to', ''), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({
+            "status": "error",
+            "message": "fromとtoは必須です（形式: YYYY-MM-DD）"
+        }), 400
+
+    if start < DAY_TABLE_START or end > DAY_TABLE_END or start > end:
+        return jsonify({
+            "status": "error",
+            "message": f"期間は{DAY_TABLE_START.isoformat()}〜{DAY_TABLE_END.isoformat()}の範囲で指定してください"
+        }), 400
+
+    output_format = request.args.get('format', 'ndjson')
+    if output_format not in ('ndjson', 'json'):
+        return jsonify({
+            "status": "error",
+            "message": "formatはndjsonまたはjsonで指定してください"
+        }), 400
+
+    names = [name for value in request.args.getlist('system') for name in value.split(',') if name]
+    try:
+        systems = get_calendar_systems(names or DEFAULT_CALENDAR_SYSTEM)
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    rows = iter_calendar(start, end, systems, calculator)
+
+    if output_format == 'ndjson':
+        def generate():
+            for row in rows:
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    def generate_array():
+        separator = "["
+        for row in rows:
+            yield separator + json.dumps(row, ensure_ascii=False)
+            separator = ","
+        yield "]"
+
+    return Response(generate_array(), mimetype='application/json')
+
+
+# 相性計算の1リクエストあたりの最大人数
+MAX_COMPATIBILITY_PEOPLE = 5000
+
+
+@app.route('/api/v1/compatibility', methods=['POST'])
+def compatibility():
+    """
+    相性計算エンドポイント（グループ内の各人について相性の良い相手を検索）
+
+    Request Body:
+        {
+            "people": [
+                {"id": "a", "birthdate": "YYYY-MM-DD", "birth_time": "HH:MM" (optional)},
+                ...
+            ],
+            "top_k": 3 (optional)
+        }
+
+    Response:
+        {
+            "request_id": "uuid",
+            "ts": "2025-10-23T...",
+            "data": {
+                "matches": [
+                    {"id": "a", "partners": [{"id": "b", "score": 0.585}, ...]},
+                    ...
+                ],
+                "detail": {...}（2人の場合のみ、相性の内訳）
+            }
+        }
+    """
+    data = request.get_json(silent=True)
+    people = data.get('people') if data else None
+
+    if not isinstance(people, list) or not 2 <= len(people) <= MAX_COMPATIBILITY_PEOPLE:
+        return jsonify({
+            "status": "error",
+            "message": f"peopleは2〜{MAX_COMPATIBILITY_PEOPLE}人のリストで指定してください"
+        }), 400
+
+    if not all(isinstance(person, dict) and person.get('birthdate') for person in people):
+        return jsonify({
+            "status": "error",
+            "message": "各人のbirthdateは必須です（形式: YYYY-MM-DD）"
+        }), 400
+
+    top_k = data.get('top_k', 3)
+    if not isinstance(top_k, int) or top_k < 1:
+        return jsonify({
+            "status": "error",
+            "message": "top_kは1以上の整数で指定してください"
+        }), 400
+
+    engine = get_compatibility_engine()
+    try:
+        profiles = engine.build_profiles(
+            [person['birthdate'] for person in people],
+            [person.get('birth_time', '12:00') for person in people]
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    ids = [person.get('id', i) for i, person in enumerate(people)]
+    indices, scores = engine.top_k(profiles, top_k)
+
+    result = {
+        "matches": [
+            {
+                "id": ids[i],
+                "partners": [
+                    {"id": ids[j], "score": round(score, 3)}
+                    for j, score in zip(indices[i].tolist(), scores[i].tolist())
+                ]
+            }
+            for i in range(len(people))
+        ]
+    }
+    if len(people) == 2:
+        result["detail"] = engine.pair_detail(profiles, 0, 1)
+
+    return jsonify({
+        "request_id": str(uuid.uuid4()),
+        "ts": datetime.now().isoformat(),
+        "data": result
+    }), 200
+
+
+def parse_analyze_input(data) -> tuple:
+    """
+    分析の入力（birthdate, birth_time, categories）を検証
+
+    Args:
+        data: リクエストボディ（1件分）
+
+    Returns:
+        (birthdate, birthtime, categories)
+
+    Raises:
+        ValueError: 入力が不正な場合（メッセージはそのままレスポンスに使う）
+    """
+    if not isinstance(data, dict):
+        raise ValueError("入力はオブジェクトで指定してください")
+
+    birthdate = data.get('birthdate')
+    birthtime = data.get('birth_time', '12:00')
+    categories = data.get('categories', ['仕事'])
+
+    if not birthdate:
+        raise ValueError("birthdateは必須です（形式: YYYY-MM-DD）")
+
+    # 日時形式の検証
+    try:
+        _parse_datetime(birthdate, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ValueError("birthdateの形式が不正です（正しい形式: YYYY-MM-DD）")
+
+    try:
+        _parse_datetime(birthtime, "%H:%M")
+    except (TypeError, ValueError):
+        raise ValueError("birth_timeの形式が不正です（正しい形式: HH:MM）")
+
+    if not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+        raise ValueError("categoriesは文字列の配列で指定してください")
+
+    return birthdate, birthtime, categories
+
+
+def build_analysis(suanming_result, maya_results: dict, categories: list) -> dict:
+    """
+    分析結果（suanming・maya・scores・insights）を組み立てる
+
+    Args:
+        suanming_result: 命式（Chart）
+        maya_results: {暦法名: マヤ暦の分析結果}（先頭の暦法でスコア・インサイトを計算）
+        categories: インサイトのカテゴリ
+
+    Returns:
+        分析結果（暦法が複数の場合は maya_systems を含む）
+    """
+    maya_result = next(iter(maya_results.values()))
+    result = {
+        "suanming": suanming_result.to_dict(),
+        # マヤ暦の結果は読み取り専用の共有行のため、JSONに変換できる辞書にする
+        "maya": dict(maya_result),
+        # 統合スコアの計算
+        "scores": calculate_scores(suanming_result, maya_result),
+        # インサイトの生成
+        "insights": generate_insights(suanming_result, maya_result, categories),
+    }
+    if len(maya_results) > 1:
+        result["maya_systems"] = {name: dict(row) for name, row in maya_results.items()}
+    return result
+
+
 def calculate_scores(suanming_result: dict, maya_result: dict) -> dict:
     """統合スコアの計算"""
     five_elements = suanming_result['five_elements_score']
@@ -2,27 +2,26 @@
 マヤ暦計算モジュール（ツォルキン260日周期）
 
 マヤ暦のKin番号、太陽の紋章、銀河の音、ウェイブスペルを計算します。
+
+基準日（1987年7月26日 = Kin 1）から2月29日も1日と数える方式で、
+計算は calendar_systems の "plain" 方式に委譲する（紋章などの定義は maya_improved と共通）。
 """
 
-from datetime import datetime, date
 from typing import Dict
 
-# マヤ暦の基準日（グレゴリオ暦 1987年7月26日 = Kin 1）
-MAYA_BASE_DATE = date(1987, 7, 26)
-
-# 太陽の紋章（20種類）
-SOLAR_SEALS = [
-    "赤い竜", "白い風", "青い夜", "黄色い種", "赤い蛇",
-    "白い世界の橋渡し", "青い手", "黄色い星", "赤い月", "白い犬",
-    "青い猿", "黄色い人", "赤い空歩く人", "白い魔法使い", "青い鷲",
-    "黄色い戦士", "赤い地球", "白い鏡", "青い嵐", "黄色い太陽"
-]
+from calendar_systems import get_calendar_system
+from maya_improved import (  # noqa: F401
+    GALACTIC_TONES,
+    MAYA_BASE_DATE,
+    SOLAR_SEALS,
+    WAVESPELLS,
+    get_galactic_tone,
+    get_solar_seal,
+    get_wavespell,
+)
 
-# ウェイブスペル（20種類、太陽の紋章と同じ）
-WAVESPELLS = SOLAR_SEALS
-
-# 銀河の音（13種類）
-GALACTIC_TONES = list(range(1, 14))
+# この方式の暦法名（calendar_systems に登録済み）
+CALENDAR_SYSTEM = "plain"
 
 
 def calculate_kin(birthdate: str) -> int:
@@ -35,62 +34,7 @@ def calculate_kin(birthdate: str) -> int:
     Returns:
         Kin番号（1-260）
     """
-    birth = datetime.strptime(birthdate, "%Y-%m-%d").date()
-
-    # 基準日からの経過日数
-    days_diff = (birth - MAYA_BASE_DATE).days
-
-    # 260日周期でKin番号を計算（1-260の範囲）
-    kin = (days_diff % 260) + 1
-
-    # 負の数になる場合の調整
-    if kin <= 0:
-        kin += 260
-
-    return kin
-
-
-def get_solar_seal(kin: int) -> str:
-    """
-    Kin番号から太陽の紋章を取得
-
-    Args:
-        kin: Kin番号（1-260）
-
-    Returns:
-        太陽の紋章
-    """
-    index = (kin - 1) % 20
-    return SOLAR_SEALS[index]
-
-
-def get_galactic_tone(kin: int) -> int:
-    """
-    Kin番号から銀河の音を取得
-
-    Args:
-        kin: Kin番号（1-260）
-
-    Returns:
-        銀河の音（1-13）
-    """
-    tone = ((kin - 1) % 13) + 1
-    return tone
-
-
-def get_wavespell(kin: int) -> str:
-    """
-    Kin番号からウェイブスペルを取得
-
-    Args:
-        kin: Kin番号（1-260）
-
-    Returns:
-        ウェイブスペル
-    """
-    # ウェイブスペルは13日ごとに変わる（20ウェイブスペル × 13日 = 260日）
-    wavespell_index = ((kin - 1) // 13) % 20
-    return WAVESPELLS[wavespell_index]
+    return get_calendar_system(CALENDAR_SYSTEM).kin(birthdate)
 
 
 def analyze_maya(birthdate: str) -> Dict:
@@ -103,19 +47,13 @@ def analyze_maya(birthdate: str) -> Dict:
     Returns:
         マヤ暦の分析結果
     """
-    # Kin番号の計算
     kin = calculate_kin(birthdate)
 
-    # 各要素の取得
-    solar_seal = get_solar_seal(kin)
-    tone = get_galactic_tone(kin)
-    wavespell = get_wavespell(kin)
-
     return {
         "kin": kin,
-        "solar_seal": solar_seal,
-        "tone": tone,
-        "wavespell": wavespell
+        "solar_seal": get_solar_seal(kin),
+        "tone": get_galactic_tone(kin),
+        "wavespell": get_wavespell(kin)
     }
 
 
@@ -6,14 +6,50 @@ Dreamspell（13の月暦）方式で実装
 - 基準日: 1987年7月26日 = Kin1
 - 閏年の2月29日を除外して計算
 - ユリウス通日（JDN）を介した正確な換算
+
+Kin換算表ファイル（kin_table.bin）:
+    暦法ごとの1日1つのKin番号（uint16）を日付の序数順に並べたバイナリファイル。
+    mmapで開くため、gunicornの各ワーカーやバッチ処理はOSのページキャッシュを共有し、
+    配列はファイルをそのまま参照する（コピーしない）。生成は calendar_systems.py を実行する。
+
+    ヘッダー32バイト: マジック(8) + バージョン uint32 + 開始日の序数 int32 + 日数 int32
+                      + 暦法の数 uint32 + 予約(8)
+    暦法名 16バイト（ASCII、NUL埋め） × 暦法の数
+    Kin番号 uint16 × 日数 × 暦法の数（暦法ごとに連続）
 """
 
+import mmap
+import os
+import struct
+import numpy as np
 from datetime import datetime, date
-from typing import Dict
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
 
 # マヤ暦の基準日（グレゴリオ暦 1987年7月26日 = Kin 1）
 MAYA_BASE_DATE = date(1987, 7, 26)
 
+# GMT相関：ロングカウント起点（13.0.0.0.0）のユリウス通日
+GMT_CORRELATION = 584283
+
+# 一括計算で指定できる方式
+MAYA_SYSTEMS = ("dreamspell", "classical")
+
+# Kin換算表ファイルのパス（環境変数 KIN_TABLE_PATH で変更できる）
+KIN_TABLE_PATH = Path(__file__).parent / "kin_table.bin"
+
+KIN_TABLE_MAGIC = b"KINTABLE"
+KIN_TABLE_VERSION = 1
+
+_KIN_TABLE_HEADER = struct.Struct("<8sIiiI8x")
+_KIN_TABLE_NAME = struct.Struct("16s")
+
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# ユリウス通日 − date.toordinal()
+_JDN_ORDINAL_OFFSET = 1721425
+
 # 太陽の紋章（20種類）
 SOLAR_SEALS = [
     "赤い竜", "白い風", "青い夜", "黄色い種", "赤い蛇",
@@ -42,10 +78,22 @@ def is_leap_year(year: int) -> bool:
     return (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0)
 
 
+def _leap_years_through(year: int) -> int:
+    """西暦1年から指定年まで（指定年を含む）の閏年の数（4/100/400年規則）"""
+    return year // 4 - year // 100 + year // 400
+
+
+def _feb29_before(d: date) -> int:
+    """指定日より前（指定日を含まない）にある2月29日の回数（西暦1年から数えた通算）"""
+    return _leap_years_through(d.year - 1) + (d.month > 2 and is_leap_year(d.year))
+
+
 def count_leap_days_between(start_date: date, end_date: date) -> int:
     """
     2つの日付間の2月29日の回数を数える（Dreamspell方式）
 
+    両端の日付を含む。閏年の数を4/100/400年規則で算出するため、期間の長さによらず定数時間。
+
     Args:
         start_date: 開始日
         end_date: 終了日
@@ -56,14 +104,9 @@ def count_leap_days_between(start_date: date, end_date: date) -> int:
     if start_date > end_date:
         start_date, end_date = end_date, start_date
 
-    leap_days = 0
-    for year in range(start_date.year, end_date.year + 1):
-        if is_leap_year(year):
-            feb29 = date(year, 2, 29)
-            if start_date <= feb29 <= end_date:
-                leap_days += 1
-
-    return leap_days
+    # 終了日以前（終了日を含む）の回数 − 開始日より前の回数
+    through_end = _feb29_before(end_date) + (end_date.month == 2 and end_date.day == 29)
+    return through_end - _feb29_before(start_date)
 
 
 def calculate_kin(birthdate: str) -> int:
@@ -103,6 +146,231 @@ def calculate_kin(birthdate: str) -> int:
     return kin
 
 
+def _to_ordinals(birthdates) -> np.ndarray:
+    """datetime64 または date.toordinal() の整数序数の配列を序数の配列に揃える"""
+    birthdates = np.asarray(birthdates)
+    if np.issubdtype(birthdates.dtype, np.datetime64):
+        return birthdates.astype('datetime64[D]').astype(np.int64) + _UNIX_EPOCH_ORDINAL
+    return birthdates.astype(np.int64)
+
+
+def date_to_jdn_array(birthdates) -> np.ndarray:
+    """
+    日付の配列をユリウス通日（JDN）の配列に変換（date_to_jdn の一括版）
+
+    Args:
+        birthdates: 日付の配列（datetime64 または date.toordinal() の整数序数）
+
+    Returns:
+        ユリウス通日の配列
+    """
+    return _to_ordinals(birthdates) + _JDN_ORDINAL_OFFSET
+
+
+def _feb29_through(ordinals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    序数の日付以前（当日を含む）にある2月29日の回数（西暦1年から数えた通算）と、当日が2月29日か
+
+    3月1日始まりの年（2月29日が年末になる）に換算し、400年周期で年と年内の日を求める。
+    """
+    days = ordinals + 305  # 0年3月1日からの経過日数
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    year = era * 400 + year_of_era
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    is_feb29 = day_of_year == 365
+    return year // 4 - year // 100 + year // 400 + is_feb29, is_feb29
+
+
+def calculate_kin_batch(birthdates, system: str = "dreamspell") -> np.ndarray:
+    """
+    日付の配列からKin番号を一括計算（NumPyベクトル演算）
+
+    Dreamspell方式は calculate_kin、古典方式は analyze_maya_classical と同じ結果になる
+    （Dreamspell方式の2月29日は、基準日より後なら2月28日、前なら3月1日と同じKin）。
+
+    Args:
+        birthdates: 日付の配列（datetime64 または date.toordinal() の整数序数）
+        system: "dreamspell"（13の月暦）または "classical"（GMT相関）
+
+    Returns:
+        Kin番号（1-260）の配列
+
+    Raises:
+        ValueError: 未対応の方式の場合
+    """
+    ordinals = _to_ordinals(birthdates)
+    jdn = ordinals + _JDN_ORDINAL_OFFSET
+
+    if system == "dreamspell":
+        # 基準日からの経過日数から、間にある2月29日を除外
+        # （基準日より前は当日の2月29日を含めて数える。calculate_kin と同じ）
+        base_leap_days = _feb29_through(np.array([MAYA_BASE_DATE.toordinal()]))[0][0]
+        days_diff = jdn - date_to_jdn(MAYA_BASE_DATE)
+        leap_days, is_feb29 = _feb29_through(ordinals)
+        leap_days = leap_days - base_leap_days
+        effective_days = days_diff - np.where(days_diff >= 0, leap_days, leap_days - is_feb29)
+    elif system == "classical":
+        effective_days = jdn - GMT_CORRELATION
+    else:
+        raise ValueError(f"未対応の方式です: {system}（{' / '.join(MAYA_SYSTEMS)}）")
+
+    return (effective_days % 260 + 1).astype(np.uint16)
+
+
+def analyze_maya_batch(birthdates, system: str = "dreamspell") -> Dict[str, np.ndarray]:
+    """
+    マヤ暦の一括分析（NumPyベクトル演算）
+
+    Args:
+        birthdates: 日付の配列（datetime64 または date.toordinal() の整数序数）
+        system: "dreamspell"（13の月暦）または "classical"（GMT相関）
+
+    Returns:
+        列指向の分析結果:
+        {
+            "kin": Kin番号（1-260）,
+            "seal": 太陽の紋章のインデックス（SOLAR_SEALSの添字）,
+            "tone": 銀河の音（1-13）,
+            "wavespell": ウェイブスペルのインデックス（WAVESPELLSの添字）
+        }
+
+    Raises:
+        ValueError: 未対応の方式の場合
+    """
+    kin = calculate_kin_batch(birthdates, system)
+    index = kin - 1
+    return {
+        "kin": kin,
+        "seal": (index % 20).astype(np.uint8),
+        "tone": (index % 13 + 1).astype(np.uint8),
+        "wavespell": (index // 13 % 20).astype(np.uint8),
+    }
+
+
+class KinTableFile:
+    """Kin換算表ファイル（mmapで参照）"""
+
+    def __init__(self, path: Path = KIN_TABLE_PATH):
+        """
+        初期化
+
+        Args:
+            path: ファイルのパス
+
+        Raises:
+            ValueError: ファイル形式が不正な場合
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _KIN_TABLE_HEADER.size:
+            raise ValueError(f"Kin換算表ファイルの形式が不正です: {path}")
+        magic, version, self.start_ordinal, self.days, count = _KIN_TABLE_HEADER.unpack_from(self._mmap, 0)
+        names_size = count * _KIN_TABLE_NAME.size
+        if (magic != KIN_TABLE_MAGIC or version != KIN_TABLE_VERSION or self.days <= 0
+                or len(self._mmap) != _KIN_TABLE_HEADER.size + names_size + count * self.days * 2):
+            raise ValueError(f"Kin換算表ファイルの形式が不正です: {path}")
+
+        offset = _KIN_TABLE_HEADER.size + names_size
+        self._arrays: Dict[str, np.ndarray] = {}
+        for i in range(count):
+            name, = _KIN_TABLE_NAME.unpack_from(self._mmap, _KIN_TABLE_HEADER.size + i * _KIN_TABLE_NAME.size)
+            self._arrays[name.rstrip(b"\0").decode('ascii')] = np.frombuffer(
+                self._mmap, dtype='<u2', count=self.days, offset=offset + i * self.days * 2
+            )
+
+    @property
+    def systems(self) -> Tuple[str, ...]:
+        """収録されている暦法名"""
+        return tuple(self._arrays)
+
+    def kin_array(self, system: str, start: date, end: date) -> Optional[np.ndarray]:
+        """
+        暦法の期間内のKin番号の配列（ファイルを直接参照する読み取り専用の配列）
+
+        Args:
+            system: 暦法名
+            start: 開始日
+            end: 終了日（この日を含む）
+
+        Returns:
+            start からの日数を添字とするKin番号の配列（暦法が未収録、または期間外の場合はNone）
+        """
+        kin = self._arrays.get(system)
+        first = start.toordinal() - self.start_ordinal
+        last = end.toordinal() - self.start_ordinal
+        if kin is None or first < 0 or last >= self.days:
+            return None
+        return kin[first:last + 1]
+
+
+def write_kin_table_file(path: Path, start: date, systems: Dict[str, np.ndarray]) -> int:
+    """
+    Kin換算表ファイルを書き出す
+
+    Args:
+        path: 出力先のパス
+        start: 開始日（配列の先頭の日付）
+        systems: {暦法名: Kin番号の配列}（全て同じ長さ）
+
+    Returns:
+        日数
+
+    Raises:
+        ValueError: 配列の長さが揃っていない、または暦法名が長すぎる場合
+    """
+    days = {len(kin) for kin in systems.values()}
+    if len(days) != 1:
+        raise ValueError("暦法ごとの配列の長さが揃っていません")
+    days, = days
+
+    header = _KIN_TABLE_HEADER.pack(KIN_TABLE_MAGIC, KIN_TABLE_VERSION, start.toordinal(), days, len(systems))
+    if any(len(name) > _KIN_TABLE_NAME.size for name in systems):
+        raise ValueError(f"暦法名は{_KIN_TABLE_NAME.size}文字以内にしてください")
+    names = b"".join(_KIN_TABLE_NAME.pack(name.encode('ascii')) for name in systems)
+
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(names)
+        for kin in systems.values():
+            f.write(np.asarray(kin, dtype='<u2').tobytes())
+    os.replace(tmp_path, path)
+    return days
+
+
+def load_kin_table_file(path: Optional[Path] = None) -> Optional[KinTableFile]:
+    """
+    Kin換算表ファイルを読み込む
+
+    Args:
+        path: ファイルのパス（省略時は環境変数 KIN_TABLE_PATH、なければ KIN_TABLE_PATH）
+
+    Returns:
+        KinTableFile（ファイルが存在しない・形式が不正な場合はNone。呼び出し側は都度計算する）
+    """
+    if path is None:
+        path = os.getenv('KIN_TABLE_PATH', KIN_TABLE_PATH)
+    try:
+        return KinTableFile(path)
+    except (OSError, ValueError):
+        return None
+
+
+# 共有インスタンス（初回参照時に読み込む。ファイルがなければ False）
+_kin_table_file = None
+
+
+def get_kin_table_file() -> Optional[KinTableFile]:
+    """Kin換算表ファイルを取得（プロセス内で共有。ファイルがなければNone）"""
+    global _kin_table_file
+    if _kin_table_file is None:
+        _kin_table_file = load_kin_table_file() or False
+    return _kin_table_file or None
+
+
 def get_solar_seal(kin: int) -> str:
     """
     Kin番号から太陽の紋章を取得
@@ -152,7 +420,60 @@ def get_wavespell(kin: int) -> str:
     return WAVESPELLS[wavespell_index]
 
 
-def analyze_maya(birthdate: str) -> Dict:
+# ガイドキンの紋章番号のずれ（銀河の音 → ずれ）：音1・6・11は自分自身
+_GUIDE_OFFSETS = {1: 0, 2: 12, 3: 4, 4: -4, 5: 8}
+
+
+def _kin_from_seal_tone(seal_index: int, tone: int) -> int:
+    """紋章のインデックスと銀河の音からKin番号を求める（mod 20 と mod 13 の中国剰余定理）"""
+    # 13 * 17 ≡ 1 (mod 20)、20 * 2 ≡ 1 (mod 13) のため、第1項は mod 20 で紋章、mod 13 で0、
+    # 第2項は mod 13 で音 − 1、mod 20 で0 になる
+    return (seal_index * 13 * 17 + (tone - 1) * 20 * 2) % 260 + 1
+
+
+def _build_kin_table() -> tuple:
+    """
+    Kin 1〜260 のオラクルを含む分析結果の表を作成（インポート時に1度だけ）
+
+    紋章番号は 赤い竜=1 … 黄色い太陽=20 とする（SOLAR_SEALSの添字+1）。
+    - ガイド：同じ音・同じ色の紋章（音に応じて紋章番号をずらす）
+    - 類似：同じ音、紋章番号の和が19（mod 20）
+    - 反対：同じ音、紋章番号の差が10
+    - 神秘：紋章番号の和が21（mod 20）、音の和が14（Kinの和が261）
+    """
+    table = []
+    for kin in range(1, 261):
+        seal = (kin - 1) % 20
+        tone = (kin - 1) % 13 + 1
+
+        guide = _kin_from_seal_tone((seal + _GUIDE_OFFSETS[(tone - 1) % 5 + 1]) % 20, tone)
+        analog = _kin_from_seal_tone((17 - seal) % 20, tone)
+        antipode = _kin_from_seal_tone((seal + 10) % 20, tone)
+        occult = 261 - kin
+
+        table.append(MappingProxyType({
+            "kin": kin,
+            "solar_seal": SOLAR_SEALS[seal],
+            "tone": tone,
+            "wavespell": get_wavespell(kin),
+            "guide_kin": guide,
+            "guide_seal": get_solar_seal(guide),
+            "analog_kin": analog,
+            "analog_seal": get_solar_seal(analog),
+            "antipode_kin": antipode,
+            "antipode_seal": get_solar_seal(antipode),
+            "occult_kin": occult,
+            "occult_seal": get_solar_seal(occult),
+            "system": "Dreamspell (13 Moon Calendar)"
+        }))
+    return tuple(table)
+
+
+# Kin番号 − 1 → 分析結果（読み取り専用の行をそのまま共有する。変更する場合は呼び出し側でコピーする）
+KIN_TABLE = _build_kin_table()
+
+
+def analyze_maya(birthdate: str) -> Mapping:
     """
     マヤ暦の総合分析（Dreamspell方式）
 
@@ -160,23 +481,17 @@ def analyze_maya(birthdate: str) -> Dict:
         birthdate: 生年月日（YYYY-MM-DD形式）
 
     Returns:
-        マヤ暦の分析結果
+        マヤ暦の分析結果（KIN_TABLE の読み取り専用の行。変更する場合は dict() でコピーする）:
+        {
+            "kin", "solar_seal", "tone": 銀河の音（ウェイブスペル内の位置と同じ 1-13）, "wavespell",
+            "guide_kin", "guide_seal": ガイドキン,
+            "analog_kin", "analog_seal": 類似キン,
+            "antipode_kin", "antipode_seal": 反対キン,
+            "occult_kin", "occult_seal": 神秘キン,
+            "system"
+        }
     """
-    # Kin番号の計算
-    kin = calculate_kin(birthdate)
-
-    # 各要素の取得
-    solar_seal = get_solar_seal(kin)
-    tone = get_galactic_tone(kin)
-    wavespell = get_wavespell(kin)
-
-    return {
-        "kin": kin,
-        "solar_seal": solar_seal,
-        "tone": tone,
-        "wavespell": wavespell,
-        "system": "Dreamspell (13 Moon Calendar)"
-    }
+    return KIN_TABLE[calculate_kin(birthdate) - 1]
 
 
 def analyze_maya_classical(birthdate: str) -> Dict:
@@ -199,7 +514,7 @@ def analyze_maya_classical(birthdate: str) -> Dict:
     # GMT相関の起点（紀元前3114年8月11日）からの通算日数
     # 簡易計算: 現代の日付から基準点までの日数
     # 注: 実運用では正確なJDN計算ライブラリを使用すべき
-    gmt_base_jdn = 584283
+    gmt_base_jdn = GMT_CORRELATION
     birth_jdn = date_to_jdn(birth)
 
     days_from_gmt = birth_jdn - gmt_base_jdn
@@ -0,0 +1,86 @@
+"""
+APIレスポンスのキャッシュモジュール
+
+総合分析のレスポンスは request_id・ts を除けば、命式のキー（日付・時支・節気）・暦法・
+カテゴリ・ナレッジのバージョンだけで決まる。キーごとにシリアライズ済みの "data" と
+ETag を上限付きのLRUキャッシュに保持し、同じ入力の再リクエストではJSONの組み立て
+（request_id・ts の付加）か、If-None-Match が一致すれば304の応答だけを行う。
+
+ETag はキーとバージョンのハッシュのため、プロセスやサーバーが違っても同じ値になり、
+ナレッジやスコア計算のバージョンが変わると全て変わる。
+"""
+
+import hashlib
+from functools import lru_cache
+from typing import Callable, Hashable, Tuple
+
+# キャッシュするレスポンスの最大件数
+RESPONSE_CACHE_SIZE = 4096
+
+
+class ResponseCache:
+    """シリアライズ済みレスポンスのLRUキャッシュ"""
+
+    def __init__(
+        self,
+        render: Callable[[Hashable], str],
+        version: str,
+        cache_size: int = RESPONSE_CACHE_SIZE
+    ):
+        """
+        初期化
+
+        Args:
+            render: キーからシリアライズ済みの "data"（JSON文字列）を作る関数
+            version: ナレッジ・計算方法のバージョン（ETagに含める）
+            cache_size: キャッシュの最大件数（0で無効、Noneで無制限）
+        """
+        self.version = version
+        self._render = render
+
+        # キー → (シリアライズ済みの "data", ETag)
+        self._cache = lru_cache(maxsize=cache_size)(self._compute)
+
+    def cache_info(self):
+        """
+        キャッシュの統計を取得
+
+        Returns:
+            (hits, misses, maxsize, currsize) の名前付きタプル
+        """
+        return self._cache.cache_info()
+
+    def cache_clear(self) -> None:
+        """キャッシュを消去"""
+        self._cache.cache_clear()
+
+    def etag(self, key: Hashable) -> str:
+        """
+        キーのETag（引用符なし）
+
+        Args:
+            key: レスポンスのキー（int・str・タプルの組み合わせ）
+
+        Returns:
+            バージョンとキーのSHA-256（先頭32桁）
+        """
+        return hashlib.sha256(f"{self.version}\0{key!r}".encode('utf-8')).hexdigest()[:32]
+
+    def _compute(self, key: Hashable) -> Tuple[str, str]:
+        """キーのレスポンスを作る（キャッシュにない場合のみ呼ばれる）"""
+        return self._render(key), self.etag(key)
+
+    def get(self, key: Hashable) -> Tuple[str, str]:
+        """
+        キーのレスポンスを取得
+
+        Args:
+            key: レスポンスのキー
+
+        Returns:
+            (シリアライズ済みの "data", ETag)
+
+        Raises:
+            render の例外（ValueError など。キャッシュしない）
+        """
+        return self._cache(key)
@@ -0,0 +1,437 @@
+"""
+二十四節気テーブルモジュール
+
+1800〜2200年の二十四節気の正確な日時（UTC基準のエポック分）を
+整列済みの int64 配列としてバイナリファイルに格納し、mmapで読み込んで
+二分探索で参照する。
+
+- リクエスト時は二分探索のみで、天文計算は行わない
+- テーブルは `python sekki.py` で再生成する（VSOP87短縮級数による太陽黄経）
+- 入力日時は日本標準時（JST, UTC+9）として扱う
+
+ファイル形式（リトルエンディアン）:
+    ヘッダー24バイト: マジック(8) + 開始年 int32 + 先頭節気番号 int32 + 件数 int32 + 予約 int32
+    本体: 節気の瞬間（1970-01-01 00:00 UTCからの経過分） int64 × 件数
+"""
+
+import math
+import mmap
+import struct
+from bisect import bisect_right
+from datetime import date
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# テーブルファイルのパス
+SEKKI_TABLE_PATH = Path(__file__).parent / "sekki_table.bin"
+
+# ファイルヘッダー
+SEKKI_MAGIC = b"SEKKI\x00\x01\x00"
+_HEADER = struct.Struct("<8siiii")
+
+# テーブルの対象年範囲
+SEKKI_START_YEAR = 1800
+SEKKI_END_YEAR = 2200
+
+# 日本標準時のUTCオフセット（分）
+JST_OFFSET_MINUTES = 9 * 60
+
+# 二十四節気（太陽黄経15度ごと、春分=0度を番号0とする）
+SEKKI_NAMES = [
+    "春分", "清明", "穀雨", "立夏", "小満", "芒種",
+    "夏至", "小暑", "大暑", "立秋", "処暑", "白露",
+    "秋分", "寒露", "霜降", "立冬", "小雪", "大雪",
+    "冬至", "小寒", "大寒", "立春", "雨水", "啓蟄",
+]
+
+# 立春の節気番号（黄経315度）
+RISSHUN = 21
+
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_epoch_minutes(year: int, month: int, day: int, hour: int = 0, minute: int = 0) -> int:
+    """
+    日本標準時の日時をUTC基準のエポック分に変換
+
+    Args:
+        year: 年
+        month: 月
+        day: 日
+        hour: 時（0-23）
+        minute: 分（0-59）
+
+    Returns:
+        1970-01-01 00:00 UTC からの経過分
+    """
+    days = date(year, month, day).toordinal() - _UNIX_EPOCH_ORDINAL
+    return days * 1440 + hour * 60 + minute - JST_OFFSET_MINUTES
+
+
+class SekkiTable:
+    """二十四節気テーブル（mmapで読み込み、二分探索で参照）"""
+
+    def __init__(self, path: Path = SEKKI_TABLE_PATH):
+        """
+        初期化
+
+        Args:
+            path: テーブルファイルのパス
+
+        Raises:
+            ValueError: ファイル形式が不正な場合
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.start_year, self.first_term, count, _ = _HEADER.unpack_from(self._mmap, 0)
+        if magic != SEKKI_MAGIC or len(self._mmap) != _HEADER.size + count * 8:
+            raise ValueError(f"節気テーブルの形式が不正です: {path}")
+
+        # ヘッダー以降を int64 配列として参照（コピーなし）
+        self.instants = memoryview(self._mmap)[_HEADER.size:].cast('q')
+
+    def __len__(self) -> int:
+        return len(self.instants)
+
+    def position(self, epoch_minute: int) -> int:
+        """
+        指定時刻の直前（同時刻を含む）に来た節気のテーブル内位置を取得
+
+        Args:
+            epoch_minute: UTC基準のエポック分
+
+        Returns:
+            テーブル内の位置（0始まり）
+
+        Raises:
+            ValueError: テーブルの対応範囲外の場合
+        """
+        pos = bisect_right(self.instants, epoch_minute) - 1
+        if pos < 0 or pos >= len(self.instants) - 1:
+            raise ValueError("節気テーブルの対応範囲外です")
+        return pos
+
+    def term_at(self, position: int) -> int:
+        """
+        テーブル内の位置から節気番号（0=春分 … 21=立春 … 23=啓蟄）を取得
+
+        Args:
+            position: テーブル内の位置
+
+        Returns:
+            節気番号（0-23）
+        """
+        return (self.first_term + position) % 24
+
+    def solar_year(self, position: int) -> int:
+        """
+        テーブル内の位置から節気年（立春で切り替わる年）を取得
+
+        Args:
+            position: テーブル内の位置
+
+        Returns:
+            節気年（西暦）
+        """
+        return self.start_year + (self.first_term - RISSHUN + position) // 24
+
+    def month_index(self, position: int) -> int:
+        """
+        テーブル内の位置から月支インデックス（寅月=0 … 丑月=11）を取得
+
+        Args:
+            position: テーブル内の位置
+
+        Returns:
+            月支インデックス（0-11）
+        """
+        return (self.term_at(position) - RISSHUN) % 24 // 2
+
+    def month_start_position(self, solar_year: int, month_index: int) -> int:
+        """
+        節気年・月支インデックスから、その月の節入り（節）のテーブル内位置を取得
+
+        Args:
+            solar_year: 節気年（西暦）
+            month_index: 月支インデックス（寅月=0 … 丑月=11）
+
+        Returns:
+            テーブル内の位置（0始まり）
+
+        Raises:
+            ValueError: テーブルの対応範囲外の場合
+        """
+        pos = (solar_year - self.start_year) * 24 + RISSHUN - self.first_term + month_index * 2
+        if pos < 0 or pos >= len(self.instants):
+            raise ValueError("節気テーブルの対応範囲外です")
+        return pos
+
+    def lookup(self, year: int, month: int, day: int, hour: int = 0, minute: int = 0) -> Tuple[int, int]:
+        """
+        日本標準時の日時から節気年と月支インデックスを取得
+
+        Args:
+            year: 年
+            month: 月
+            day: 日
+            hour: 時（0-23）
+            minute: 分（0-59）
+
+        Returns:
+            (節気年, 月支インデックス)
+        """
+        pos = self.position(to_epoch_minutes(year, month, day, hour, minute))
+        return self.solar_year(pos), self.month_index(pos)
+
+
+_sekki_table: Optional[SekkiTable] = None
+
+
+def get_sekki_table() -> SekkiTable:
+    """節気テーブルを取得（プロセス内で1度だけmmap）"""
+    global _sekki_table
+    if _sekki_table is None:
+        _sekki_table = SekkiTable()
+    return _sekki_table
+
+
+# ============================================
+# テーブル生成（天文計算）
+# 以下は `python sekki.py` 実行時のみ使用する
+# ============================================
+
+# VSOP87D 地球の日心黄経の主要項（Meeus『Astronomical Algorithms』付録III）
+# (A, B, C) → A * cos(B + C * τ)
+_VSOP_L0 = [
+    (175347046, 0, 0), (3341656, 4.6692568, 6283.07585), (34894, 4.6261, 12566.1517),
+    (3497, 2.7441, 5753.3849), (3418, 2.8289, 3.5231), (3136, 3.6277, 77713.7715),
+    (2676, 4.4181, 7860.4194), (2343, 6.1352, 3930.2097), (1324, 0.7425, 11506.7698),
+    (1273, 2.0371, 529.691), (1199, 1.1096, 1577.3435), (990, 5.233, 5884.927),
+    (902, 2.045, 26.298), (857, 3.508, 398.149), (780, 1.179, 5223.694),
+    (753, 2.533, 5507.553), (505, 4.583, 18849.228), (492, 4.205, 775.523),
+    (357, 2.92, 0.067), (317, 5.849, 11790.629), (284, 1.899, 796.298),
+    (271, 0.315, 10977.079), (243, 0.345, 5486.778), (206, 4.806, 2544.314),
+    (205, 1.869, 5573.143), (202, 2.458, 6069.777), (156, 0.833, 213.299),
+    (132, 3.411, 2942.463), (126, 1.083, 20.775), (115, 0.645, 0.98),
+    (103, 0.636, 4694.003), (102, 0.976, 15720.839), (102, 4.267, 7.114),
+    (99, 6.21, 2146.17), (98, 0.68, 155.42), (86, 5.98, 161000.69),
+    (85, 1.3, 6275.96), (85, 3.67, 71430.7), (80, 1.81, 17260.15),
+    (79, 3.04, 12036.46), (75, 1.76, 5088.63), (74, 3.5, 3154.69),
+    (74, 4.68, 801.82), (70, 0.83, 9437.76), (62, 3.98, 8827.39),
+    (61, 1.82, 7084.9), (57, 2.78, 6286.6), (56, 4.39, 14143.5),
+    (56, 3.47, 6279.55), (52, 0.19, 12139.55), (52, 1.33, 1748.02),
+    (51, 0.28, 5856.48), (49, 0.49, 1194.45), (41, 5.37, 8429.24),
+    (41, 2.4, 19651.05), (39, 6.17, 10447.39), (37, 6.04, 10213.29),
+    (37, 2.57, 1059.38), (36, 1.71, 2352.87), (36, 1.78, 6812.77),
+    (33, 0.59, 17789.85), (30, 0.44, 83996.85), (30, 2.74, 1349.87),
+    (25, 3.16, 4690.48),
+]
+_VSOP_L1 = [
+    (628331966747, 0, 0), (206059, 2.678235, 6283.07585), (4303, 2.6351, 12566.1517),
+    (425, 1.59, 3.523), (119, 5.796, 26.298), (109, 2.966, 1577.344),
+    (93, 2.59, 18849.23), (72, 1.14, 529.69), (68, 1.87, 398.15),
+    (67, 4.41, 5507.55), (59, 2.89, 5223.69), (56, 2.17, 155.42),
+    (45, 0.4, 796.3), (36, 0.47, 775.52), (29, 2.65, 7.11),
+    (21, 5.34, 0.98), (19, 1.85, 5486.78), (19, 4.97, 213.3),
+    (17, 2.99, 6275.96), (16, 0.03, 2544.31), (16, 1.43, 2146.17),
+    (15, 1.21, 10977.08), (12, 2.83, 1748.02), (12, 3.26, 5088.63),
+    (12, 5.27, 1194.45), (12, 2.08, 4694.0), (11, 0.77, 553.57),
+    (10, 1.3, 6286.6), (10, 4.24, 1349.87), (9, 2.7, 242.73),
+    (9, 5.64, 951.72), (8, 5.3, 2352.87), (6, 2.65, 9437.76),
+    (6, 4.67, 4690.48),
+]
+_VSOP_L2 = [
+    (52919, 0, 0), (8720, 1.0721, 6283.0758), (309, 0.867, 12566.152),
+    (27, 0.05, 3.52), (16, 5.19, 26.3), (16, 3.68, 155.42),
+    (10, 0.76, 18849.23), (9, 2.06, 77713.77), (7, 0.83, 775.52),
+    (5, 4.66, 1577.34), (4, 1.03, 7.11), (4, 3.44, 5573.14),
+    (3, 5.14, 796.3), (3, 6.05, 5507.55), (3, 1.19, 242.73),
+    (3, 6.12, 529.69), (3, 0.31, 398.15), (3, 2.28, 553.57),
+    (2, 4.38, 5223.69), (2, 3.75, 0.98),
+]
+_VSOP_L3 = [
+    (289, 5.844, 6283.076), (35, 0, 0), (17, 5.49, 12566.15),
+    (3, 5.2, 155.42), (1, 4.72, 3.52), (1, 5.3, 18849.23),
+    (1, 5.97, 242.73),
+]
+_VSOP_L4 = [(114, 3.142, 0), (8, 4.13, 6283.08), (1, 3.84, 12566.15)]
+_VSOP_L5 = [(1, 3.14, 0)]
+_VSOP_L = [_VSOP_L0, _VSOP_L1, _VSOP_L2, _VSOP_L3, _VSOP_L4, _VSOP_L5]
+
+# 動径（光行差の補正に使用）
+_VSOP_R0 = [
+    (100013989, 0, 0), (1670700, 3.0984635, 6283.07585), (13956, 3.05525, 12566.1517),
+    (3084, 5.1985, 77713.7715), (1628, 1.1739, 5753.3849), (1576, 2.8469, 7860.4194),
+    (925, 5.453, 11506.77), (542, 4.564, 3930.21), (472, 3.661, 5884.927),
+]
+_VSOP_R1 = [(103019, 1.10749, 6283.07585), (1721, 1.0644, 12566.1517)]
+_VSOP_R2 = [(4359, 5.7846, 6283.0758)]
+_VSOP_R = [_VSOP_R0, _VSOP_R1, _VSOP_R2]
+
+_J2000 = 2451545.0
+_UNIX_EPOCH_JD = 2440587.5
+_TROPICAL_YEAR = 365.2422
+
+
+def _vsop_sum(series: List[List[Tuple[float, float, float]]], tau: float) -> float:
+    """VSOP87の級数を評価"""
+    total = 0.0
+    for power, terms in enumerate(series):
+        total += sum(a * math.cos(b + c * tau) for a, b, c in terms) * tau ** power
+    return total / 1e8
+
+
+def _apparent_solar_longitude(jde: float) -> float:
+    """
+    力学時（JDE）における太陽の視黄経を計算
+
+    Args:
+        jde: 力学時のユリウス日
+
+    Returns:
+        視黄経（度、0-360）
+    """
+    tau = (jde - _J2000) / 365250
+    t = tau * 10
+
+    # 地心黄経（日心黄経 + 180度、FK5補正）
+    longitude = math.degrees(_vsop_sum(_VSOP_L, tau)) + 180 - 0.09033 / 3600
+    radius = _vsop_sum(_VSOP_R, tau)
+
+    # 章動（黄経）
+    omega = math.radians(125.04452 - 1934.136261 * t)
+    sun_mean = math.radians(280.4665 + 36000.7698 * t)
+    moon_mean = math.radians(218.3165 + 481267.8813 * t)
+    nutation = (
+        -17.20 * math.sin(omega) - 1.32 * math.sin(2 * sun_mean)
+        - 0.23 * math.sin(2 * moon_mean) + 0.21 * math.sin(2 * omega)
+    )
+
+    # 光行差
+    aberration = -20.4898 / radius
+
+    return (longitude + (nutation + aberration) / 3600) % 360
+
+
+def _delta_t(year: float) -> float:
+    """
+    ΔT（力学時 - 世界時、秒）をEspenak-Meeusの多項式で計算
+
+    Args:
+        year: 年（小数）
+
+    Returns:
+        ΔT（秒）
+    """
+    if year < 1860:
+        t = year - 1800
+        return (13.72 - 0.332447 * t + 0.0068612 * t ** 2 + 0.0041116 * t ** 3
+                - 0.00037436 * t ** 4 + 0.0000121272 * t ** 5
+                - 0.0000001699 * t ** 6 + 0.000000000875 * t ** 7)
+    if year < 1900:
+        t = year - 1860
+        return (7.62 + 0.5737 * t - 0.251754 * t ** 2 + 0.01680668 * t ** 3
+                - 0.0004473624 * t ** 4 + t ** 5 / 233174)
+    if year < 1920:
+        t = year - 1900
+        return -2.79 + 1.494119 * t - 0.0598939 * t ** 2 + 0.0061966 * t ** 3 - 0.000197 * t ** 4
+    if year < 1941:
+        t = year - 1920
+        return 21.20 + 0.84493 * t - 0.076100 * t ** 2 + 0.0020936 * t ** 3
+    if year < 1961:
+        t = year - 1950
+        return 29.07 + 0.407 * t - t ** 2 / 233 + t ** 3 / 2547
+    if year < 1986:
+        t = year - 1975
+        return 45.45 + 1.067 * t - t ** 2 / 260 - t ** 3 / 718
+    if year < 2005:
+        t = year - 2000
+        return (63.86 + 0.3345 * t - 0.060374 * t ** 2 + 0.0017275 * t ** 3
+                + 0.000651814 * t ** 4 + 0.00002373599 * t ** 5)
+    if year < 2050:
+        t = year - 2000
+        return 62.92 + 0.32217 * t + 0.005589 * t ** 2
+    u = (year - 1820) / 100
+    if year < 2150:
+        return -20 + 32 * u ** 2 - 0.5628 * (2150 - year)
+    return -20 + 32 * u ** 2
+
+
+def _find_term_jde(target: float, jde: float) -> float:
+    """
+    太陽の視黄経が指定角度になる瞬間を反復計算で求める
+
+    Args:
+        target: 目標黄経（度）
+        jde: 初期推定値（力学時のユリウス日）
+
+    Returns:
+        力学時のユリウス日
+    """
+    for _ in range(20):
+        diff = (target - _apparent_solar_longitude(jde) + 180) % 360 - 180
+        jde += diff * _TROPICAL_YEAR / 360
+        if abs(diff) < 1e-7:
+            break
+    return jde
+
+
+def compute_sekki_instants(start_year: int = SEKKI_START_YEAR,
+                           end_year: int = SEKKI_END_YEAR) -> Tuple[int, List[int]]:
+    """
+    対象年範囲を覆う二十四節気の瞬間を計算
+
+    start_year 元日の直前の冬至から、end_year 翌年元日の直後の節気までを含む。
+
+    Args:
+        start_year: 開始年
+        end_year: 終了年
+
+    Returns:
+        (先頭の節気番号, 節気の瞬間（UTC基準のエポック分）のリスト)
+    """
+    start = to_epoch_minutes(start_year, 1, 1)
+    end = to_epoch_minutes(end_year + 1, 1, 1)
+
+    terms = []
+    for year in range(start_year - 1, end_year + 2):
+        # その年の春分の概算値から15度ごとに推定
+        equinox = 2451623.81 + _TROPICAL_YEAR * (year - 2000)
+        for term in range(24):
+            jde = _find_term_jde(term * 15.0, equinox + term * _TROPICAL_YEAR / 24)
+            jd_ut = jde - _delta_t(year + term / 24) / 86400
+            terms.append((round((jd_ut - _UNIX_EPOCH_JD) * 1440), term))
+    terms.sort()
+
+    # 範囲の直前1件・直後1件を残して切り出す
+    first = max(i for i, (instant, _) in enumerate(terms) if instant <= start)
+    last = min(i for i, (instant, _) in enumerate(terms) if instant > end)
+    selected = terms[first:last + 1]
+    return selected[0][1], [instant for instant, _ in selected]
+
+
+def build_sekki_table(path: Path = SEKKI_TABLE_PATH,
+                      start_year: int = SEKKI_START_YEAR,
+                      end_year: int = SEKKI_END_YEAR) -> int:
+    """
+    二十四節気テーブルを生成してファイルに保存
+
+    Args:
+        path: 出力先のパス
+        start_year: 開始年
+        end_year: 終了年
+
+    Returns:
+        書き込んだ節気の件数
+    """
+    first_term, instants = compute_sekki_instants(start_year, end_year)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(SEKKI_MAGIC, start_year, first_term, len(instants), 0))
+        f.write(struct.pack(f"<{len(instants)}q", *instants))
+    return len(instants)
+
+
+if __name__ == "__main__":
+    count = build_sekki_table()
+    print(f"節気テーブルを生成しました: {SEKKI_TABLE_PATH}（{count}件）")
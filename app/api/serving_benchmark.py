@@ -0,0 +1,148 @@
+"""
+WSGI（同期ワーカー）とASGIのスループット比較
+
+総合分析の計算履歴の保存（応答後のストレージI/O）に遅延を注入し、同じリクエストを
+同時に送ったときのスループットと応答時間を比較する。ネットワークを使わず、
+どちらもプロセス内でアプリケーションを直接呼び出す。
+- WSGI: gunicorn の同期ワーカー（--workers N）と同じく、N個のワーカーがそれぞれ
+  応答を送った後、保存が終わるまで次のリクエストを受け付けない
+- ASGI: asgi.AsgiBridge（1プロセス）。保存はI/O用のスレッドプールで並行に待つ
+
+実行方法:
+    python serving_benchmark.py [--requests 200] [--concurrency 50] [--latency 0.2] [--workers 2]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, List
+
+from werkzeug.test import EnvironBuilder
+
+import main
+from asgi import AsgiBridge
+
+
+def _bodies(count: int, seed: int = 0) -> List[bytes]:
+    """1950〜2010年のランダムな生年月日・時刻の総合分析リクエストボディ"""
+    rng = random.Random(seed)
+    start = date(1950, 1, 1).toordinal()
+    end = date(2010, 12, 31).toordinal()
+    return [
+        json.dumps({
+            "birthdate": date.fromordinal(rng.randint(start, end)).isoformat(),
+            "birth_time": f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+        }).encode('utf-8')
+        for _ in range(count)
+    ]
+
+
+def _summary(latencies: List[float], elapsed: float, drained: float) -> Dict[str, float]:
+    """応答時間（秒）の一覧から結果をまとめる"""
+    latencies = sorted(latencies)
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "elapsed_s": elapsed,
+        "drained_s": drained,
+    }
+
+
+def run_wsgi(bodies: List[bytes], workers: int) -> Dict[str, float]:
+    """
+    同期ワーカー（gunicorn main:app --workers N）と同じ動作で処理
+
+    各ワーカーはレスポンスを読み終えた時点でクライアントへの応答を完了とし、
+    close()（応答後のI/O）が終わってから次のリクエストを処理する。
+    """
+    latencies = []
+    finished = []
+    start = time.perf_counter()
+
+    def handle(body: bytes) -> None:
+        environ = EnvironBuilder(path='/api/v1/analyze', method='POST', data=body,
+                                 content_type='application/json').get_environ()
+        iterable = main.app(environ, lambda status, headers, exc_info=None: None)
+        b"".join(iterable)
+        latencies.append(time.perf_counter() - start)
+        finished.append(time.perf_counter())
+        iterable.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(handle, bodies))
+    drained = time.perf_counter() - start
+
+    return _summary(latencies, max(finished) - start, drained)
+
+
+def run_asgi(bodies: List[bytes], concurrency: int) -> Dict[str, float]:
+    """ASGI（asgi.AsgiBridge）で、同時に concurrency 件ずつ処理"""
+    bridge = AsgiBridge(main.app)
+    latencies = []
+    finished = []
+
+    async def handle(body: bytes, semaphore: asyncio.Semaphore, start: float) -> None:
+        async with semaphore:
+            messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+            async def receive():
+                return messages.pop() if messages else {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.body' and not message.get('more_body'):
+                    latencies.append(time.perf_counter() - start)
+                    finished.append(time.perf_counter())
+
+            scope = {'type': 'http', 'method': 'POST', 'path': '/api/v1/analyze',
+                     'headers': [(b'content-type', b'application/json')]}
+            await bridge(scope, receive, send)
+
+    async def run_all() -> float:
+        semaphore = asyncio.Semaphore(concurrency)
+        start = time.perf_counter()
+        await asyncio.gather(*(handle(body, semaphore, start) for body in bodies))
+        return start
+
+    begin = time.perf_counter()
+    start = asyncio.run(run_all())
+    drained = time.perf_counter() - begin
+    bridge.shutdown()
+
+    return _summary(latencies, max(finished) - start, drained)
+
+
+def main_benchmark():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="WSGIとASGIのスループットを比較する")
+    parser.add_argument('--requests', type=int, default=200, help="リクエスト数")
+    parser.add_argument('--concurrency', type=int, default=50, help="同時に送るリクエスト数")
+    parser.add_argument('--latency', type=float, default=0.2, help="注入するストレージの遅延（秒）")
+    parser.add_argument('--workers', type=int, default=2, help="WSGIの同期ワーカー数")
+    args = parser.parse_args()
+
+    # 計算履歴の保存を、遅延だけを持つストレージに置き換える
+    main.CALC_LOGS_ENABLED = True
+    main.save_calc_log = lambda request_data, result: time.sleep(args.latency)
+
+    bodies = _bodies(args.requests)
+    results = {
+        f"WSGI sync x{args.workers}": run_wsgi(bodies, args.workers),
+        f"ASGI x1 (c={args.concurrency})": run_asgi(bodies, args.concurrency),
+    }
+
+    print(f"リクエスト: {args.requests}件 / ストレージの遅延: {args.latency * 1000:.0f}ms")
+    print("（response: 全ての応答を送り終えるまで / drained: 応答後のI/Oも終えるまで）")
+    print(f"{'mode':<20}{'req/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'response(s)':>13}{'drained(s)':>12}")
+    for name, result in results.items():
+        print(f"{name:<20}{result['throughput']:>10.1f}{result['p50_ms']:>10.0f}{result['p99_ms']:>10.0f}"
+              f"{result['elapsed_s']:>13.2f}{result['drained_s']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
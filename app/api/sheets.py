@@ -10,6 +10,7 @@ Google Sheets連携モジュール
 import os
 import json
 import base64
+import threading
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from google.oauth2 import service_account
@@ -41,10 +42,27 @@ class SheetsClient:
             scopes=['https://www.googleapis.com/auth/spreadsheets']
         )
 
-        # Sheets APIクライアントを構築
-        self.service = build('sheets', 'v4', credentials=credentials)
+        self.credentials = credentials
         self.spreadsheet_id = spreadsheet_id
 
+        # Sheets APIクライアント（スレッドごとに構築）
+        self._local = threading.local()
+
+    @property
+    def service(self):
+        """
+        Sheets APIクライアント
+
+        Note:
+            HTTP接続（httplib2）はスレッドセーフでないため、スレッドごとに構築する
+            （ASGIモードでは複数のI/Oスレッドから並行に呼び出される）
+        """
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build('sheets', 'v4', credentials=self.credentials)
+            self._local.service = service
+        return service
+
     def _get_range(self, sheet_name: str, range_notation: str = '') -> str:
         """シート範囲を取得"""
         if range_notation:
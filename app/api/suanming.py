@@ -4,27 +4,246 @@
 ナレッジベース: suanming_knowledge.yaml
 """
 
-import yaml
-from datetime import datetime
-from typing import Dict, Tuple, List
-from pathlib import Path
+import numpy as np
+from array import array
+from datetime import datetime, date, timedelta
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Tuple, List, Iterator, Any
+from knowledge_snapshot import KNOWLEDGE_PATH, load_snapshot
+from sekki import get_sekki_table, to_epoch_minutes, RISSHUN, JST_OFFSET_MINUTES
+from chart_store import load_chart_store
+
+
+# 日柱テーブルの対応範囲（1800-01-01 〜 2200-12-31）
+DAY_TABLE_START = date(1800, 1, 1)
+DAY_TABLE_END = date(2200, 12, 31)
+
+
+def _date_to_jdn(year: int, month: int, day: int) -> int:
+    """
+    グレゴリオ暦の日付をユリウス通日（JDN）に変換（閉形式）
+
+    Args:
+        year: 西暦年
+        month: 月
+        day: 日
+
+    Returns:
+        ユリウス通日
+    """
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    return day + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+
+
+def _build_day_kanshi_table() -> array:
+    """
+    日柱テーブル（1日1バイト、六十干支インデックス0-59）を生成
+
+    標準の六十干支番号（甲子=0）は (JDN + 49) % 60 で求まる。
+    本モジュールの六十干支表は TENKAN/CHISHI の並び（庚申=0）に従うため、
+    標準番号に4を加えて変換して格納する。
+
+    Returns:
+        DAY_TABLE_START からの経過日数でインデックスされた array('B')
+    """
+    start_jdn = _date_to_jdn(DAY_TABLE_START.year, DAY_TABLE_START.month, DAY_TABLE_START.day)
+    length = DAY_TABLE_END.toordinal() - DAY_TABLE_START.toordinal() + 1
+
+    # 干支は1日1つずつ進むため、開始日の干支から60日周期を繰り返して埋める
+    first = (start_jdn + 49 + 4) % 60
+    cycle = bytes((first + i) % 60 for i in range(60))
+    table = array('B', cycle * (length // 60 + 1))
+    del table[length:]
+    return table
+
+
+# 日柱テーブル（モジュール読み込み時に1度だけ生成）
+_DAY_TABLE_OFFSET = DAY_TABLE_START.toordinal()
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_DAY_KANSHI_TABLE = _build_day_kanshi_table()
+
+
+def day_kanshi_index(ordinal: int) -> int:
+    """
+    日付の序数（date.toordinal()）から日柱の六十干支インデックスを取得
+
+    Args:
+        ordinal: 日付の序数
+
+    Returns:
+        六十干支インデックス（0-59、ROKUJIKKANSHIの添字）
+
+    Raises:
+        ValueError: 対応範囲外の日付の場合
+    """
+    index = ordinal - _DAY_TABLE_OFFSET
+    if index < 0 or index >= len(_DAY_KANSHI_TABLE):
+        raise ValueError(
+            f"日柱の対応範囲外です（{DAY_TABLE_START.isoformat()}〜{DAY_TABLE_END.isoformat()}）"
+        )
+    return _DAY_KANSHI_TABLE[index]
+
+
+def day_kanshi_indices(ordinals) -> np.ndarray:
+    """
+    日付の序数の配列から日柱の六十干支インデックスを一括取得（day_kanshi_index の一括版）
+
+    Args:
+        ordinals: 日付の序数（date.toordinal()）の配列
+
+    Returns:
+        六十干支インデックス（0-59、ROKUJIKKANSHIの添字）の配列（uint8）
+
+    Raises:
+        ValueError: 対応範囲外の日付を含む場合
+    """
+    table_index = np.asarray(ordinals, dtype=np.int64) - _DAY_TABLE_OFFSET
+    if table_index.size and (table_index.min() < 0 or table_index.max() >= len(_DAY_KANSHI_TABLE)):
+        raise ValueError(
+            f"日柱の対応範囲外です（{DAY_TABLE_START.isoformat()}〜{DAY_TABLE_END.isoformat()}）"
+        )
+    return np.frombuffer(_DAY_KANSHI_TABLE, dtype=np.uint8)[table_index]
+
+
+class Chart(Mapping):
+    """
+    命式（計算結果）
+
+    天干・地支・五行は整数インデックスで保持し、名前への変換は
+    to_dict()（JSON出力時）または辞書形式のアクセス時にのみ行う。
+    生成後は変更できないため、キャッシュしてリクエスト間で共有できる。
+
+    Attributes:
+        pillars: (年干, 年支, 月干, 月支, 日干, 日支, 時干, 時支) のインデックス
+        scores: 五行配点（FIVE_ELEMENTSの順）
+        guardian_gods: 守護神の五行インデックス（優先順）
+        taboo_elements: 忌神の五行インデックス
+        deficient: 不足五行のインデックス
+        excess: 過剰五行のインデックス
+    """
+
+    __slots__ = ('pillars', 'scores', 'guardian_gods', 'taboo_elements', 'deficient', 'excess', '_names')
+
+    KEYS = (
+        "year_gan", "year_shi", "month_gan", "month_shi",
+        "day_gan", "day_shi", "hour_gan", "hour_shi",
+        "five_elements_score", "guardian_gods", "taboo_elements", "deficient", "excess"
+    )
+
+    def __init__(
+        self,
+        pillars: Tuple[int, ...],
+        scores: Tuple[int, ...],
+        guardian_gods: Tuple[int, ...],
+        taboo_elements: Tuple[int, ...],
+        deficient: Tuple[int, ...],
+        excess: Tuple[int, ...],
+        names: Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]
+    ):
+        """
+        初期化
+
+        Args:
+            pillars: 四柱の干支インデックス（8要素）
+            scores: 五行配点（5要素）
+            guardian_gods: 守護神の五行インデックス
+            taboo_elements: 忌神の五行インデックス
+            deficient: 不足五行のインデックス
+            excess: 過剰五行のインデックス
+            names: (十干, 十二支, 五行) の名前表（計算インスタンスと共有）
+        """
+        set_attr = object.__setattr__
+        set_attr(self, 'pillars', pillars)
+        set_attr(self, 'scores', scores)
+        set_attr(self, 'guardian_gods', guardian_gods)
+        set_attr(self, 'taboo_elements', taboo_elements)
+        set_attr(self, 'deficient', deficient)
+        set_attr(self, 'excess', excess)
+        set_attr(self, '_names', names)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Chartは変更できません")
+
+    def __delattr__(self, name):
+        raise AttributeError("Chartは変更できません")
+
+    def __getitem__(self, key: str):
+        tenkan, chishi, elements = self._names
+        if key in _PILLAR_KEYS:
+            position = _PILLAR_KEYS[key]
+            names = chishi if position % 2 else tenkan
+            return names[self.pillars[position]]
+        if key == "five_elements_score":
+            return dict(zip(elements, self.scores))
+        if key in ("guardian_gods", "taboo_elements", "deficient", "excess"):
+            return [elements[i] for i in getattr(self, key)]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __repr__(self) -> str:
+        tenkan, chishi, _ = self._names
+        pillars = "".join(
+            tenkan[self.pillars[i]] + chishi[self.pillars[i + 1]] for i in range(0, 8, 2)
+        )
+        return f"Chart({pillars}, scores={self.scores})"
+
+    def to_dict(self) -> Dict:
+        """
+        APIレスポンス用の辞書に変換
+
+        Returns:
+            命式計算結果の辞書（analyze の従来の形式）
+        """
+        return {key: self[key] for key in self.KEYS}
+
+
+# 干支キー → pillars内の位置
+_PILLAR_KEYS = {key: i for i, key in enumerate(Chart.KEYS[:8])}
+
+# 大運の周期（年）と、立運の計算で1年に相当する日数
+LUCK_PERIOD_YEARS = 10
+LUCK_DAYS_PER_YEAR = 3
+
+GENDERS = ("male", "female")
+
+
+def _epoch_minutes_to_iso(epoch_minute: int) -> str:
+    """UTC基準のエポック分を日本標準時の日時文字列（YYYY-MM-DDTHH:MM）に変換"""
+    return (datetime(1970, 1, 1) + timedelta(minutes=epoch_minute + JST_OFFSET_MINUTES)).strftime("%Y-%m-%dT%H:%M")
 
 
 class SuanmingCalculator:
     """算命学命式計算クラス"""
 
-    def __init__(self, knowledge_path: str = None):
+    def __init__(self, knowledge_path: str = None, cache_size: int = 4096, chart_store_path: str = None):
         """
         初期化
 
         Args:
             knowledge_path: YAMLナレッジベースのパス（省略時は同ディレクトリから読み込み）
+            cache_size: 命式キャッシュ（LRU）の最大件数（0で無効、Noneで無制限）
+            chart_store_path: 事前計算済み命式ストアのパス（省略時は使用しない。
+                              ファイルが存在しない・ナレッジと一致しない場合も使用しない）
+
+        Note:
+            YAMLは直接解析せず、コンパイル済みスナップショットを読み込む
+            （YAMLが変更されていれば自動的に再生成される）
         """
         if knowledge_path is None:
-            knowledge_path = Path(__file__).parent / "suanming_knowledge.yaml"
+            knowledge_path = KNOWLEDGE_PATH
 
-        with open(knowledge_path, 'r', encoding='utf-8') as f:
-            self.knowledge = yaml.safe_load(f)
+        snapshot = load_snapshot(knowledge_path)
+        self.knowledge = snapshot['knowledge']
+        self.knowledge_version = snapshot['source_sha256']
+        self.tables = snapshot['tables']
 
         # 定数の取得
         self.TENKAN = self.knowledge['constants']['tenkan']
@@ -42,10 +261,62 @@ class SuanmingCalculator:
         self.CENTURY_CONSTANT = self.knowledge['lookup_tables']['century_constant']
         self.SHOSHO_RELATION = self.knowledge['lookup_tables']['shosho_relation']
         self.SOKOKU_RELATION = self.knowledge['lookup_tables']['sokoku_relation']
+        self.FIVE_ELEMENTS = self.knowledge['constants']['five_elements']
+
+        # 二十四節気テーブル（年柱・月柱の境界判定用）
+        self.sekki = get_sekki_table()
 
         # 六十干支表の生成（日柱計算用）
         self.ROKUJIKKANSHI = self._generate_rokujikkanshi()
 
+        # 整数インデックスの参照テーブル
+        self._tenkan_index = {gan: i for i, gan in enumerate(self.TENKAN)}
+        self._chishi_index = {shi: i for i, shi in enumerate(self.CHISHI)}
+        self._goko_ton = tuple(self.tables['goko_ton'])
+        self._goso_ton = tuple(self.tables['goso_ton'])
+        self._month_shi = tuple(self.tables['month_shi'])
+        self._hour_shi = tuple(self.tables['hour_shi'])
+        self._gan_scores = tuple(tuple(row) for row in self.tables['gan_scores'])
+        self._shi_scores = tuple(tuple(row) for row in self.tables['shi_scores'])
+        self._controllers = tuple(
+            tuple(c for c in range(5) if self.tables['sokoku'][c] == e) for e in range(5)
+        )
+        self._nourishers = tuple(
+            tuple(n for n in range(5) if self.tables['shosho'][n] == e) for e in range(5)
+        )
+        self._names = (tuple(self.TENKAN), tuple(self.CHISHI), tuple(self.FIVE_ELEMENTS))
+
+        # 守護神選定表：五行配点を詰めた整数 → (守護神, 忌神, 不足五行, 過剰五行)
+        # （辞書は _select_guardian_indices の初回呼び出し時に生成）
+        guardian_table = self.tables['guardian_table']
+        self._score_shifts = tuple(guardian_table['bits'] * i for i in range(5))
+        self._score_limit = 1 << guardian_table['bits']
+        self._guardian_lookup = None
+
+        # 一括計算用テーブル（analyze_batch の初回呼び出し時に生成）
+        self._batch_tables = None
+
+        # 事前計算済み命式ストア（キャッシュミス時に計算より先に参照する）
+        self.chart_store = None
+        if chart_store_path is not None:
+            self.chart_store = load_chart_store(self.knowledge_version, chart_store_path)
+
+        # 命式キャッシュ：(日付の序数, 時支, 節気年, 月支) → Chart
+        self._chart_cache = lru_cache(maxsize=cache_size)(self._compute_chart)
+
+    def cache_info(self):
+        """
+        命式キャッシュの統計を取得
+
+        Returns:
+            (hits, misses, maxsize, currsize) の名前付きタプル
+        """
+        return self._chart_cache.cache_info()
+
+    def cache_clear(self) -> None:
+        """命式キャッシュを消去"""
+        self._chart_cache.cache_clear()
+
     def _generate_rokujikkanshi(self) -> List[Tuple[str, str]]:
         """
         六十干支表を生成
@@ -60,30 +331,34 @@ class SuanmingCalculator:
             rokujikkanshi.append((gan, shi))
         return rokujikkanshi
 
-    def is_after_risshun(self, year: int, month: int, day: int) -> bool:
+    def is_after_risshun(self, year: int, month: int, day: int, hour: int = 0, minute: int = 0) -> bool:
         """
-        立春以降かどうかを判定（簡易版）
+        立春以降かどうかを判定
 
         Args:
             year: 年
             month: 月
             day: 日
+            hour: 時（0-23）
+            minute: 分（0-59）
 
         Returns:
             立春以降ならTrue
 
         Note:
-            簡易実装として2月4日を基準とする
-            実運用では天文計算または立春日時テーブルが必要
+            二十四節気テーブルを参照し、立春の日時（日本標準時）で分単位に判定する
         """
-        if month < 2:
-            return False
-        elif month > 2:
-            return True
-        else:  # month == 2
-            return day >= 4
+        solar_year, _ = self.sekki.lookup(year, month, day, hour, minute)
+        return solar_year >= year
 
-    def calculate_year_pillar(self, year: int, month: int, day: int) -> Tuple[str, str]:
+    def calculate_year_pillar(
+        self,
+        year: int,
+        month: int,
+        day: int,
+        hour: int = 0,
+        minute: int = 0
+    ) -> Tuple[str, str]:
         """
         年柱（年干・年支）を計算
 
@@ -91,64 +366,48 @@ class SuanmingCalculator:
             year: 西暦年
             month: 月
             day: 日
+            hour: 時（0-23）
+            minute: 分（0-59）
 
         Returns:
             (年干, 年支)
         """
-        # 立春以前は前年扱い
-        if not self.is_after_risshun(year, month, day):
-            year -= 1
+        # 立春以前は前年扱い（節気年を採用）
+        year, _ = self.sekki.lookup(year, month, day, hour, minute)
 
         gan_index = year % 10
         shi_index = year % 12
 
         return self.TENKAN[gan_index], self.CHISHI[shi_index]
 
-    def _get_sekki_month_index(self, month: int, day: int) -> int:
+    def _get_sekki_month_index(self, year: int, month: int, day: int, hour: int = 0, minute: int = 0) -> int:
         """
-        節気から月支のインデックスを取得（簡易版）
+        節気から月支のインデックスを取得
 
         Args:
+            year: 年
             month: 月
             day: 日
+            hour: 時（0-23）
+            minute: 分（0-59）
 
         Returns:
             月支インデックス（0-11）
 
         Note:
-            簡易実装として月の中旬（6日前後）を節気の境目とする
-            実運用では正確な節気日時テーブルが必要
+            二十四節気テーブルを参照し、直前の節（立春→寅月、啓蟄→卯月 … 小寒→丑月）で決定する
         """
-        # 節気の境目を簡易的に月の6日とする
-        # 立春（2月）→寅月、啓蟄（3月）→卯月...
-
-        # 2月4日以前は前月（丑月）
-        if month == 2 and day < 4:
-            return 11  # 丑月（12月）
-
-        # 各月の6日以前は前月扱い
-        if day < 6:
-            month -= 1
-            if month < 1:
-                month = 12
-
-        # 月から月支インデックスを算出
-        # 2月（立春）→寅月（index 0）
-        # 3月（啓蟄）→卯月（index 1）
-        # ...
-        # 1月（小寒）→丑月（index 11）
-
-        if month >= 2:
-            return month - 2
-        else:  # month == 1
-            return 11
+        _, month_index = self.sekki.lookup(year, month, day, hour, minute)
+        return month_index
 
     def calculate_month_pillar(
         self,
         year: int,
         month: int,
         day: int,
-        year_gan: str
+        year_gan: str,
+        hour: int = 0,
+        minute: int = 0
     ) -> Tuple[str, str]:
         """
         月柱（月干・月支）を計算
@@ -158,27 +417,36 @@ class SuanmingCalculator:
             month: 月
             day: 日
             year_gan: 年干
+            hour: 時（0-23）
+            minute: 分（0-59）
 
         Returns:
             (月干, 月支)
         """
         # 月支の決定
-        month_shi_index = self._get_sekki_month_index(month, day)
-        month_shi = self.MONTH_SHI_ORDER[month_shi_index]
+        month_shi_index = self._get_sekki_month_index(year, month, day, hour, minute)
 
-        # 五虎遁：年干から寅月の月干を決定
-        base_gan = self.GOKO_TON[year_gan]
+        month_gan, month_shi = self._month_pillar_indices(month_shi_index, self._tenkan_index[year_gan])
+        return self.TENKAN[month_gan], self.CHISHI[month_shi]
 
-        # 寅月（index 0）から現在月まで天干を順行
-        base_gan_index = self.TENKAN.index(base_gan)
-        month_gan_index = (base_gan_index + month_shi_index) % 10
-        month_gan = self.TENKAN[month_gan_index]
+    def _month_pillar_indices(self, month_shi_index: int, year_gan: int) -> Tuple[int, int]:
+        """
+        月柱のインデックスを計算
+
+        Args:
+            month_shi_index: 月支インデックス（寅月=0 … 丑月=11）
+            year_gan: 年干インデックス
 
-        return month_gan, month_shi
+        Returns:
+            (月干インデックス, 月支インデックス)
+        """
+        # 五虎遁：年干から寅月の月干を決定し、寅月から現在月まで天干を順行
+        month_gan = (self._goko_ton[year_gan] + month_shi_index) % 10
+        return month_gan, self._month_shi[month_shi_index]
 
     def calculate_day_pillar(self, year: int, month: int, day: int) -> Tuple[str, str]:
         """
-        日柱（日干・日支）を計算（高氏日柱公式）
+        日柱（日干・日支）を計算
 
         Args:
             year: 西暦年
@@ -187,19 +455,14 @@ class SuanmingCalculator:
 
         Returns:
             (日干, 日支)
-        """
-        # 世紀定数の取得
-        century = (year // 100) * 100
-        century_constant = self.CENTURY_CONSTANT.get(century, 0)
 
-        # 高氏日柱公式
-        year_last_two = year % 100
-        s = year_last_two - 1
-        u = s % 4
-        month_base = self.MONTH_BASE[month]
+        Raises:
+            ValueError: 対応範囲（1800〜2200年）外の日付の場合
 
-        r = s * 4 * 6 + 5 * (s * 4 * 3 + u) + month_base + day + century_constant
-        kanshi_number = r % 60
+        Note:
+            ユリウス通日から生成した日柱テーブルを日付の序数で参照する
+        """
+        kanshi_number = day_kanshi_index(date(year, month, day).toordinal())
 
         # 六十干支表から干支を取得
         day_gan, day_shi = self.ROKUJIKKANSHI[kanshi_number]
@@ -245,17 +508,24 @@ class SuanmingCalculator:
         """
         # 時支の決定
         hour_shi_index = self._get_hour_shi_index(hour)
-        hour_shi = self.HOUR_SHI_ORDER[hour_shi_index]
 
-        # 五鼠遁：日干から子時の時干を決定
-        base_gan = self.GOSO_TON[day_gan]
+        hour_gan, hour_shi = self._hour_pillar_indices(hour_shi_index, self._tenkan_index[day_gan])
+        return self.TENKAN[hour_gan], self.CHISHI[hour_shi]
 
-        # 子時（index 0）から現在時まで天干を順行
-        base_gan_index = self.TENKAN.index(base_gan)
-        hour_gan_index = (base_gan_index + hour_shi_index) % 10
-        hour_gan = self.TENKAN[hour_gan_index]
+    def _hour_pillar_indices(self, hour_shi_index: int, day_gan: int) -> Tuple[int, int]:
+        """
+        時柱のインデックスを計算
+
+        Args:
+            hour_shi_index: 時支インデックス（子時=0 … 亥時=11）
+            day_gan: 日干インデックス
 
-        return hour_gan, hour_shi
+        Returns:
+            (時干インデックス, 時支インデックス)
+        """
+        # 五鼠遁：日干から子時の時干を決定し、子時から現在時まで天干を順行
+        hour_gan = (self._goso_ton[day_gan] + hour_shi_index) % 10
+        return hour_gan, self._hour_shi[hour_shi_index]
 
     def calculate_five_elements(
         self,
@@ -284,22 +554,39 @@ class SuanmingCalculator:
         Returns:
             五行配点の辞書 {"木": score, "火": score, ...}
         """
-        five_elements = {"木": 0, "火": 0, "土": 0, "金": 0, "水": 0}
-
-        # 天干加算（36点固定）
-        for gan in [year_gan, month_gan, day_gan, hour_gan]:
-            elem = self.TENKAN_TO_ELEMENT[gan]
-            five_elements[elem] += self.TENKAN_SCORE
+        tenkan_index = self._tenkan_index
+        chishi_index = self._chishi_index
+        scores = self._five_elements_indices((
+            tenkan_index[year_gan], chishi_index[year_shi],
+            tenkan_index[month_gan], chishi_index[month_shi],
+            tenkan_index[day_gan], chishi_index[day_shi],
+            tenkan_index[hour_gan], chishi_index[hour_shi],
+        ))
+        return dict(zip(self.FIVE_ELEMENTS, scores))
+
+    def _five_elements_indices(self, pillars: Tuple[int, ...]) -> Tuple[int, ...]:
+        """
+        四柱のインデックスから五行配点を計算
 
-        # 地支加算（蔵干比率100点）
-        for shi in [year_shi, month_shi, day_shi, hour_shi]:
-            for zokkan_item in self.ZOKKAN[shi]:
-                gan = zokkan_item['gan']
-                ratio = zokkan_item['ratio']
-                elem = self.TENKAN_TO_ELEMENT[gan]
-                five_elements[elem] += ratio
+        Args:
+            pillars: (年干, 年支, 月干, 月支, 日干, 日支, 時干, 時支) のインデックス
 
-        return five_elements
+        Returns:
+            五行配点（FIVE_ELEMENTSの順）
+        """
+        gan_scores = self._gan_scores
+        shi_scores = self._shi_scores
+
+        # 天干加算（36点固定）と地支加算（蔵干比率100点）
+        return tuple(map(
+            sum,
+            zip(
+                gan_scores[pillars[0]], shi_scores[pillars[1]],
+                gan_scores[pillars[2]], shi_scores[pillars[3]],
+                gan_scores[pillars[4]], shi_scores[pillars[5]],
+                gan_scores[pillars[6]], shi_scores[pillars[7]],
+            )
+        ))
 
     def select_guardian_gods(
         self,
@@ -319,49 +606,122 @@ class SuanmingCalculator:
                 "excess": [過剰五行リスト]
             }
         """
+        scores = tuple(five_elements_score[elem] for elem in self.FIVE_ELEMENTS)
+        guardian_gods, taboo_elements, deficient, excess = self._select_guardian_indices(scores)
+
+        elements = self.FIVE_ELEMENTS
+        return {
+            "guardian_gods": [elements[i] for i in guardian_gods],
+            "taboo_elements": [elements[i] for i in taboo_elements],
+            "deficient": [elements[i] for i in deficient],
+            "excess": [elements[i] for i in excess]
+        }
+
+    def _select_guardian_indices(self, scores: Tuple[int, ...]) -> Tuple[Tuple[int, ...], ...]:
+        """
+        五行配点から守護神・忌神を選定（五行インデックス版）
+
+        Args:
+            scores: 五行配点（FIVE_ELEMENTSの順）
+
+        Returns:
+            (守護神, 忌神, 不足五行, 過剰五行) の五行インデックス
+
+        Note:
+            出現しうる五行配点はナレッジのスナップショットに選定表として収録済みのため、
+            通常は1回の辞書参照で済む。選定表にない配点は都度選定する。
+        """
+        lookup = self._guardian_lookup
+        if lookup is None:
+            guardian_table = self.tables['guardian_table']
+            lookup = self._guardian_lookup = dict(zip(
+                guardian_table['keys'], map(guardian_table['results'].__getitem__, guardian_table['codes'])
+            ))
+
+        if 0 <= min(scores) and max(scores) < self._score_limit:
+            shifts = self._score_shifts
+            result = lookup.get(
+                scores[0] | scores[1] << shifts[1] | scores[2] << shifts[2]
+                | scores[3] << shifts[3] | scores[4] << shifts[4]
+            )
+            if result is not None:
+                return result
+
+        return self._compute_guardian_indices(scores)
+
+    def _compute_guardian_indices(self, scores: Tuple[int, ...]) -> Tuple[Tuple[int, ...], ...]:
+        """
+        五行配点から守護神・忌神を選定（選定表を使わずに計算）
+
+        Args:
+            scores: 五行配点（FIVE_ELEMENTSの順）
+
+        Returns:
+            (守護神, 忌神, 不足五行, 過剰五行) の五行インデックス
+        """
         # 最小値・最大値の取得
-        min_score = min(five_elements_score.values())
-        max_score = max(five_elements_score.values())
+        min_score = min(scores)
+        max_score = max(scores)
 
         # 不足五行・過剰五行の抽出
-        deficient = [elem for elem, score in five_elements_score.items() if score == min_score]
-        excess = [elem for elem, score in five_elements_score.items() if score == max_score]
-
-        # 守護神候補
-        guardian_gods = []
+        deficient = tuple(i for i, score in enumerate(scores) if score == min_score)
+        excess = tuple(i for i, score in enumerate(scores) if score == max_score)
 
         # 1. 不足五行を守護神候補に追加（優先度1）
-        guardian_gods.extend(deficient)
+        guardian_gods = list(deficient)
 
         # 2. 過剰五行を制御する五行を守護神候補に追加（優先度3）
         for excess_elem in excess:
-            # 相剋関係を逆引き：過剰五行を制する五行を探す
-            for control_elem, controlled_elem in self.SOKOKU_RELATION.items():
-                if controlled_elem == excess_elem and control_elem not in guardian_gods:
+            for control_elem in self._controllers[excess_elem]:
+                if control_elem not in guardian_gods:
                     guardian_gods.append(control_elem)
 
         # 3. 不足五行を生じる五行を守護神候補に追加（優先度4）
         for deficient_elem in deficient:
-            # 相生関係を逆引き：不足五行を生じる五行を探す
-            for nourish_elem, nourished_elem in self.SHOSHO_RELATION.items():
-                if nourished_elem == deficient_elem and nourish_elem not in guardian_gods:
+            for nourish_elem in self._nourishers[deficient_elem]:
+                if nourish_elem not in guardian_gods:
                     guardian_gods.append(nourish_elem)
 
         # 忌神は過剰五行
-        taboo_elements = excess
+        return tuple(guardian_gods), excess, deficient, excess
 
-        return {
-            "guardian_gods": guardian_gods,
-            "taboo_elements": taboo_elements,
-            "deficient": deficient,
-            "excess": excess
-        }
+    def chart_key(self, birthdate: str, birthtime: str) -> Tuple[int, int, int, int]:
+        """
+        命式を決めるキー（日付の序数・時支・節気年・月支）
+
+        Args:
+            birthdate: 生年月日（YYYY-MM-DD形式）
+            birthtime: 生時刻（HH:MM形式）
+
+        Returns:
+            (序数, 時支インデックス, 節気年, 月支インデックス)。キーが同じなら命式も同じ
+        """
+        # 日時のパース
+        dt = datetime.strptime(f"{birthdate} {birthtime}", "%Y-%m-%d %H:%M")
+
+        return (
+            dt.toordinal(),
+            self._get_hour_shi_index(dt.hour),
+            *self.sekki.lookup(dt.year, dt.month, dt.day, dt.hour, dt.minute)
+        )
+
+    def chart(self, key: Tuple[int, int, int, int]) -> Chart:
+        """
+        キー（chart_key の結果）から命式を取得
+
+        Args:
+            key: (序数, 時支インデックス, 節気年, 月支インデックス)
+
+        Returns:
+            命式（Chart）
+        """
+        return self._chart_cache(*key)
 
     def analyze(
         self,
         birthdate: str,
         birthtime: str
-    ) -> Dict:
+    ) -> Chart:
         """
         生年月日・時刻から命式を計算
 
@@ -370,44 +730,440 @@ class SuanmingCalculator:
             birthtime: 生時刻（HH:MM形式）
 
         Returns:
-            命式計算結果の辞書
+            命式（Chart）。辞書と同じキーで参照でき、to_dict()で従来の辞書形式に変換できる
+
+        Note:
+            命式は日付・時支・節気（年・月）だけで決まるため、これらをキーに
+            キャッシュする。同じ時支内でも節入り時刻を跨げば別のキーになる。
         """
-        # 日時のパース
-        dt = datetime.strptime(f"{birthdate} {birthtime}", "%Y-%m-%d %H:%M")
-        year, month, day = dt.year, dt.month, dt.day
-        hour, minute = dt.hour, dt.minute
+        return self._chart_cache(*self.chart_key(birthdate, birthtime))
+
+    def _compute_chart(self, ordinal: int, hour_shi_index: int, solar_year: int, month_shi_index: int) -> Chart:
+        """
+        日付の序数・時支・節気から命式を計算
+
+        Args:
+            ordinal: 生年月日の序数（date.toordinal()）
+            hour_shi_index: 時支インデックス（子時=0 … 亥時=11）
+            solar_year: 節気年（立春で切り替わる年）
+            month_shi_index: 月支インデックス（寅月=0 … 丑月=11）
+
+        Returns:
+            命式（Chart）
+        """
+        # 命式ストアに収録済みなら参照のみ（節入り時刻を含む時支は収録対象外）
+        if self.chart_store is not None:
+            record = self.chart_store.get(ordinal, hour_shi_index)
+            if record is not None:
+                return Chart(*record, self._names)
 
         # 四柱の計算
-        year_gan, year_shi = self.calculate_year_pillar(year, month, day)
-        month_gan, month_shi = self.calculate_month_pillar(year, month, day, year_gan)
-        day_gan, day_shi = self.calculate_day_pillar(year, month, day)
-        hour_gan, hour_shi = self.calculate_hour_pillar(hour, minute, day_gan)
-
-        # 五行配点の計算
-        five_elements_score = self.calculate_five_elements(
-            year_gan, month_gan, day_gan, hour_gan,
-            year_shi, month_shi, day_shi, hour_shi
+        year_gan, year_shi = solar_year % 10, solar_year % 12
+        month_gan, month_shi = self._month_pillar_indices(month_shi_index, year_gan)
+        kanshi_number = day_kanshi_index(ordinal)
+        day_gan, day_shi = kanshi_number % 10, kanshi_number % 12
+        hour_gan, hour_shi = self._hour_pillar_indices(hour_shi_index, day_gan)
+
+        pillars = (year_gan, year_shi, month_gan, month_shi, day_gan, day_shi, hour_gan, hour_shi)
+
+        # 五行配点の計算・守護神の選定
+        scores = self._five_elements_indices(pillars)
+        guardian_gods, taboo_elements, deficient, excess = self._select_guardian_indices(scores)
+
+        return Chart(pillars, scores, guardian_gods, taboo_elements, deficient, excess, self._names)
+
+    def _get_batch_tables(self) -> Dict[str, np.ndarray]:
+        """一括計算用の参照テーブル（NumPy配列）を取得（初回呼び出し時に生成）"""
+        tables = self._batch_tables
+        if tables is None:
+            tables = {key: np.array(value) for key, value in self.tables.items()
+                      if key not in ("zokkan", "guardian_table")}
+            guardian_table = self.tables['guardian_table']
+            results = guardian_table['results']
+            tables["score_shifts"] = np.array(self._score_shifts, dtype=np.int64)
+            tables["guardian_keys"] = np.frombuffer(guardian_table['keys'], dtype=np.int64)
+            tables["guardian_codes"] = np.frombuffer(guardian_table['codes'], dtype=np.uint16)
+            # 結果ごとの (守護神, 忌神, 不足五行, 過剰五行) の真偽マスク (R, 4, 5)
+            tables["guardian_masks"] = np.array([
+                [[elem in elements for elem in range(5)] for elements in result] for result in results
+            ])
+            self._batch_tables = tables
+        return tables
+
+    def analyze_batch(self, birthdates, birthtimes=None) -> Dict[str, np.ndarray]:
+        """
+        複数の生年月日・時刻から命式を一括計算（NumPyベクトル演算）
+
+        Args:
+            birthdates: 生年月日の配列（datetime64 または date.toordinal() の整数序数）
+            birthtimes: 生時刻の配列（0時からの経過分の整数 または timedelta64）。
+                        省略時は全件12:00として計算
+
+        Returns:
+            列指向の計算結果:
+            {
+                "year_gan", "year_shi", ..., "hour_shi": 干支インデックス配列（TENKAN/CHISHIの添字）,
+                "five_elements_score": 五行配点 (N, 5)（FIVE_ELEMENTSの順）,
+                "guardian_gods", "taboo_elements", "deficient", "excess": 五行ごとの真偽マスク (N, 5)
+            }
+
+        Raises:
+            ValueError: 対応範囲（1800〜2200年）外の日付、または0〜1439分以外の時刻を含む場合
+        """
+        tables = self._get_batch_tables()
+
+        birthdates = np.asarray(birthdates)
+        if np.issubdtype(birthdates.dtype, np.datetime64):
+            ordinals = birthdates.astype('datetime64[D]').astype(np.int64) + _UNIX_EPOCH_ORDINAL
+        else:
+            ordinals = birthdates.astype(np.int64)
+
+        if birthtimes is None:
+            minutes = np.full(ordinals.shape, 12 * 60, dtype=np.int64)
+        else:
+            birthtimes = np.asarray(birthtimes)
+            if np.issubdtype(birthtimes.dtype, np.timedelta64):
+                minutes = birthtimes.astype('timedelta64[m]').astype(np.int64)
+            else:
+                minutes = birthtimes.astype(np.int64)
+            # analyze の strptime と同じく、翌日以降に繰り上がる時刻は受け付けない
+            if minutes.size and (minutes.min() < 0 or minutes.max() >= 1440):
+                raise ValueError("生時刻は0時からの経過分（0〜1439）で指定してください")
+
+        hour = minutes // 60
+
+        # 節気テーブルの二分探索（日本標準時 → UTC基準のエポック分）
+        instants = np.frombuffer(self.sekki.instants, dtype=np.int64)
+        epoch_minutes = (ordinals - _UNIX_EPOCH_ORDINAL) * 1440 + minutes - JST_OFFSET_MINUTES
+        position = np.searchsorted(instants, epoch_minutes, side='right') - 1
+        if position.size and (position.min() < 0 or position.max() >= len(instants) - 1):
+            raise ValueError("節気テーブルの対応範囲外です")
+
+        # 年柱（立春以前は前年扱い）
+        solar_year = self.sekki.start_year + (self.sekki.first_term - RISSHUN + position) // 24
+        year_gan = solar_year % 10
+        year_shi = solar_year % 12
+
+        # 月柱（直前の節で月支を決定）
+        month_index = (self.sekki.first_term + position - RISSHUN) % 24 // 2
+        month_shi = tables["month_shi"][month_index]
+        month_gan = (tables["goko_ton"][year_gan] + month_index) % 10
+
+        # 日柱（日柱テーブルを序数で参照）
+        kanshi = day_kanshi_indices(ordinals)
+        day_gan = kanshi % 10
+        day_shi = kanshi % 12
+
+        # 時柱（23時は子時）
+        hour_index = (hour + 1) // 2 % 12
+        hour_shi = tables["hour_shi"][hour_index]
+        hour_gan = (tables["goso_ton"][day_gan] + hour_index) % 10
+
+        # 五行配点
+        gan_scores = tables["gan_scores"]
+        shi_scores = tables["shi_scores"]
+        five_elements_score = (
+            gan_scores[year_gan] + gan_scores[month_gan] + gan_scores[day_gan] + gan_scores[hour_gan]
+            + shi_scores[year_shi] + shi_scores[month_shi] + shi_scores[day_shi] + shi_scores[hour_shi]
         )
 
-        # 守護神の選定
-        guardian_result = self.select_guardian_gods(five_elements_score)
+        # 守護神・忌神（選定表を二分探索。五行配点は選定表の範囲に必ず収まる）
+        keys = (five_elements_score << tables["score_shifts"]).sum(axis=-1)
+        guardian_keys = tables["guardian_keys"]
+        position = np.minimum(np.searchsorted(guardian_keys, keys), len(guardian_keys) - 1)
+        if not np.array_equal(guardian_keys[position], keys):
+            raise ValueError("五行配点が守護神選定表にありません（スナップショットを再生成してください）")
+        masks = tables["guardian_masks"][tables["guardian_codes"][position]]
+        guardian_gods = masks[..., 0, :]
+        deficient = masks[..., 2, :]
+        excess = masks[..., 3, :]
 
         return {
-            "year_gan": year_gan,
-            "year_shi": year_shi,
-            "month_gan": month_gan,
-            "month_shi": month_shi,
-            "day_gan": day_gan,
-            "day_shi": day_shi,
-            "hour_gan": hour_gan,
-            "hour_shi": hour_shi,
+            "year_gan": year_gan.astype(np.uint8),
+            "year_shi": year_shi.astype(np.uint8),
+            "month_gan": month_gan.astype(np.uint8),
+            "month_shi": month_shi.astype(np.uint8),
+            "day_gan": day_gan.astype(np.uint8),
+            "day_shi": day_shi.astype(np.uint8),
+            "hour_gan": hour_gan.astype(np.uint8),
+            "hour_shi": hour_shi.astype(np.uint8),
             "five_elements_score": five_elements_score,
-            "guardian_gods": guardian_result["guardian_gods"],
-            "taboo_elements": guardian_result["taboo_elements"],
-            "deficient": guardian_result["deficient"],
-            "excess": guardian_result["excess"]
+            "guardian_gods": guardian_gods,
+            "taboo_elements": excess,
+            "deficient": deficient,
+            "excess": excess
         }
 
+    def _luck_basis(self, birthdate: str, birthtime: str, gender: str, years: int) -> Dict[str, Any]:
+        """
+        大運の起点（命式・順逆・立運年齢）を計算
+
+        Args:
+            birthdate: 生年月日（YYYY-MM-DD形式）
+            birthtime: 生時刻（HH:MM形式）
+            gender: 性別（"male" または "female"）
+            years: 計算する年数（節気テーブルの範囲を事前に確認する）
+
+        Returns:
+            {"chart", "solar_year", "direction", "start_days", "start_age", "month_kanshi"}
+
+        Raises:
+            ValueError: 入力・対応範囲が不正な場合
+        """
+        if gender not in GENDERS:
+            raise ValueError(f"genderは{' / '.join(GENDERS)}のいずれかで指定してください")
+
+        dt = datetime.strptime(f"{birthdate} {birthtime}", "%Y-%m-%d %H:%M")
+        chart = self.analyze(birthdate, birthtime)
+        year_gan = chart.pillars[0]
+
+        # 陽干（甲丙戊庚壬）の男性・陰干の女性は順行、それ以外は逆行
+        is_yang = year_gan % 2 == 0
+        direction = 1 if is_yang == (gender == "male") else -1
+
+        # 順行は次の節入り、逆行は直前の節入りまでの日数を3で割って立運年齢とする
+        birth_minute = to_epoch_minutes(dt.year, dt.month, dt.day, dt.hour, dt.minute)
+        position = self.sekki.position(birth_minute)
+        solar_year, month_index = self.sekki.solar_year(position), self.sekki.month_index(position)
+        month_start = self.sekki.month_start_position(solar_year, month_index)
+        if direction > 0:
+            boundary = self.sekki.instants[month_start + 2] - birth_minute
+        else:
+            boundary = birth_minute - self.sekki.instants[month_start]
+        start_days = boundary / 1440
+
+        # 最終年の丑月の節入りまで節気テーブルに収まることを確認
+        self.sekki.month_start_position(solar_year + years - 1, 11)
+        start_age = max(1, int(start_days / LUCK_DAYS_PER_YEAR + 0.5))
+
+        # 月柱の六十干支番号（天干・地支の陰陽は必ず一致する）
+        month_gan, month_shi = chart.pillars[2], chart.pillars[3]
+        month_kanshi = (6 * month_gan - 5 * month_shi) % 60
+
+        return {
+            "chart": chart,
+            "solar_year": solar_year,
+            "direction": direction,
+            "start_days": start_days,
+            "start_age": start_age,
+            "month_kanshi": month_kanshi,
+        }
+
+    def _luck_columns(self, basis: Dict[str, Any], first_age: int, last_age: int,
+                      monthly: bool) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        年齢の範囲 [first_age, last_age) の大運・年運・月運を一括計算
+
+        Args:
+            basis: _luck_basis の結果
+            first_age: 開始年齢（満年齢、節気年で数える）
+            last_age: 終了年齢（この年齢を含まない）
+            monthly: 月運も計算するか
+
+        Returns:
+            {"periods": {...}, "years": {...}, "months": {...}（monthlyの場合のみ）}
+            各項目は列ごとのNumPy配列
+        """
+        tables = self._get_batch_tables()
+        chart = basis["chart"]
+        guardian = np.zeros(5, dtype=bool)
+        guardian[list(chart.guardian_gods)] = True
+        taboo = np.zeros(5, dtype=bool)
+        taboo[list(chart.taboo_elements)] = True
+
+        def score(gan: np.ndarray, shi: np.ndarray) -> np.ndarray:
+            # 運の干支の五行配点のうち、守護神の割合から忌神の割合を引いたもの（-1〜1）
+            vectors = tables["gan_scores"][gan] + tables["shi_scores"][shi]
+            return np.round((vectors @ guardian - vectors @ taboo) / vectors.sum(axis=-1), 3)
+
+        start_age = basis["start_age"]
+        ages = np.arange(first_age, last_age)
+        years = basis["solar_year"] + ages
+        periods = np.where(ages < start_age, 0, (ages - start_age) // LUCK_PERIOD_YEARS + 1)
+
+        # 大運：月柱から10年ごとに六十干支を順行・逆行（立運前は月柱そのもの）
+        period_index = np.unique(periods)
+        kanshi = (basis["month_kanshi"] + basis["direction"] * period_index) % 60
+        period_start = np.where(period_index == 0, 0, start_age + (period_index - 1) * LUCK_PERIOD_YEARS)
+        period_end = np.where(period_index == 0, start_age, period_start + LUCK_PERIOD_YEARS) - 1
+
+        # 年運：節気年の干支（立春から）。節入りの位置は month_start_position と同じ式で一括計算
+        year_gan, year_shi = years % 10, years % 12
+        instants = np.frombuffer(self.sekki.instants, dtype=np.int64)
+        year_position = (years - self.sekki.start_year) * 24 + RISSHUN - self.sekki.first_term
+        if year_position.size and (year_position.min() < 0 or year_position.max() + 22 >= len(instants)):
+            raise ValueError("節気テーブルの対応範囲外です")
+        year_start = instants[year_position]
+
+        columns = {
+            "periods": {
+                "period": period_index,
+                "start_age": period_start,
+                "end_age": period_end,
+                "gan": kanshi % 10,
+                "shi": kanshi % 12,
+                "score": score(kanshi % 10, kanshi % 12),
+            },
+            "years": {
+                "year": years,
+                "age": ages,
+                "period": periods,
+                "start_minute": year_start,
+                "gan": year_gan,
+                "shi": year_shi,
+                "score": score(year_gan, year_shi),
+            },
+        }
+
+        if monthly:
+            # 月運：節入りから次の節入りまで（五虎遁で月干を決定）
+            month_index = np.tile(np.arange(12), len(years))
+            month_year = np.repeat(years, 12)
+            month_gan = (tables["goko_ton"][month_year % 10] + month_index) % 10
+            month_shi = tables["month_shi"][month_index]
+            month_start = instants[np.repeat(year_position, 12) + month_index * 2]
+            columns["months"] = {
+                "year": month_year,
+                "age": np.repeat(ages, 12),
+                "month": month_index,
+                "start_minute": month_start,
+                "gan": month_gan,
+                "shi": month_shi,
+                "score": score(month_gan, month_shi),
+            }
+
+        return columns
+
+    def luck_timeline_arrays(
+        self,
+        birthdate: str,
+        birthtime: str,
+        gender: str,
+        years: int = 100,
+        monthly: bool = True
+    ) -> Dict[str, Any]:
+        """
+        大運・年運・月運を期間全体について一括計算（NumPyベクトル演算）
+
+        Args:
+            birthdate: 生年月日（YYYY-MM-DD形式）
+            birthtime: 生時刻（HH:MM形式）
+            gender: 性別（"male" または "female"）
+            years: 計算する年数（0歳から）
+            monthly: 月運も計算するか
+
+        Returns:
+            {
+                "direction": 1（順行）または -1（逆行）,
+                "start_age": 立運年齢,
+                "periods": 大運の列（period, start_age, end_age, gan, shi, score）,
+                "years": 年運の列（year, age, period, start_minute, gan, shi, score）,
+                "months": 月運の列（year, age, month, start_minute, gan, shi, score）
+            }
+            gan/shi は TENKAN/CHISHI の添字、start_minute はUTC基準のエポック分、
+            month は月支インデックス（寅月=0 … 丑月=11）、score は命式の守護神・忌神に対する評価（-1〜1）
+
+        Raises:
+            ValueError: 入力・対応範囲が不正な場合
+        """
+        basis = self._luck_basis(birthdate, birthtime, gender, years)
+        columns = self._luck_columns(basis, 0, years, monthly)
+        return {"direction": basis["direction"], "start_age": basis["start_age"], **columns}
+
+    def luck_timeline(
+        self,
+        birthdate: str,
+        birthtime: str,
+        gender: str,
+        years: int = 100,
+        monthly: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        大運・年運・月運を時系列順に逐次生成
+
+        大運ごとに計算するため、最初の大運の分はすぐに取り出せる。
+        入力の検証と立運の計算は呼び出し時に行う（不正な入力はイテレーション前に例外となる）。
+
+        Args:
+            birthdate: 生年月日（YYYY-MM-DD形式）
+            birthtime: 生時刻（HH:MM形式）
+            gender: 性別（"male" または "female"）
+            years: 生成する年数（0歳から）
+            monthly: 月運も生成するか
+
+        Returns:
+            次の辞書を順に返すイテレータ:
+            {"type": "period", "period", "start_age", "end_age", "gan", "shi", "score"}
+            {"type": "year", "year", "age", "period", "start", "gan", "shi", "score"}
+            {"type": "month", "year", "month", "start", "gan", "shi", "score"}（monthlyの場合、各年の後）
+
+        Raises:
+            ValueError: 入力・対応範囲が不正な場合
+        """
+        basis = self._luck_basis(birthdate, birthtime, gender, years)
+        return self._iter_luck(basis, years, monthly)
+
+    def _iter_luck(self, basis: Dict[str, Any], years: int, monthly: bool) -> Iterator[Dict[str, Any]]:
+        """luck_timeline の本体（大運ごとに _luck_columns で計算して展開）"""
+        tenkan, chishi = self.TENKAN, self.CHISHI
+        boundaries = [0, basis["start_age"]]
+        while boundaries[-1] < years:
+            boundaries.append(boundaries[-1] + LUCK_PERIOD_YEARS)
+
+        for first_age, last_age in zip(boundaries, boundaries[1:]):
+            last_age = min(last_age, years)
+            if first_age >= last_age:
+                continue
+            columns = self._luck_columns(basis, first_age, last_age, monthly)
+
+            period = columns["periods"]
+            yield {
+                "type": "period",
+                "period": int(period["period"][0]),
+                "start_age": int(period["start_age"][0]),
+                "end_age": int(period["end_age"][0]),
+                "gan": tenkan[period["gan"][0]],
+                "shi": chishi[period["shi"][0]],
+                "score": float(period["score"][0]),
+            }
+
+            year_columns = columns["years"]
+            for i in range(len(year_columns["year"])):
+                yield {
+                    "type": "year",
+                    "year": int(year_columns["year"][i]),
+                    "age": int(year_columns["age"][i]),
+                    "period": int(year_columns["period"][i]),
+                    "start": _epoch_minutes_to_iso(int(year_columns["start_minute"][i])),
+                    "gan": tenkan[year_columns["gan"][i]],
+                    "shi": chishi[year_columns["shi"][i]],
+                    "score": float(year_columns["score"][i]),
+                }
+                if monthly:
+                    month_columns = columns["months"]
+                    for j in range(i * 12, i * 12 + 12):
+                        yield {
+                            "type": "month",
+                            "year": int(month_columns["year"][j]),
+                            "month": int(month_columns["month"][j]),
+                            "start": _epoch_minutes_to_iso(int(month_columns["start_minute"][j])),
+                            "gan": tenkan[month_columns["gan"][j]],
+                            "shi": chishi[month_columns["shi"][j]],
+                            "score": float(month_columns["score"][j]),
+                        }
+
+
+# 共有インスタンス（モジュールレベルの便利関数用）
+_calculator = None
+
+
+def get_calculator() -> SuanmingCalculator:
+    """算命学計算インスタンスを取得（プロセス内で共有）"""
+    global _calculator
+    if _calculator is None:
+        _calculator = SuanmingCalculator()
+    return _calculator
+
 
 # モジュールレベルの便利関数
 def analyze_suanming(birthdate: str, birthtime: str) -> Dict:
@@ -421,5 +1177,4 @@ def analyze_suanming(birthdate: str, birthtime: str) -> Dict:
     Returns:
         命式計算結果の辞書
     """
-    calculator = SuanmingCalculator()
-    return calculator.analyze(birthdate, birthtime)
+    return get_calculator().analyze(birthdate, birthtime).to_dict()
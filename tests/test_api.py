@@ -0,0 +1,533 @@
+"""
+APIエンドポイントのテスト
+Flaskのテストクライアントで検証
+"""
+
+import sys
+from pathlib import Path
+
+# app/apiディレクトリをPythonパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent / 'app' / 'api'))
+
+import pytest
+from main import app
+
+
+@pytest.fixture
+def client():
+    """テスト用のFlaskクライアント"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+class TestHealth:
+    """ヘルスチェックのテスト"""
+
+    def test_health(self, client):
+        response = client.get('/api/v1/health')
+        assert response.status_code == 200
+        assert response.get_json()["status"] == "ok"
+
+
+class TestAnalyze:
+    """総合分析エンドポイントのテスト"""
+
+    def test_default_calendar_system(self, client):
+        """暦法の指定がなければDreamspell方式（従来どおり）"""
+        response = client.post('/api/v1/analyze', json={"birthdate": "1992-07-15"})
+        assert response.status_code == 200
+        data = response.get_json()["data"]
+        assert data["maya"]["kin"] == 255
+        assert data["maya"]["system"] == "Dreamspell (13 Moon Calendar)"
+        assert "maya_systems" not in data
+
+    def test_multiple_calendar_systems(self, client):
+        """複数の暦法を指定すると暦法ごとの結果を返し、先頭の暦法を maya にする"""
+        response = client.post('/api/v1/analyze', json={
+            "birthdate": "1962-01-01",
+            "calendar_system": ["table", "dreamspell", "table"]
+        })
+        assert response.status_code == 200
+        data = response.get_json()["data"]
+        assert set(data["maya_systems"]) == {"table", "dreamspell"}
+        assert data["maya"] == data["maya_systems"]["table"]
+        assert data["maya"]["kin"] == 63
+
+    @pytest.mark.parametrize("calendar_system", ["unknown", [], [{"name": "table"}]])
+    def test_invalid_calendar_system(self, client, calendar_system):
+        response = client.post('/api/v1/analyze', json={
+            "birthdate": "1992-07-15", "calendar_system": calendar_system
+        })
+        assert response.status_code == 400
+
+
+class TestAnalyzeCache:
+    """総合分析のレスポンスキャッシュ（ETag）のテスト"""
+
+    def test_etag_and_not_modified(self, client):
+        """同じ入力は同じETagで、If-None-Match が一致すれば304（POST・GETとも）"""
+        body = {"birthdate": "1992-07-15", "birth_time": "08:10", "categories": ["仕事", "恋愛"]}
+        first = client.post('/api/v1/analyze', json=body)
+        second = client.post('/api/v1/analyze', json={**body, "birth_time": "08:50"})
+        assert first.status_code == second.status_code == 200
+        assert first.headers["ETag"] == second.headers["ETag"]
+        assert first.headers["Cache-Control"] == "private, no-cache"
+        assert first.get_json()["data"] == second.get_json()["data"]
+        assert first.get_json()["request_id"] != second.get_json()["request_id"]
+
+        etag = first.headers["ETag"]
+        response = client.post('/api/v1/analyze', json=body, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag and not response.data
+
+        query = '/api/v1/analyze?birthdate=1992-07-15&birth_time=08:10&categories=仕事,恋愛'
+        assert client.get(query).get_json()["data"] == first.get_json()["data"]
+        assert client.get(query, headers={"If-None-Match": etag}).status_code == 304
+
+    @pytest.mark.parametrize("change", [
+        {"birth_time": "09:10"},
+        {"categories": ["恋愛"]},
+        {"calendar_system": "table"},
+        {"llm_prefs": {"temperature": 0.8}},
+    ])
+    def test_etag_varies_with_input(self, client, change):
+        """時支・カテゴリ・暦法・llm_prefs が違えば別のETagになり、304にならない"""
+        body = {"birthdate": "1992-07-15", "birth_time": "08:10"}
+        etag = client.post('/api/v1/analyze', json=body).headers["ETag"]
+        response = client.post('/api/v1/analyze', json={**body, **change}, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_etag_includes_version(self):
+        """ETagはバージョンが変わると変わる"""
+        from response_cache import ResponseCache
+
+        first = ResponseCache(str, "1:a")
+        assert first.get(("key",)) == ("('key',)", first.etag(("key",)))
+        assert first.get(("key",))[1] != ResponseCache(str, "2:a").get(("key",))[1]
+        assert first.cache_info().hits == 1
+
+
+class TestAnalyzeBatch:
+    """一括分析エンドポイントのテスト"""
+
+    def test_json_array_matches_analyze(self, client, monkeypatch):
+        """入力順に1行1件で、同じ入力はまとめて計算し、結果は総合分析と一致する"""
+        import json
+        import main
+
+        monkeypatch.setattr(main, 'BATCH_CHUNK_SIZE', 2)
+        records = [
+            {"id": "a", "birthdate": "1992-07-15"},
+            {"birthdate": "1962-01-01", "birth_time": "08:30", "categories": ["恋愛"]},
+            {"id": "c", "birthdate": "1992-07-15"},
+        ]
+        response = client.post('/api/v1/analyze/batch', json=records)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [row["index"] for row in rows] == [0, 1, 2]
+        assert rows[0]["id"] == "a" and "id" not in rows[1] and rows[2]["id"] == "c"
+        assert rows[0]["data"] == rows[2]["data"]
+
+        for record, row in zip(records, rows):
+            expected = client.post('/api/v1/analyze', json=record).get_json()["data"]
+            del expected["llm"]
+            assert row["data"] == expected
+
+    def test_ndjson_multiple_systems(self, client):
+        """NDJSONの入力と、複数の暦法の指定"""
+        import json
+
+        body = '{"birthdate": "1962-01-01"}\n\n{"birthdate": "1987-07-26"}\n'
+        response = client.post('/api/v1/analyze/batch?calendar_system=table,dreamspell',
+                               data=body, content_type='application/x-ndjson')
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert len(rows) == 2
+        assert rows[0]["data"]["maya"]["kin"] == 63
+        assert rows[0]["data"]["maya_systems"]["dreamspell"]["kin"] == 30
+        assert rows[1]["data"]["maya_systems"]["dreamspell"]["kin"] == 1
+
+    def test_record_errors(self, client):
+        """不正な入力はその行だけエラーにする"""
+        import json
+
+        body = '{"birthdate": "1992/07/15"}\nnot json\n[1]\n{"birthdate": "1992-07-15", "categories": [1]}\n' \
+               '{"id": 5, "birthdate": "1992-07-15", "birth_time": "25:00"}\n{"birthdate": "1992-07-15"}\n'
+        response = client.post('/api/v1/analyze/batch', data=body, content_type='application/x-ndjson')
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [row.get("status") for row in rows] == ["error"] * 5 + [None]
+        assert rows[4]["id"] == 5
+        assert rows[5]["data"]["maya"]["kin"] == 255
+
+    def test_out_of_range_record(self, client):
+        """日柱の対応範囲外の日付はその行だけエラーにし、同じチャンクの他の行は返す"""
+        import json
+
+        records = [{"birthdate": "1992-07-15"}, {"birthdate": "1799-12-31"},
+                   {"birthdate": "2201-01-01"}, {"birthdate": "1962-01-01"}]
+        assert client.post('/api/v1/analyze', json=records[1]).status_code == 400
+
+        response = client.post('/api/v1/analyze/batch', json=records)
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [row["index"] for row in rows] == [0, 1, 2, 3]
+        assert [row.get("status") for row in rows] == [None, "error", "error", None]
+        assert rows[1]["message"]
+        assert rows[3]["data"]["maya"]["kin"] == 30
+
+    def test_ndjson_record_limit(self, client, monkeypatch):
+        """上限を超えたNDJSONは、上限までの結果を送ってからエラーの行で終える"""
+        import json
+        import main
+
+        monkeypatch.setattr(main, 'MAX_BATCH_RECORDS', 3)
+        monkeypatch.setattr(main, 'BATCH_CHUNK_SIZE', 2)
+        body = '{"birthdate": "1992-07-15"}\n' * 5
+        response = client.post('/api/v1/analyze/batch', data=body, content_type='application/x-ndjson')
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [row["index"] for row in rows] == [0, 1, 2, 3]
+        assert all(row["data"]["maya"]["kin"] == 255 for row in rows[:3])
+        assert rows[3]["status"] == "error"
+
+    @pytest.mark.parametrize("url, body", [
+        ('/api/v1/analyze/batch', {"birthdate": "1992-07-15"}),
+        ('/api/v1/analyze/batch', []),
+        ('/api/v1/analyze/batch?calendar_system=unknown', [{"birthdate": "1992-07-15"}]),
+    ])
+    def test_invalid(self, client, url, body):
+        response = client.post(url, json=body)
+        assert response.status_code == 400
+
+
+class TestCalendar:
+    """Kinカレンダーエンドポイントのテスト"""
+
+    def test_stream_ndjson(self, client):
+        """1日1行で、Kinと日柱が総合分析と一致する"""
+        import json
+
+        response = client.get('/api/v1/calendar?from=2023-12-30&to=2024-03-01')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert len(rows) == 63
+        assert rows[0]["date"] == "2023-12-30" and rows[-1]["date"] == "2024-03-01"
+
+        for row in (rows[2], rows[61]):
+            analysis = client.post('/api/v1/analyze', json={"birthdate": row["date"]}).get_json()["data"]
+            assert row["kin"] == analysis["maya"]["kin"]
+            assert row["solar_seal"] == analysis["maya"]["solar_seal"]
+            assert row["tone"] == analysis["maya"]["tone"]
+            assert row["day_pillar"] == analysis["suanming"]["day_gan"] + analysis["suanming"]["day_shi"]
+        assert rows[2]["day_pillar"] == "甲子"
+
+    def test_json_multiple_systems(self, client):
+        """format=json は配列を返し、複数の暦法を指定すると暦法ごとの値を含む"""
+        response = client.get('/api/v1/calendar?from=1962-01-01&to=1962-01-10&system=table,dreamspell&format=json')
+        assert response.status_code == 200
+        rows = response.get_json()
+        assert len(rows) == 10
+        assert rows[0]["kin"] == 63
+        assert rows[0]["systems"]["table"]["kin"] == 63
+        assert rows[0]["systems"]["dreamspell"]["kin"] == 30
+
+    def test_long_range_chunks(self, client):
+        """年をまたぐ長い期間でも日付が連続する"""
+        from datetime import date
+
+        response = client.get('/api/v1/calendar?from=1990-01-01&to=2009-12-31&format=json')
+        rows = response.get_json()
+        assert len(rows) == date(2009, 12, 31).toordinal() - date(1990, 1, 1).toordinal() + 1
+        assert [row["kin"] for row in rows[365:368]] == [(rows[364]["kin"] + i - 1) % 260 + 1 for i in (1, 2, 3)]
+
+    @pytest.mark.parametrize("query", [
+        "",
+        "from=2024-01-01",
+        "from=2024/01/01&to=2024-01-02",
+        "from=2024-01-02&to=2024-01-01",
+        "from=1700-01-01&to=1700-01-02",
+        "from=2024-01-01&to=2024-01-02&format=csv",
+        "from=2024-01-01&to=2024-01-02&system=unknown",
+    ])
+    def test_invalid(self, client, query):
+        response = client.get(f'/api/v1/calendar?{query}')
+        assert response.status_code == 400
+
+
+class TestSearch:
+    """命式検索エンドポイントのテスト"""
+
+    def test_search_matches_analyze(self, client):
+        """検索結果の全日付が条件を満たし、期間内の該当日を漏れなく返す"""
+        from datetime import date, timedelta
+        from suanming import get_calculator
+
+        criteria = {"day_pillar": "甲子", "guardian_gods": ["火"]}
+        response = client.post('/api/v1/search', json={
+            "criteria": criteria, "from": "1990-01-01", "to": "1999-12-31"
+        })
+        assert response.status_code == 200
+        data = response.get_json()["data"]
+
+        calculator = get_calculator()
+        expected = []
+        day = date(1990, 1, 1)
+        while day <= date(1999, 12, 31):
+            chart = calculator.analyze(day.isoformat(), "12:00")
+            if chart["day_gan"] + chart["day_shi"] == "甲子" and "火" in chart["guardian_gods"]:
+                expected.append(day.isoformat())
+            day += timedelta(days=1)
+
+        assert data["dates"] == expected
+        assert data["count"] == len(expected)
+        assert data["truncated"] is False
+
+    def test_search_by_kin(self, client):
+        """Kin・銀河の音で検索できる"""
+        from maya_improved import analyze_maya
+
+        response = client.post('/api/v1/search', json={
+            "criteria": {"kin": [1, 14], "tone": 1}, "from": "2000-01-01", "to": "2001-12-31"
+        })
+        data = response.get_json()["data"]
+        assert data["count"] > 0
+        for day in data["dates"]:
+            assert analyze_maya(day)["kin"] in (1, 14)
+
+    def test_search_limit(self, client):
+        """limitで件数を打ち切る"""
+        response = client.post('/api/v1/search', json={"criteria": {"day_gan": "甲"}, "limit": 5})
+        data = response.get_json()["data"]
+        assert len(data["dates"]) == 5
+        assert data["count"] > 5
+        assert data["truncated"] is True
+
+    @pytest.mark.parametrize("body", [
+        {},
+        {"criteria": {"unknown": "甲"}},
+        {"criteria": {"hour_shi": "子"}},
+        {"criteria": {"hour_pillar": "甲子"}},
+        {"criteria": {"day_gan": "子"}},
+        {"criteria": {"kin": 261}},
+        {"criteria": {"kin": True}},
+        {"criteria": {"tone": [1, False]}},
+        {"criteria": {"day_pillar": "甲"}},
+        {"criteria": {"day_gan": "甲"}, "from": "1800-01-01"},
+        {"criteria": {"day_gan": "甲"}, "from": "2000/01/01"},
+        {"criteria": {"day_gan": "甲"}, "limit": -1},
+    ])
+    def test_search_invalid(self, client, body):
+        """不正な検索条件は400を返す"""
+        response = client.post('/api/v1/search', json=body)
+        assert response.status_code == 400
+        assert response.get_json()["status"] == "error"
+
+
+class TestLuckTimeline:
+    """大運・年運タイムラインエンドポイントのテスト"""
+
+    def test_stream_ndjson(self, client):
+        """NDJSONで大運・年運・月運を時系列順に返す"""
+        import json
+
+        response = client.post('/api/v1/luck', json={
+            "birthdate": "1985-03-15", "birth_time": "10:30", "gender": "female", "years": 20, "monthly": True
+        })
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+
+        entries = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert entries[0] == {
+            "type": "period", "period": 0, "start_age": 0, "end_age": 6,
+            "gan": "己", "shi": "卯", "score": entries[0]["score"]
+        }
+        assert sum(e["type"] == "year" for e in entries) == 20
+        assert sum(e["type"] == "month" for e in entries) == 240
+
+    @pytest.mark.parametrize("body", [
+        {},
+        {"birthdate": "1985-03-15"},
+        {"birthdate": "1985-03-15", "gender": "male", "years": 0},
+        {"birthdate": "1985/03/15", "gender": "male"},
+        {"birthdate": "2150-01-01", "gender": "male", "years": 100},
+    ])
+    def test_invalid(self, client, body):
+        """不正な入力はストリーミング前に400を返す"""
+        response = client.post('/api/v1/luck', json=body)
+        assert response.status_code == 400
+
+
+class TestCompatibility:
+    """相性計算エンドポイントのテスト"""
+
+    def test_pair_detail(self, client):
+        """2人の場合は相性の内訳を返す"""
+        response = client.post('/api/v1/compatibility', json={"people": [
+            {"id": "a", "birthdate": "1985-03-15", "birth_time": "10:30"},
+            {"id": "b", "birthdate": "1992-07-15"},
+        ]})
+        assert response.status_code == 200
+        data = response.get_json()["data"]
+
+        assert data["matches"][0]["partners"][0]["id"] == "b"
+        assert data["matches"][1]["partners"][0]["id"] == "a"
+        assert data["matches"][0]["partners"][0]["score"] == data["detail"]["score"]
+        assert set(data["detail"]["suanming"]) == {"kango", "shigo", "chuu", "complement"}
+
+    def test_top_k_matches_full_matrix(self, client):
+        """上位k件が全組の相性行列の上位と一致する"""
+        import numpy as np
+        from compatibility import get_compatibility_engine
+
+        birthdates = [f"{1960 + i}-{i % 12 + 1:02d}-{i % 28 + 1:02d}" for i in range(40)]
+        response = client.post('/api/v1/compatibility', json={
+            "people": [{"id": i, "birthdate": birthdate} for i, birthdate in enumerate(birthdates)],
+            "top_k": 4
+        })
+        matches = response.get_json()["data"]["matches"]
+
+        engine = get_compatibility_engine()
+        matrix = engine.score_matrix(engine.build_profiles(birthdates))
+        np.fill_diagonal(matrix, -np.inf)
+        for i, match in enumerate(matches):
+            expected = np.sort(matrix[i])[::-1][:4]
+            assert [p["score"] for p in match["partners"]] == pytest.approx(list(expected), abs=1e-3)
+            assert i not in [p["id"] for p in match["partners"]]
+
+    @pytest.mark.parametrize("body", [
+        {},
+        {"people": [{"birthdate": "1985-03-15"}]},
+        {"people": [{"birthdate": "1985-03-15"}, {"id": "x"}]},
+        {"people": [{"birthdate": "1985-03-15"}, {"birthdate": "1985/03/15"}]},
+        {"people": [{"birthdate": "1985-03-15"}, {"birthdate": "1700-01-01"}]},
+        {"people": [{"birthdate": "1985-03-15"}, {"birthdate": "1992-07-15"}], "top_k": 0},
+    ])
+    def test_invalid(self, client, body):
+        """不正な入力は400を返す"""
+        response = client.post('/api/v1/compatibility', json=body)
+        assert response.status_code == 400
+
+
+def _asgi_request(bridge, method, path, body=b'', query=b'', content_type=b'application/json'):
+    """ASGIアプリケーションを直接呼び出し、送信されたメッセージを返す"""
+    import asyncio
+
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop() if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+             'headers': [(b'content-type', content_type)]}
+    asyncio.run(bridge(scope, receive, send))
+    return sent
+
+
+class TestAsgi:
+    """ASGIでの起動（asgi.py）のテスト"""
+
+    @pytest.fixture
+    def bridge(self):
+        from asgi import AsgiBridge
+
+        bridge = AsgiBridge(app, compute_threads=2, io_threads=8)
+        yield bridge
+        bridge.shutdown()
+
+    def test_same_response_as_wsgi(self, bridge, client):
+        """WSGIと同じステータス・ヘッダー・本文を返す（ストリーミングを含む）"""
+        import json
+
+        sent = _asgi_request(bridge, 'POST', '/api/v1/analyze', b'{"birthdate": "1992-07-15"}')
+        assert sent[0]['status'] == 200
+        assert dict(sent[0]['headers'])[b'etag'].decode() == \
+            client.post('/api/v1/analyze', json={"birthdate": "1992-07-15"}).headers["ETag"]
+        body = b"".join(message.get('body', b'') for message in sent[1:])
+        assert json.loads(body)["data"]["maya"]["kin"] == 255
+        assert sent[-1] == {'type': 'http.response.body', 'body': b'', 'more_body': False}
+
+        sent = _asgi_request(bridge, 'GET', '/api/v1/calendar', query=b'from=1990-01-01&to=1999-12-31')
+        body = b"".join(message.get('body', b'') for message in sent[1:])
+        assert body == client.get('/api/v1/calendar?from=1990-01-01&to=1999-12-31').data
+
+        sent = _asgi_request(bridge, 'POST', '/api/v1/analyze', b'{"birthdate": "1992/07/15"}')
+        assert sent[0]['status'] == 400
+
+    def test_deferred_io_runs_after_response(self, bridge, monkeypatch):
+        """計算履歴の保存は応答を送り終えた後にI/O用のスレッドで実行する"""
+        import threading
+        import main
+
+        calls = []
+        monkeypatch.setattr(main, 'CALC_LOGS_ENABLED', True)
+        monkeypatch.setattr(main, 'save_calc_log', lambda data, result: calls.append(
+            (data["birthdate"], threading.current_thread().name)))
+
+        sent = _asgi_request(bridge, 'POST', '/api/v1/analyze', b'{"birthdate": "1992-07-15"}')
+        assert sent[-1]['more_body'] is False
+        assert calls == [("1992-07-15", calls[0][1])] and calls[0][1].startswith('io')
+
+    def test_deferred_io_is_concurrent(self, bridge, monkeypatch):
+        """遅いI/Oは並行して待ち、計算用のスレッドを塞がない（全リクエストの保存の実行期間が重なる）"""
+        import asyncio
+        import threading
+        import time
+        import main
+
+        count = 8
+        barrier = threading.Barrier(count, timeout=5)
+        intervals = []
+
+        def save_calc_log(data, result):
+            # 全ての保存が同時に実行中になるまで待つ（直列に実行されると BrokenBarrierError）
+            started = time.perf_counter()
+            barrier.wait()
+            intervals.append((started, time.perf_counter()))
+
+        monkeypatch.setattr(main, 'CALC_LOGS_ENABLED', True)
+        monkeypatch.setattr(main, 'save_calc_log', save_calc_log)
+
+        async def request():
+            messages = [{'type': 'http.request', 'body': b'{"birthdate": "1992-07-15"}', 'more_body': False}]
+
+            async def receive():
+                return messages.pop() if messages else {'type': 'http.disconnect'}
+
+            async def send(message):
+                pass
+
+            await bridge({'type': 'http', 'method': 'POST', 'path': '/api/v1/analyze',
+                          'headers': [(b'content-type', b'application/json')]}, receive, send)
+
+        async def run_all():
+            await asyncio.gather(*(request() for _ in range(count)))
+
+        asyncio.run(run_all())
+        assert len(intervals) == count
+        assert max(start for start, _ in intervals) < min(end for _, end in intervals)
+
+    def test_deferred_io_wsgi(self, client, monkeypatch):
+        """WSGIでは応答を閉じた後に同じワーカーで実行する"""
+        import main
+
+        calls = []
+        monkeypatch.setattr(main, 'CALC_LOGS_ENABLED', True)
+        monkeypatch.setattr(main, 'save_calc_log', lambda data, result: calls.append(data["birthdate"]))
+
+        response = client.post('/api/v1/analyze', json={"birthdate": "1992-07-15"})
+        assert response.status_code == 200
+        assert calls == []
+        response.close()
+        assert calls == ["1992-07-15"]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,429 @@
+"""
+マヤ暦計算の単体テスト
+"""
+
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# app/apiディレクトリをPythonパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent / 'app' / 'api'))
+
+import numpy as np
+import pytest
+import maya
+from kin_resolver import KinTableResolver, table_year
+from kin_verifier import verify_cycle_tables, verify_kin_table
+import maya_improved
+from calendar_systems import (
+    CALENDAR_END,
+    CALENDAR_START,
+    CALENDAR_SYSTEMS,
+    CalendarSystem,
+    build_kin_table_file,
+    get_calendar_system,
+)
+from maya_improved import (
+    KIN_TABLE,
+    MAYA_BASE_DATE,
+    SOLAR_SEALS,
+    WAVESPELLS,
+    analyze_maya,
+    analyze_maya_batch,
+    analyze_maya_classical,
+    load_kin_table_file,
+    write_kin_table_file,
+    calculate_kin,
+    calculate_kin_batch,
+    count_leap_days_between,
+    is_leap_year,
+)
+
+
+def _count_leap_days_between_loop(start_date: date, end_date: date) -> int:
+    """閏日の回数（閉形式化する前の実装：年ごとのループ）"""
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+
+    leap_days = 0
+    for year in range(start_date.year, end_date.year + 1):
+        if is_leap_year(year):
+            feb29 = date(year, 2, 29)
+            if start_date <= feb29 <= end_date:
+                leap_days += 1
+
+    return leap_days
+
+
+class TestLeapDays:
+    """閏日の回数のテスト"""
+
+    @pytest.mark.parametrize("start, end, expected", [
+        (date(2000, 2, 29), date(2000, 2, 29), 1),
+        (date(2000, 2, 28), date(2000, 3, 1), 1),
+        (date(2000, 3, 1), date(2004, 2, 28), 0),
+        (date(1900, 1, 1), date(1900, 12, 31), 0),
+        (date(1600, 1, 1), date(2400, 12, 31), 195),
+        (date(2024, 3, 1), date(1987, 7, 26), 10),
+    ])
+    def test_known_counts(self, start, end, expected):
+        assert count_leap_days_between(start, end) == expected
+
+    def test_closed_form_matches_loop_1600_2400(self):
+        """1600〜2400年の全日付で、基準日との閏日の回数とKinが旧実装と一致する
+
+        旧実装は区間内の2月29日を数えるだけなので、区間を年の境目で分けて数えても値は変わらない。
+        各日付では同じ年の中だけを旧実装で数え、年をまたぐ部分は年ごとに1度だけ旧実装で求める
+        （全日付で旧実装を直接呼ぶと20秒以上かかるため）。
+        """
+        base = MAYA_BASE_DATE
+
+        # 年をまたぐ部分：基準日〜前年末、翌年初〜基準日
+        after = {year: _count_leap_days_between_loop(base, date(year - 1, 12, 31))
+                 for year in range(base.year + 1, 2401)}
+        before = {year: _count_leap_days_between_loop(date(year + 1, 1, 1), base)
+                  for year in range(1600, base.year)}
+
+        day = date(1600, 1, 1)
+        while day <= date(2400, 12, 31):
+            if day >= base:
+                expected = after.get(day.year, 0) + _count_leap_days_between_loop(
+                    max(base, date(day.year, 1, 1)), day)
+                effective_days = (day - base).days - expected
+            else:
+                expected = before.get(day.year, 0) + _count_leap_days_between_loop(
+                    day, min(base, date(day.year, 12, 31)))
+                effective_days = (day - base).days + expected
+
+            assert count_leap_days_between(base, day) == expected, day
+            assert count_leap_days_between(day, base) == expected, day
+            assert calculate_kin(day.isoformat()) == effective_days % 260 + 1, day
+            day += timedelta(days=1)
+
+
+class TestKin:
+    """Kin番号のテスト"""
+
+    @pytest.mark.parametrize("birthdate, expected", [
+        ("1987-07-26", 1),
+        ("1987-07-25", 260),
+        ("2000-02-28", 178),
+        ("2000-02-29", 178),
+        ("2000-03-01", 179),
+        ("1984-02-29", 59),
+        ("1984-03-01", 59),
+    ])
+    def test_known_kin(self, birthdate, expected):
+        assert calculate_kin(birthdate) == expected
+
+
+class TestKinOracle:
+    """オラクル（ガイド・類似・反対・神秘）のテスト"""
+
+    @pytest.mark.parametrize("kin, guide, analog, antipode, occult", [
+        (1, 1, 118, 131, 260),
+        (2, 54, 197, 132, 259),
+        (4, 160, 95, 134, 257),
+        (20, 72, 59, 150, 241),
+        (200, 148, 239, 70, 61),
+        (260, 104, 39, 130, 1),
+    ])
+    def test_known_oracle(self, kin, guide, analog, antipode, occult):
+        row = KIN_TABLE[kin - 1]
+        assert (row["guide_kin"], row["analog_kin"], row["antipode_kin"], row["occult_kin"]) == (
+            guide, analog, antipode, occult)
+
+    def test_oracle_rules(self):
+        """全Kinで音・色・紋章番号の関係が成り立つ"""
+        seal_number = {seal: i + 1 for i, seal in enumerate(SOLAR_SEALS)}
+        for kin, row in enumerate(KIN_TABLE, start=1):
+            assert row["kin"] == kin
+            for key in ("guide", "analog", "antipode"):
+                partner = KIN_TABLE[row[f"{key}_kin"] - 1]
+                assert partner["tone"] == row["tone"]
+                assert partner["solar_seal"] == row[f"{key}_seal"]
+            assert seal_number[row["guide_seal"]] % 4 == seal_number[row["solar_seal"]] % 4
+            assert (seal_number[row["analog_seal"]] + seal_number[row["solar_seal"]]) % 20 == 19
+            assert (seal_number[row["antipode_seal"]] - seal_number[row["solar_seal"]]) % 20 == 10
+            assert (seal_number[row["occult_seal"]] + seal_number[row["solar_seal"]]) % 20 == 1
+            assert KIN_TABLE[row["occult_kin"] - 1]["tone"] == 14 - row["tone"]
+
+    def test_analyze_maya_returns_shared_row(self):
+        """analyze_mayaは表の読み取り専用の行をそのまま返す（既存のキーも維持）"""
+        result = analyze_maya("1992-07-15")
+        assert result is KIN_TABLE[254]
+        assert result["kin"] == 255
+        assert result["solar_seal"] == "青い鷲"
+        assert result["system"] == "Dreamspell (13 Moon Calendar)"
+        assert result["occult_kin"] == 6
+
+        with pytest.raises(TypeError):
+            result["kin"] = 0
+
+
+class TestMayaBatch:
+    """一括計算のテスト"""
+
+    def test_dreamspell_matches_scalar(self):
+        """Dreamspell方式の一括計算が calculate_kin と一致する（2月29日の前後を含む）"""
+        import numpy as np
+
+        ordinals = np.arange(date(1600, 1, 1).toordinal(), date(2400, 12, 31).toordinal() + 1)
+        kin = calculate_kin_batch(ordinals)
+        for i in list(range(0, len(ordinals), 11)) + [
+            date(1984, 2, 29).toordinal() - ordinals[0], date(2000, 2, 29).toordinal() - ordinals[0]
+        ]:
+            assert kin[i] == calculate_kin(date.fromordinal(int(ordinals[i])).isoformat())
+
+    def test_classical_matches_scalar(self):
+        """古典方式の一括計算が analyze_maya_classical と一致する"""
+        import numpy as np
+
+        ordinals = np.arange(date(1600, 1, 1).toordinal(), date(2400, 12, 31).toordinal() + 1, 97)
+        kin = calculate_kin_batch(ordinals, system="classical")
+        for ordinal, value in zip(ordinals, kin):
+            assert value == analyze_maya_classical(date.fromordinal(int(ordinal)).isoformat())["kin"]
+
+    def test_analyze_batch_datetime64(self):
+        """datetime64の入力で紋章・音・ウェイブスペルを返す"""
+        import numpy as np
+
+        birthdates = ["1992-07-15", "2020-02-05", "1987-07-26", "1962-01-01"]
+        result = analyze_maya_batch(np.array(birthdates, dtype='datetime64[D]'))
+        for i, birthdate in enumerate(birthdates):
+            expected = analyze_maya(birthdate)
+            assert result["kin"][i] == expected["kin"]
+            assert SOLAR_SEALS[result["seal"][i]] == expected["solar_seal"]
+            assert result["tone"][i] == expected["tone"]
+            assert WAVESPELLS[result["wavespell"][i]] == expected["wavespell"]
+
+    def test_unknown_system(self):
+        with pytest.raises(ValueError):
+            calculate_kin_batch([730000], system="unknown")
+
+
+class TestCalendarSystems:
+    """暦法レジストリのテスト"""
+
+    @pytest.mark.parametrize("name, birthdate, expected", [
+        ("dreamspell", "2000-02-29", 178),
+        ("gmt584283", "2012-12-21", 1),
+        ("gmt584285", "2012-12-21", 259),
+        ("table", "1962-01-01", 63),
+        ("table", "2013-12-31", 75),  # マヤ暦表/2013年_1961年_2065年 の12月31日
+        ("plain", "1987-07-26", 1),
+    ])
+    def test_known_kin(self, name, birthdate, expected):
+        assert get_calendar_system(name).kin(birthdate) == expected
+
+    def test_array_matches_arithmetic(self):
+        """事前計算した配列と、対象期間外の都度計算が同じ規則になっている"""
+        import numpy as np
+
+        ordinals = np.arange(CALENDAR_START.toordinal(), CALENDAR_END.toordinal() + 1, 37)
+        dreamspell = get_calendar_system("dreamspell").kin_batch(ordinals)
+        classical = get_calendar_system("gmt584283").kin_batch(ordinals)
+        assert (dreamspell == calculate_kin_batch(ordinals)).all()
+        assert (classical == calculate_kin_batch(ordinals, system="classical")).all()
+
+        for system in CALENDAR_SYSTEMS.values():
+            # 期間外を1件含めると全件を都度計算する
+            computed = system.kin_batch(np.append(ordinals, CALENDAR_START.toordinal() - 1))
+            assert (computed[:-1] == system.kin_batch(ordinals)).all()
+            assert system.kin("1850-06-01") == int(system.kin_batch([date(1850, 6, 1).toordinal()])[0])
+
+    def test_analyze_uses_kin_table(self):
+        """分析結果はKIN_TABLEの行で表示名が方式ごとに異なり、古典マヤ暦はオラクルを含まない"""
+        result = get_calendar_system("gmt584283").analyze("1992-07-15")
+        assert result == analyze_maya_classical("1992-07-15")
+        assert get_calendar_system("table").analyze("1962-01-01") == {
+            **KIN_TABLE[62], "system": "Maya Calendar Table (1962-01-01 = Kin 63)"
+        }
+        assert get_calendar_system().analyze("1992-07-15") == analyze_maya("1992-07-15")
+        assert get_calendar_system().analysis(255) is get_calendar_system().analyze("1992-07-15")
+
+    def test_maya_module_is_plain_system(self):
+        """maya.py は2月29日も1日と数える方式（従来どおりの値）"""
+        assert maya.analyze_maya("1992-07-15") == {
+            "kin": 257, "solar_seal": "赤い地球", "tone": 10, "wavespell": "黄色い太陽"
+        }
+        assert maya.calculate_kin("1962-01-01") == 24
+        assert maya.calculate_kin("2200-01-01") == 112
+
+    def test_maya_module_does_not_load_suanming(self):
+        """maya.py（暦法のみ）の読み込みでは算命学モジュール・節気テーブルを読み込まない"""
+        import subprocess
+
+        code = "import sys, maya; print(sorted({'suanming', 'sekki'} & set(sys.modules)))"
+        output = subprocess.run([sys.executable, "-c", code], cwd=Path(maya.__file__).parent,
+                                capture_output=True, text=True, check=True).stdout
+        assert output.strip() == "[]"
+
+    def test_unknown_system(self):
+        with pytest.raises(ValueError):
+            get_calendar_system("unknown")
+
+
+class TestKinVerifier:
+    """マヤ暦表の統合CSVとの照合のテスト"""
+
+    def test_consolidated_table_matches(self):
+        """統合CSVの全行が "table" 方式と一致する（照合時間は kin_verifier.py の実行で確認する）"""
+        report = verify_kin_table()
+        assert report["ok"], report["systems"]["table"]["examples"]
+        assert report["rows"] == 18993
+        assert report["systems"]["table"]["mismatches"] == 0
+        assert set(report["systems"]) == set(CALENDAR_SYSTEMS)
+        assert report["cycle"]["years"] == 201
+        assert report["cycle"]["mismatches"] == 0
+
+    def test_cycle_tables_loaded_once(self):
+        """52年周期の照合は、LRUが小さくても各表のCSVを1度だけ読み込む"""
+        resolver = KinTableResolver(cache_size=2)
+        report = verify_cycle_tables(resolver)
+        assert report["mismatches"] == 0
+        assert report["days"] == CALENDAR_END.toordinal() - CALENDAR_START.toordinal() + 1
+        assert resolver.cache_info().misses == 52
+
+    def test_cycle_tables_report_mismatches(self, tmp_path):
+        """年別CSVの誤り（空欄を含む）を52年周期の照合で報告する"""
+        resolver = KinTableResolver(tmp_path)
+        source = KinTableResolver().table_path(1990)
+        path = resolver.table_path(1990)
+        path.parent.mkdir()
+        lines = source.read_text(encoding="utf-8-sig").splitlines()
+        cells = lines[1].split(",")
+        cells[1], cells[2] = "1", ""  # 1月1日・2月1日
+        lines[1] = ",".join(cells)
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        system = get_calendar_system("table")
+        report = verify_cycle_tables(resolver, 1990, 1990)
+        assert report["years"] == 1
+        assert report["mismatches"] == 2
+        assert report["examples"] == [
+            {"date": "1990-01-01", "expected": 1, "actual": system.kin("1990-01-01")},
+            {"date": "1990-02-01", "expected": 0, "actual": system.kin("1990-02-01")},
+        ]
+
+    def test_reports_mismatches(self, tmp_path):
+        """不一致の日付と、存在しない日付の行を報告する"""
+        path = tmp_path / "kin.csv"
+        path.write_text(
+            "年,月,日,Kin\n1962,1,1,63\n1962,1,2,99\n1962,2,29,120\n2000,2,29,178\n",
+            encoding="utf-8"
+        )
+        report = verify_kin_table(path)
+        assert not report["ok"]
+        assert report["rows"] == 4
+        assert report["invalid_rows"] == ["1962-02-29"]
+        assert report["systems"]["table"]["examples"] == [
+            {"date": "1962-01-02", "expected": 99, "actual": 64},
+            {"date": "2000-02-29", "expected": 178, "actual": get_calendar_system("table").kin("2000-02-29")},
+        ]
+
+
+class TestKinTableFile:
+    """Kin換算表ファイル（mmap）のテスト"""
+
+    def test_roundtrip(self, tmp_path):
+        """書き出した配列をそのまま参照でき、期間外・未収録の暦法はNone"""
+        path = tmp_path / "kin_table.bin"
+        days = build_kin_table_file(path)
+        table = load_kin_table_file(path)
+
+        assert table.days == days
+        assert table.systems == tuple(CALENDAR_SYSTEMS)
+        for name, system in CALENDAR_SYSTEMS.items():
+            kin = table.kin_array(name, CALENDAR_START, CALENDAR_END)
+            assert not kin.flags.writeable
+            assert (kin == system._kin_function(
+                np.arange(CALENDAR_START.toordinal(), CALENDAR_END.toordinal() + 1))).all()
+
+        kin = table.kin_array("table", date(1962, 1, 1), date(1962, 1, 3))
+        assert kin.tolist() == [63, 64, 65]
+        assert table.kin_array("table", date(1899, 12, 31), date(1962, 1, 1)) is None
+        assert table.kin_array("unknown", CALENDAR_START, CALENDAR_END) is None
+
+    def test_invalid_file(self, tmp_path, monkeypatch):
+        """存在しない・形式が不正なファイルはNone（都度計算に戻る）。パスは環境変数で変更できる"""
+        path = tmp_path / "kin_table.bin"
+        assert load_kin_table_file(path) is None
+
+        path.write_bytes(b"KINTABLE" + bytes(100))
+        assert load_kin_table_file(path) is None
+
+        # ヘッダーより短い（書き込み途中などで切り詰められた）ファイル
+        path.write_bytes(b"KIN")
+        assert load_kin_table_file(path) is None
+
+        write_kin_table_file(path, date(2000, 1, 1), {"table": [1, 2, 3]})
+        monkeypatch.setenv("KIN_TABLE_PATH", str(path))
+        assert load_kin_table_file().systems == ("table",)
+
+        with pytest.raises(ValueError):
+            write_kin_table_file(path, date(2000, 1, 1), {"table": [1, 2], "plain": [1]})
+
+    def test_calendar_system_uses_file(self, tmp_path, monkeypatch):
+        """暦法の配列はファイルを参照し、計算結果と食い違うファイルは使わない"""
+        path = tmp_path / "kin_table.bin"
+        build_kin_table_file(path)
+        monkeypatch.setattr(maya_improved, "_kin_table_file", load_kin_table_file(path))
+
+        table = get_calendar_system("table")
+        system = CalendarSystem("table", table.label, table._kin_function)
+        assert not system.kin_array().flags.owndata
+        assert system.kin("1962-01-01") == 63
+
+        # 別の暦法の値を "table" として収録したファイル
+        ordinals = np.arange(CALENDAR_START.toordinal(), CALENDAR_END.toordinal() + 1)
+        write_kin_table_file(path, CALENDAR_START, {"table": calculate_kin_batch(ordinals)})
+        monkeypatch.setattr(maya_improved, "_kin_table_file", load_kin_table_file(path))
+        system = CalendarSystem("table", table.label, table._kin_function)
+        assert system.kin_array().flags.owndata
+        assert system.kin("1962-01-01") == 63
+
+
+class TestKinResolver:
+    """マヤ暦表の52年周期参照のテスト"""
+
+    @pytest.mark.parametrize("year, expected", [
+        (1962, 1962), (2013, 2013), (1910, 1962), (2014, 1962), (1900, 2004), (2100, 1996), (1700, 2012),
+    ])
+    def test_table_year(self, year, expected):
+        assert table_year(year) == expected
+
+    @pytest.mark.parametrize("year", [1900, 1910, 1961, 2000, 2014, 2065, 2100, 2400])
+    def test_matches_table_system(self, year):
+        """表の範囲外の年も "table" 方式と一致する（閏年でない100年単位の年の2月29日は存在しない）"""
+        resolver = KinTableResolver()
+        grid = resolver.year_grid(year)
+        system = get_calendar_system("table")
+
+        months, days = np.nonzero(grid.T)
+        ordinals = [date(year, m + 1, d + 1).toordinal() for m, d in zip(months, days)]
+        assert len(ordinals) == date(year, 12, 31).toordinal() - date(year, 1, 1).toordinal() + 1
+        assert (grid.T[grid.T > 0] == system.kin_batch(ordinals)).all()
+        assert resolver.kin(date(year, 3, 1)) == system.kin(f"{year}-03-01")
+
+    def test_year_grid_cache(self):
+        """同じ周期の年は表を1度だけ読み込む"""
+        resolver = KinTableResolver(cache_size=2)
+        for year in (1910, 1962, 2014, 2066):
+            resolver.year_grid(year)
+        assert resolver.cache_info().misses == 1
+        assert resolver.cache_info().hits == 3
+
+        resolver.kin(date(1963, 1, 1))
+        resolver.kin(date(1964, 1, 1))
+        resolver.kin(date(2014, 1, 1))
+        assert resolver.cache_info().misses == 4
+        assert resolver.cache_info().currsize == 2
+
+    def test_missing_table(self, tmp_path):
+        with pytest.raises(ValueError):
+            KinTableResolver(tmp_path).kin(date(2020, 1, 1))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
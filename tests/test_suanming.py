@@ -54,12 +54,10 @@ class TestMonthPillar:
         """Case1: 2020年2月の月柱テスト"""
         year_gan, year_shi = calculator.calculate_year_pillar(2020, 2, 5)
         month_gan, month_shi = calculator.calculate_month_pillar(2020, 2, 5, year_gan)
-        # 2月5日は立春直後（節気判定が6日基準の場合は前月扱い）
-        # 簡易実装では2月4日以降6日未満なので丑月（前月）となる
+        # 2020年の立春は2月4日18:03（JST）なので、2月5日は寅月
         # 庚年は乙庚グループ→寅月は戊
-        # 丑月は月支インデックス11なので、戊から11進んで己
-        assert month_shi == "丑"
-        assert month_gan == "己"
+        assert month_shi == "寅"
+        assert month_gan == "戊"
 
     def test_case2_month_pillar(self, calculator):
         """Case2: 1988年7月の月柱テスト"""
@@ -72,6 +70,37 @@ class TestMonthPillar:
         assert month_gan == "己"
 
 
+class TestSekkiBoundary:
+    """節気の境界（分単位）のテスト"""
+
+    def test_risshun_minute_boundary(self, calculator):
+        """2020年立春（2月4日18:03 JST）の前後で年柱・月柱が切り替わる"""
+        assert not calculator.is_after_risshun(2020, 2, 4, 18, 2)
+        assert calculator.is_after_risshun(2020, 2, 4, 18, 3)
+
+        before = calculator.analyze("2020-02-04", "18:02")
+        after = calculator.analyze("2020-02-04", "18:03")
+        assert (before["year_gan"], before["year_shi"]) == ("己", "亥")
+        assert (before["month_gan"], before["month_shi"]) == ("丁", "丑")
+        assert (after["year_gan"], after["year_shi"]) == ("庚", "子")
+        assert (after["month_gan"], after["month_shi"]) == ("戊", "寅")
+
+    def test_risshun_varies_by_year(self, calculator):
+        """立春日は年によって変わる（2021年は2月3日23:59 JST）"""
+        assert calculator.calculate_year_pillar(2021, 2, 3, 23, 58) == ("庚", "子")
+        assert calculator.calculate_year_pillar(2021, 2, 3, 23, 59) == ("辛", "丑")
+
+    def test_month_boundary(self, calculator):
+        """2024年清明（4月4日16:02 JST）で卯月から辰月に切り替わる"""
+        assert calculator.calculate_month_pillar(2024, 4, 4, "甲", 16, 1)[1] == "卯"
+        assert calculator.calculate_month_pillar(2024, 4, 4, "甲", 16, 2)[1] == "辰"
+
+    def test_sekki_table_range(self, calculator):
+        """節気テーブルが1800〜2200年を覆うことを確認"""
+        assert calculator.calculate_year_pillar(1800, 1, 1) == calculator.calculate_year_pillar(1799, 12, 31)
+        assert calculator.calculate_month_pillar(2200, 12, 31, "庚", 23, 59)[1] == "子"
+
+
 class TestDayPillar:
     """日柱計算のテスト"""
 
@@ -97,6 +126,33 @@ class TestDayPillar:
         assert day_gan in calculator.TENKAN
         assert day_shi in calculator.CHISHI
 
+    def test_known_day_pillars(self, calculator):
+        """暦で確認済みの日柱テスト"""
+        assert calculator.calculate_day_pillar(1900, 1, 1) == ("甲", "戌")
+        assert calculator.calculate_day_pillar(2000, 1, 1) == ("戊", "午")
+        assert calculator.calculate_day_pillar(2020, 2, 5) == ("戊", "寅")
+
+    def test_day_pillar_advances_daily(self, calculator):
+        """日柱が1日ごとに六十干支を1つ進むことを確認（世紀・閏日を跨ぐ）"""
+        from datetime import date, timedelta
+        d = date(1899, 12, 1)
+        prev = calculator.ROKUJIKKANSHI.index(calculator.calculate_day_pillar(d.year, d.month, d.day))
+        while d < date(2100, 3, 31):
+            d += timedelta(days=1)
+            current = calculator.ROKUJIKKANSHI.index(calculator.calculate_day_pillar(d.year, d.month, d.day))
+            assert current == (prev + 1) % 60, f"{d}の日柱が連続していません"
+            prev = current
+
+    def test_day_pillar_range(self, calculator):
+        """日柱テーブルの対応範囲（1800〜2200年）のテスト"""
+        assert calculator.calculate_day_pillar(1800, 1, 1) == ("庚", "寅")
+        assert calculator.calculate_day_pillar(2200, 12, 31) == ("辛", "卯")
+
+        with pytest.raises(ValueError):
+            calculator.calculate_day_pillar(1799, 12, 31)
+        with pytest.raises(ValueError):
+            calculator.calculate_day_pillar(2201, 1, 1)
+
 
 class TestHourPillar:
     """時柱計算のテスト"""
@@ -290,6 +346,252 @@ class TestIntegration:
             assert "five_elements_score" in result
 
 
+class TestChart:
+    """命式（Chart）のテスト"""
+
+    def test_chart_is_compact(self, calculator):
+        """Chartは__slots__で整数インデックスを保持する"""
+        chart = calculator.analyze("2020-02-05", "12:00")
+        assert not hasattr(chart, "__dict__")
+        assert len(chart.pillars) == 8
+        assert all(isinstance(i, int) for i in chart.pillars + chart.scores)
+        assert calculator.TENKAN[chart.pillars[0]] == "庚"
+
+    def test_chart_to_dict(self, calculator):
+        """to_dict()で従来の辞書形式に変換できる"""
+        chart = calculator.analyze("1988-07-10", "15:00")
+        result = chart.to_dict()
+
+        assert isinstance(result, dict)
+        assert list(result.keys()) == list(chart.keys())
+        assert result["five_elements_score"] == chart["five_elements_score"]
+        assert result["guardian_gods"] == [calculator.FIVE_ELEMENTS[i] for i in chart.guardian_gods]
+        assert dict(chart) == result
+
+    def test_chart_unknown_key(self, calculator):
+        """存在しないキーはKeyError"""
+        chart = calculator.analyze("1988-07-10", "15:00")
+        assert chart.get("unknown") is None
+        with pytest.raises(KeyError):
+            chart["unknown"]
+
+
+class TestChartCache:
+    """命式キャッシュのテスト"""
+
+    def test_cache_hit_within_hour_branch(self, calculator):
+        """同じ日付・同じ時支なら分が違ってもキャッシュを共有する"""
+        first = calculator.analyze("1988-07-10", "15:00")
+        second = calculator.analyze("1988-07-10", "16:59")
+        third = calculator.analyze("1988-07-10", "17:00")
+
+        assert second is first
+        assert third is not first
+        info = calculator.cache_info()
+        assert (info.hits, info.misses) == (1, 2)
+
+    def test_cache_key_includes_sekki(self, calculator):
+        """同じ時支でも節入り時刻を跨ぐと別の命式になる"""
+        before = calculator.analyze("2020-02-04", "17:00")
+        after = calculator.analyze("2020-02-04", "18:30")
+
+        assert before is not after
+        assert before["month_shi"] == "丑"
+        assert after["month_shi"] == "寅"
+
+    def test_chart_key(self, calculator):
+        """chart_key が同じ入力は同じ命式で、chart(key) は analyze と同じ命式を返す"""
+        key = calculator.chart_key("2020-02-04", "17:00")
+        assert key == calculator.chart_key("2020-02-04", "17:59")
+        assert key != calculator.chart_key("2020-02-04", "18:30")
+        assert calculator.chart(key) is calculator.analyze("2020-02-04", "17:00")
+
+    def test_cache_bounded(self):
+        """最大件数を超えると古いものから破棄される"""
+        calculator = SuanmingCalculator(cache_size=2)
+        calculator.analyze("2001-01-01", "12:00")
+        calculator.analyze("2001-01-02", "12:00")
+        calculator.analyze("2001-01-03", "12:00")
+        assert calculator.cache_info().currsize == 2
+
+        calculator.analyze("2001-01-01", "12:00")
+        assert calculator.cache_info().hits == 0
+
+        calculator.cache_clear()
+        assert calculator.cache_info().currsize == 0
+
+    def test_cached_chart_is_immutable(self, calculator):
+        """キャッシュされた命式は変更できない"""
+        chart = calculator.analyze("1988-07-10", "15:00")
+        with pytest.raises(AttributeError):
+            chart.scores = (0, 0, 0, 0, 0)
+        with pytest.raises(TypeError):
+            chart["year_gan"] = "甲"
+
+        result = chart.to_dict()
+        result["guardian_gods"].append("火")
+        assert chart.to_dict() != result
+
+
+class TestChartStore:
+    """事前計算済み命式ストアのテスト"""
+
+    @pytest.fixture
+    def store_path(self, calculator, tmp_path):
+        """2020年分の命式ストア"""
+        from datetime import date
+        from chart_store import build_chart_store
+
+        path = tmp_path / "chart_store.bin"
+        build_chart_store(calculator, path, date(2020, 1, 1), date(2020, 12, 31))
+        return path
+
+    def test_store_matches_computation(self, calculator, store_path):
+        """ストア参照の結果が通常計算と一致する（節入り当日の分単位を含む）"""
+        stored = SuanmingCalculator(cache_size=0, chart_store_path=store_path)
+        assert stored.chart_store is not None
+
+        for birthdate in ["2020-01-01", "2020-02-04", "2020-06-15", "2020-12-31"]:
+            for hour in range(24):
+                for minute in (0, 2, 3, 59):
+                    birthtime = f"{hour:02d}:{minute:02d}"
+                    assert (stored.analyze(birthdate, birthtime).to_dict()
+                            == calculator.analyze(birthdate, birthtime).to_dict())
+
+    def test_boundary_records_flagged(self, calculator, store_path):
+        """節入り時刻を含む時支と子時は収録対象外（通常計算に戻る）"""
+        from datetime import date
+        from chart_store import ChartStore
+
+        store = ChartStore(store_path, calculator.knowledge_version)
+        ordinal = date(2020, 2, 4).toordinal()  # 立春 18:03
+        assert store.get(ordinal, 0) is None
+        assert store.get(ordinal, 9) is None
+        assert store.get(ordinal, 8) is not None
+        assert store.get(ordinal + 1, 0) is not None
+        assert store.get(date(2021, 1, 1).toordinal(), 6) is None  # 対象期間外
+
+    def test_store_rejected_when_knowledge_differs(self, calculator, store_path):
+        """生成元のナレッジと一致しないストアは使用しない"""
+        from chart_store import load_chart_store
+
+        assert load_chart_store(calculator.knowledge_version, store_path) is not None
+        assert load_chart_store("0" * 64, store_path) is None
+        assert load_chart_store(calculator.knowledge_version, store_path.with_name("missing.bin")) is None
+
+        # ヘッダーより短い（書き込み途中などで切り詰められた）ファイル
+        short_path = store_path.with_name("short.bin")
+        short_path.write_bytes(b"CHS")
+        assert load_chart_store(calculator.knowledge_version, short_path) is None
+
+    def test_rebuild_keeps_open_store(self, calculator, store_path):
+        """再生成はファイルを置き換えるため、参照中のストアはそのまま読める"""
+        from datetime import date
+        from chart_store import ChartStore, build_chart_store
+
+        store = ChartStore(store_path, calculator.knowledge_version)
+        record = store.get(date(2020, 6, 15).toordinal(), 6)
+        build_chart_store(calculator, store_path, date(2020, 1, 1), date(2020, 1, 31))
+
+        assert store.get(date(2020, 6, 15).toordinal(), 6) == record
+        assert ChartStore(store_path, calculator.knowledge_version).days == 31
+        assert not store_path.with_name(store_path.name + ".tmp").exists()
+
+
+class TestGuardianTable:
+    """守護神選定表のテスト"""
+
+    def test_table_matches_selection_rules(self, calculator):
+        """選定表の結果が選定規則による計算と一致する"""
+        table = calculator.tables["guardian_table"]
+        bits = table["bits"]
+        mask = (1 << bits) - 1
+
+        for key, code in list(zip(table["keys"], table["codes"]))[::97]:
+            scores = tuple(key >> (bits * i) & mask for i in range(5))
+            assert table["results"][code] == calculator._compute_guardian_indices(scores)
+
+    def test_table_covers_all_pillars(self, calculator):
+        """四柱から得られる五行配点は全て選定表に収録されている"""
+        table = calculator.tables["guardian_table"]
+        assert len(table["keys"]) == len(set(table["keys"]))
+
+        result = calculator.analyze("1985-03-15", "10:30")
+        lookup = calculator._guardian_lookup
+        assert lookup is not None
+        shifts = calculator._score_shifts
+        key = sum(score << shift for score, shift in zip(result.scores, shifts))
+        assert key in lookup
+
+    def test_unlisted_scores_fall_back(self, calculator):
+        """選定表にない配点（手入力など）は都度選定する"""
+        result = calculator.select_guardian_gods({"木": 5000, "火": -1, "土": 0, "金": 0, "水": 0})
+        assert result["deficient"] == ["火"]
+        assert result["excess"] == ["木"]
+        assert result["taboo_elements"] == ["木"]
+        assert result["guardian_gods"][0] == "火"
+
+
+class TestLuckTimeline:
+    """大運・年運・月運のテスト"""
+
+    def test_direction_and_start_age(self, calculator):
+        """陰干年の男性は逆行・女性は順行、立運は節入りまでの日数÷3"""
+        # 1985-03-15 10:30（乙丑年・卯月）：啓蟄 03-06 00:16 から9.4日、清明 04-05 05:14 まで20.8日
+        male = calculator.luck_timeline_arrays("1985-03-15", "10:30", "male", years=30)
+        female = calculator.luck_timeline_arrays("1985-03-15", "10:30", "female", years=30)
+
+        assert male["direction"] == -1
+        assert male["start_age"] == 3
+        assert female["direction"] == 1
+        assert female["start_age"] == 7
+
+        gan = [calculator.TENKAN[i] for i in female["periods"]["gan"]]
+        shi = [calculator.CHISHI[i] for i in female["periods"]["shi"]]
+        assert list(zip(gan, shi))[:3] == [("己", "卯"), ("庚", "辰"), ("辛", "巳")]
+        assert list(female["periods"]["start_age"][:3]) == [0, 7, 17]
+
+        gan = [calculator.TENKAN[i] for i in male["periods"]["gan"]]
+        shi = [calculator.CHISHI[i] for i in male["periods"]["shi"]]
+        assert list(zip(gan, shi))[:3] == [("己", "卯"), ("戊", "寅"), ("丁", "丑")]
+
+    def test_annual_and_monthly_pillars(self, calculator):
+        """年運・月運は各年・各月の干支と一致する"""
+        arrays = calculator.luck_timeline_arrays("1985-03-15", "10:30", "male", years=40)
+        for i in range(0, 40 * 12, 7):
+            year = int(arrays["months"]["year"][i])
+            month = int(arrays["months"]["month"][i])
+            gan, shi = calculator.calculate_month_pillar(
+                year if month < 11 else year + 1, [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 1][month], 20,
+                calculator.TENKAN[year % 10]
+            )
+            assert calculator.TENKAN[arrays["months"]["gan"][i]] == gan
+            assert calculator.CHISHI[arrays["months"]["shi"][i]] == shi
+
+        assert calculator.TENKAN[arrays["years"]["gan"][39]] + calculator.CHISHI[arrays["years"]["shi"][39]] == "甲辰"
+
+    def test_generator_matches_arrays(self, calculator):
+        """逐次生成の結果が一括計算と一致し、大運ごとに時系列順で並ぶ"""
+        entries = list(calculator.luck_timeline("1992-07-15", "14:30", "female", years=35, monthly=True))
+        arrays = calculator.luck_timeline_arrays("1992-07-15", "14:30", "female", years=35)
+
+        periods = [e for e in entries if e["type"] == "period"]
+        years = [e for e in entries if e["type"] == "year"]
+        months = [e for e in entries if e["type"] == "month"]
+        assert len(periods) == len(arrays["periods"]["period"])
+        assert [e["year"] for e in years] == list(arrays["years"]["year"])
+        assert [e["score"] for e in months] == [float(x) for x in arrays["months"]["score"]]
+        assert entries[0]["type"] == "period"
+        assert all(-1 <= e["score"] <= 1 for e in entries)
+
+    def test_invalid_input(self, calculator):
+        """性別・対象期間が不正な場合は呼び出し時に例外"""
+        with pytest.raises(ValueError):
+            calculator.luck_timeline("1985-03-15", "10:30", "other")
+        with pytest.raises(ValueError):
+            calculator.luck_timeline("2150-01-01", "12:00", "male", years=100)
+
+
 class TestEdgeCases:
     """エッジケースのテスト"""
 
@@ -318,5 +620,117 @@ class TestEdgeCases:
         assert result["hour_shi"] == "子"
 
 
+class TestAnalyzeBatch:
+    """一括計算（analyze_batch）のテスト"""
+
+    def test_batch_matches_scalar(self, calculator):
+        """一括計算の結果が analyze と一致することを確認"""
+        import numpy as np
+        from datetime import date
+
+        rng = np.random.default_rng(42)
+        ordinals = rng.integers(date(1800, 1, 1).toordinal(), date(2200, 12, 31).toordinal() + 1, 500)
+        minutes = rng.integers(0, 24 * 60, 500)
+        batch = calculator.analyze_batch(ordinals, minutes)
+        elements = calculator.FIVE_ELEMENTS
+
+        for i, (ordinal, minute) in enumerate(zip(ordinals, minutes)):
+            birthdate = date.fromordinal(int(ordinal)).isoformat()
+            birthtime = f"{minute // 60:02d}:{minute % 60:02d}"
+            result = calculator.analyze(birthdate, birthtime)
+
+            for pillar in ["year", "month", "day", "hour"]:
+                assert calculator.TENKAN[batch[f"{pillar}_gan"][i]] == result[f"{pillar}_gan"]
+                assert calculator.CHISHI[batch[f"{pillar}_shi"][i]] == result[f"{pillar}_shi"]
+            assert list(batch["five_elements_score"][i]) == [result["five_elements_score"][e] for e in elements]
+            for key in ["guardian_gods", "taboo_elements", "deficient", "excess"]:
+                masked = {elements[j] for j in range(5) if batch[key][i][j]}
+                assert masked == set(result[key]), f"{birthdate} {birthtime}の{key}が不一致"
+
+    def test_batch_datetime64_input(self, calculator):
+        """datetime64入力と時刻省略（12:00）のテスト"""
+        import numpy as np
+
+        birthdates = np.array(["2020-02-05", "1988-07-10"], dtype="datetime64[D]")
+        batch = calculator.analyze_batch(birthdates)
+        result = calculator.analyze("1988-07-10", "12:00")
+
+        assert batch["five_elements_score"].shape == (2, 5)
+        assert calculator.TENKAN[batch["year_gan"][0]] == "庚"
+        assert calculator.CHISHI[batch["hour_shi"][1]] == result["hour_shi"]
+        assert (batch["five_elements_score"].sum(axis=1) == 544).all()
+
+    def test_batch_out_of_range(self, calculator):
+        """対応範囲外の日付を含む場合のテスト"""
+        import numpy as np
+
+        with pytest.raises(ValueError):
+            calculator.analyze_batch(np.array(["1799-12-31"], dtype="datetime64[D]"))
+
+    @pytest.mark.parametrize("minutes", [2000, -1, 1440])
+    def test_batch_time_out_of_range(self, calculator, minutes):
+        """0〜1439分以外の時刻（翌日・前日に繰り上がる時刻）は受け付けない"""
+        import numpy as np
+        from datetime import date
+
+        ordinals = np.array([date(1990, 1, 1).toordinal()])
+        with pytest.raises(ValueError):
+            calculator.analyze_batch(ordinals, [minutes])
+        with pytest.raises(ValueError):
+            calculator.analyze_batch(ordinals, np.array([minutes], dtype="timedelta64[m]"))
+        batch = calculator.analyze_batch(ordinals, [1439])  # 23:59 は受け付ける
+        assert calculator.CHISHI[batch["hour_shi"][0]] == calculator.analyze("1990-01-01", "23:59")["hour_shi"]
+
+
+class TestKnowledgeSnapshot:
+    """ナレッジベース・スナップショットのテスト"""
+
+    def test_snapshot_created_and_reused(self, tmp_path):
+        """初回にスナップショットを生成し、2回目以降はそれを読み込む"""
+        import shutil
+        from knowledge_snapshot import KNOWLEDGE_PATH, load_snapshot
+
+        knowledge_path = tmp_path / "suanming_knowledge.yaml"
+        shutil.copy(KNOWLEDGE_PATH, knowledge_path)
+        snapshot_path = tmp_path / "suanming_knowledge.snapshot"
+
+        first = load_snapshot(knowledge_path)
+        assert snapshot_path.exists()
+        mtime = snapshot_path.stat().st_mtime_ns
+
+        second = load_snapshot(knowledge_path)
+        assert snapshot_path.stat().st_mtime_ns == mtime
+        assert second == first
+
+    def test_snapshot_rebuilt_when_yaml_changes(self, tmp_path):
+        """YAMLが変更されるとスナップショットを再生成する"""
+        import shutil
+        from knowledge_snapshot import KNOWLEDGE_PATH, load_snapshot
+
+        knowledge_path = tmp_path / "suanming_knowledge.yaml"
+        shutil.copy(KNOWLEDGE_PATH, knowledge_path)
+        before = load_snapshot(knowledge_path)
+
+        text = knowledge_path.read_text(encoding='utf-8')
+        knowledge_path.write_text(text.replace("tenkan_score: 36", "tenkan_score: 40"), encoding='utf-8')
+        after = load_snapshot(knowledge_path)
+
+        assert after["source_sha256"] != before["source_sha256"]
+        assert after["knowledge"]["constants"]["tenkan_score"] == 40
+        assert max(after["tables"]["gan_scores"][0]) == 40
+
+        calculator = SuanmingCalculator(knowledge_path)
+        result = calculator.analyze("2020-02-05", "12:00")
+        assert sum(result["five_elements_score"].values()) == 4 * 40 + 400
+
+    def test_shared_calculator(self):
+        """モジュールレベル関数が計算インスタンスを共有する"""
+        import suanming
+
+        result = suanming.analyze_suanming("2020-02-05", "12:00")
+        assert suanming.get_calculator() is suanming.get_calculator()
+        assert result["year_gan"] == "庚"
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
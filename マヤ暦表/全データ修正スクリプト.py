@@ -1,157 +1,263 @@
 #!/usr/bin/env python3
 """
 マヤ暦Kin換算表 全データ修正スクリプト
-1962年1月1日 = Kin 63 を基準に全52年分を正しく再生成
+1962年1月1日 = Kin 63 を基準に、指定した年の範囲（既定: 1962〜2013年の52年分）を再生成
+
+各年の表（31日 × 12か月）は、年の範囲全体をまとめてNumPyの配列演算で計算する。
+内容のハッシュが既存のファイルと同じ場合は書き込まない。
+--binary を指定すると、同じ計算でAPIの対象期間（1900〜2100年。--start/--end によらない）の値を
+Kin換算表ファイル（uint16のバイナリ、暦法名 "table"）に書き込む。既存のファイルの他の暦法の配列は保持し、
+収録されていない暦法はAPIの計算で補う。
+
+使い方:
+    python 全データ修正スクリプト.py [--start 1962] [--end 2013] [--output-dir フォルダ] [--no-integrated]
+                                     [--binary kin_table.bin]
 """
 
+import argparse
 import csv
+import hashlib
+import io
 import os
-from datetime import datetime, timedelta
+import sys
+from datetime import date
 from pathlib import Path
 
+import numpy as np
+
 # 基準日: 1962年1月1日 = Kin 63
-BASE_DATE = datetime(1962, 1, 1)
+BASE_DATE = date(1962, 1, 1)
 BASE_KIN = 63
 
-def calculate_kin(date):
+# 既定の年の範囲（52年分）
+DEFAULT_START_YEAR = 1962
+DEFAULT_END_YEAR = 2013
+
+# 52年周期（フォルダ名の対応年）
+CYCLE_YEARS = 52
+
+HEADER = ["日", "1月", "2月", "3月", "4月", "5月", "6月", "7月", "8月", "9月", "10月", "11月", "12月"]
+
+# 平年・閏年の各月の日数
+DAYS_IN_MONTH = np.array([
+    [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+    [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+])
+# 平年・閏年の各月1日の、1月1日からの日数
+MONTH_OFFSETS = np.cumsum(DAYS_IN_MONTH, axis=1) - DAYS_IN_MONTH
+
+# Kin換算表ファイルでの暦法名（app/api/calendar_systems.py の "table" 方式）
+BINARY_SYSTEM_NAME = "table"
+
+# Kin換算表ファイルの形式を定義しているモジュールの場所
+API_DIR = Path(__file__).resolve().parent.parent / "app" / "api"
+
+# Kin番号の文字列（0は存在しない日の空欄）
+KIN_STRINGS = [""] + [str(kin) for kin in range(1, 261)]
+
+
+def calculate_kin(d):
     """指定された日付のKin番号を計算（1-260の循環）"""
-    days_diff = (date - BASE_DATE).days
+    days_diff = (d - BASE_DATE).days
     kin = ((BASE_KIN - 1 + days_diff) % 260) + 1
     return kin
 
+
 def is_leap_year(year):
     """うるう年判定"""
     return (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0)
 
-def generate_year_kin_table(year):
-    """指定年のKin換算表を生成（CSV形式の2次元配列）"""
-    # 月ごとの日数
-    days_in_month = [31, 29 if is_leap_year(year) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    max_days = max(days_in_month)
-
-    # ヘッダー行
-    table = [["日", "1月", "2月", "3月", "4月", "5月", "6月", "7月", "8月", "9月", "10月", "11月", "12月"]]
-
-    # 各日のKin値を計算
-    for day in range(1, max_days + 1):
-        row = [str(day)]
-        for month in range(1, 13):
-            if day <= days_in_month[month - 1]:
-                date = datetime(year, month, day)
-                kin = calculate_kin(date)
-                row.append(str(kin))
-            else:
-                row.append("")
-        table.append(row)
-
-    return table
-
-def save_csv(filepath, data):
-    """CSVファイルを保存"""
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerows(data)
-
-def generate_all_years():
-    """全52年分のKin換算表を生成"""
-    base_dir = Path(__file__).parent
-
-    # 1962年から2013年まで（52年分）
-    years = list(range(1962, 2014))
 
-    print("=" * 60)
-    print("マヤ暦Kin換算表 全データ修正開始")
-    print(f"基準: 1962年1月1日 = Kin {BASE_KIN}")
-    print("=" * 60)
+def kin_grids(years):
+    """
+    指定年のKin換算表をまとめて計算
 
-    for idx, year in enumerate(years, 1):
-        # フォルダ名生成（52年周期パターン）
-        year_offset = year - 1962
-        past_year = 1910 + year_offset
-        future_year = 2014 + year_offset
+    Args:
+        years: 年の配列
+
+    Returns:
+        Kin番号の配列 (年数, 31, 12)。存在しない日（2月30日など）は0
+    """
+    years = np.asarray(years, dtype=np.int64)
+    leap = ((years % 4 == 0) & (years % 100 != 0)) | (years % 400 == 0)
+
+    # 各年1月1日の基準日からの日数（前年までの閏年の数から閉形式で計算）
+    previous = years - 1
+    jan1 = 365 * previous + previous // 4 - previous // 100 + previous // 400 + 1 - BASE_DATE.toordinal()
+
+    days = np.arange(31)[None, :, None]
+    offsets = jan1[:, None, None] + MONTH_OFFSETS[leap.astype(int)][:, None, :] + days
+    kin = (BASE_KIN - 1 + offsets) % 260 + 1
+    return np.where(days < DAYS_IN_MONTH[leap.astype(int)][:, None, :], kin, 0)
 
-        folder_name = f"{year}年_{past_year}年_{future_year}年"
-        csv_filename = f"{year}年_Kin換算表.csv"
 
-        # フルパス
-        folder_path = base_dir / folder_name
-        csv_path = folder_path / csv_filename
+def render_year_csv(grid):
+    """1年分のKin換算表（31 × 12）をCSVのバイト列にする"""
+    buffer = io.StringIO(newline='')
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for day, row in enumerate(grid.tolist(), 1):
+        writer.writerow([str(day)] + [KIN_STRINGS[kin] for kin in row])
+    return buffer.getvalue().encode('utf-8')
 
-        # Kin換算表生成
-        table = generate_year_kin_table(year)
 
-        # CSV保存
-        save_csv(str(csv_path), table)
+def render_integrated_csv(years, grids):
+    """年月日順の統合CSV（年,月,日,Kin）をバイト列にする"""
+    lines = ["年,月,日,Kin\r\n"]
+    for year, grid in zip(years, grids):
+        for month, column in enumerate(grid.T.tolist(), 1):
+            lines.extend(f"{year},{month},{day},{kin}\r\n" for day, kin in enumerate(column, 1) if kin)
+    return "".join(lines).encode('utf-8')
 
-        # 1月1日の検証
-        jan1_kin = calculate_kin(datetime(year, 1, 1))
 
-        print(f"[{idx:2d}/52] {year}年 → {folder_name}")
-        print(f"        1月1日 = Kin {jan1_kin} | ファイル: {csv_filename}")
+def save_if_changed(path, content):
+    """
+    内容のハッシュが既存のファイルと異なる場合だけ保存
 
+    Returns:
+        bool: 書き込んだか
+    """
+    path = Path(path)
+    digest = hashlib.sha256(content).hexdigest()
+    if path.exists() and hashlib.sha256(path.read_bytes()).hexdigest() == digest:
+        return False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+    return True
+
+
+def folder_name(year):
+    """年のフォルダ名（52年周期の対応年を含む）"""
+    return f"{year}年_{year - CYCLE_YEARS}年_{year + CYCLE_YEARS}年"
+
+
+def generate_all_years(base_dir, years, grids):
+    """指定年のKin換算表を生成"""
     print("=" * 60)
-    print("✅ 全52年分のデータ生成完了！")
+    print("マヤ暦Kin換算表 全データ修正開始")
+    print(f"基準: 1962年1月1日 = Kin {BASE_KIN}")
+    print(f"対象: {years[0]}年 〜 {years[-1]}年（{len(years)}年分）")
     print("=" * 60)
 
-def generate_integrated_csv():
-    """全年代統合CSV生成"""
-    base_dir = Path(__file__).parent
-    output_dir = base_dir / "マヤ暦表すべて換算表"
-    output_file = output_dir / "全年代統合_Kin換算表.csv"
+    written = 0
+    for idx, (year, grid) in enumerate(zip(years, grids), 1):
+        csv_filename = f"{year}年_Kin換算表.csv"
+        csv_path = base_dir / folder_name(year) / csv_filename
 
-    print("\n統合CSVファイル生成中...")
+        changed = save_if_changed(csv_path, render_year_csv(grid))
+        written += changed
 
-    all_data = []
-    all_data.append(["年", "月", "日", "Kin"])
+        status = "更新" if changed else "変更なし"
+        print(f"[{idx:{len(str(len(years)))}d}/{len(years)}] {year}年 → {folder_name(year)}"
+              f" | 1月1日 = Kin {grid[0, 0]} | {status}")
 
-    for year in range(1962, 2014):
-        days_in_month = [31, 29 if is_leap_year(year) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    print("=" * 60)
+    print(f"✅ {len(years)}年分のデータ生成完了！（更新: {written}件 / 変更なし: {len(years) - written}件）")
+    print("=" * 60)
 
-        for month in range(1, 13):
-            for day in range(1, days_in_month[month - 1] + 1):
-                date = datetime(year, month, day)
-                kin = calculate_kin(date)
-                all_data.append([year, month, day, kin])
 
-    save_csv(str(output_file), all_data)
-    print(f"✅ 統合CSVファイル生成完了: {output_file}")
-    print(f"   総レコード数: {len(all_data) - 1}件")
+def generate_integrated_csv(base_dir, years, grids):
+    """全年代統合CSV生成"""
+    output_file = base_dir / "マヤ暦表すべて換算表" / "全年代統合_Kin換算表.csv"
+
+    print("\n統合CSVファイル生成中...")
 
-def verify_data():
-    """データ検証"""
+    changed = save_if_changed(output_file, render_integrated_csv(years, grids))
+    status = "生成完了" if changed else "変更なし"
+    print(f"✅ 統合CSVファイル{status}: {output_file}")
+    print(f"   総レコード数: {int(np.count_nonzero(grids))}件")
+
+
+def generate_binary(path):
+    """Kin換算表ファイル（1日1つのuint16、日付順）の "table" の配列を、APIの対象期間で生成"""
+    if str(API_DIR) not in sys.path:
+        sys.path.insert(0, str(API_DIR))
+    from calendar_systems import CALENDAR_END, CALENDAR_START, CALENDAR_SYSTEMS
+    from maya_improved import load_kin_table_file, write_kin_table_file
+
+    # (年, 月, 日) の順に並べ、存在しない日（0）を除く
+    grids = kin_grids(list(range(CALENDAR_START.year, CALENDAR_END.year + 1)))
+    days = grids.transpose(0, 2, 1)
+    days = days[days > 0]
+    first = CALENDAR_START.toordinal() - date(CALENDAR_START.year, 1, 1).toordinal()
+    days = days[first:first + CALENDAR_END.toordinal() - CALENDAR_START.toordinal() + 1]
+
+    # 既存のファイルの他の暦法の配列は保持し、未収録の暦法は計算する
+    existing = load_kin_table_file(path)
+    systems = {}
+    for name in (existing.systems if existing else ()) + tuple(CALENDAR_SYSTEMS):
+        kin = existing.kin_array(name, CALENDAR_START, CALENDAR_END) if existing else None
+        if name == BINARY_SYSTEM_NAME:
+            kin = days
+        elif kin is None and name in CALENDAR_SYSTEMS:
+            kin = CALENDAR_SYSTEMS[name]._kin_function(
+                np.arange(CALENDAR_START.toordinal(), CALENDAR_END.toordinal() + 1, dtype=np.int64))
+        if kin is not None and name not in systems:
+            systems[name] = np.array(kin)  # 既存のファイル（mmap）を置き換える前に複製
+    del existing
+
+    write_kin_table_file(path, CALENDAR_START, systems)
+    print(f"\n✅ Kin換算表ファイル生成完了: {path}（{CALENDAR_START}〜{CALENDAR_END}、{len(days)}日 × {len(systems)}方式）")
+
+
+def verify_data(years, grids):
+    """データ検証（配列演算の結果を日付ごとの計算と照合）"""
     print("\n" + "=" * 60)
     print("データ検証")
     print("=" * 60)
 
     # 重要な日付の検証
-    test_dates = [
-        (datetime(1962, 1, 1), 63),
-        (datetime(1962, 1, 2), 64),
-        (datetime(1962, 12, 31), calculate_kin(datetime(1962, 12, 31))),
-        (datetime(2013, 12, 31), calculate_kin(datetime(2013, 12, 31))),
-    ]
-
-    for date, expected_kin in test_dates[:2]:
-        calculated = calculate_kin(date)
+    for d, expected_kin in [(date(1962, 1, 1), 63), (date(1962, 1, 2), 64)]:
+        calculated = calculate_kin(d)
         status = "✅" if calculated == expected_kin else "❌"
-        print(f"{status} {date.strftime('%Y年%m月%d日')}: Kin {calculated} (期待値: {expected_kin})")
+        print(f"{status} {d.strftime('%Y年%m月%d日')}: Kin {calculated} (期待値: {expected_kin})")
+
+    # 各年の1月1日・2月末日・12月31日
+    mismatches = 0
+    for year, grid in zip(years, grids):
+        feb_last = 29 if is_leap_year(year) else 28
+        for d in (date(year, 1, 1), date(year, 2, feb_last), date(year, 12, 31)):
+            if grid[d.day - 1, d.month - 1] != calculate_kin(d):
+                mismatches += 1
+                print(f"❌ {d.strftime('%Y年%m月%d日')}: 表 {grid[d.day - 1, d.month - 1]} / 計算 {calculate_kin(d)}")
+    if not mismatches:
+        print(f"✅ {years[0]}年 〜 {years[-1]}年の各年の1月1日・2月末日・12月31日が一致")
 
-    for date, expected_kin in test_dates[2:]:
-        calculated = calculate_kin(date)
-        print(f"✅ {date.strftime('%Y年%m月%d日')}: Kin {calculated}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="マヤ暦Kin換算表を再生成する")
+    parser.add_argument('--start', type=int, default=DEFAULT_START_YEAR, help="開始年")
+    parser.add_argument('--end', type=int, default=DEFAULT_END_YEAR, help="終了年（この年を含む）")
+    parser.add_argument('--output-dir', type=Path, default=Path(__file__).parent,
+                        help="出力先のフォルダ（既定: このスクリプトのあるフォルダ）")
+    parser.add_argument('--no-integrated', action='store_true', help="統合CSVを生成しない")
+    parser.add_argument('--binary', type=Path, default=None, help="Kin換算表ファイルの出力先（APIの対象期間の \"table\" を書き込む）")
+    args = parser.parse_args()
+
+    if not 1 <= args.start <= args.end <= 9999:
+        parser.error("年の範囲は 1 <= start <= end <= 9999 で指定してください")
+
     print("\n🚀 マヤ暦全データ修正プログラム起動\n")
 
+    years = list(range(args.start, args.end + 1))
+    grids = kin_grids(years)
+
     # 全年分生成
-    generate_all_years()
+    generate_all_years(args.output_dir, years, grids)
 
     # 統合CSV生成
-    generate_integrated_csv()
+    if not args.no_integrated:
+        generate_integrated_csv(args.output_dir, years, grids)
+
+    # Kin換算表ファイル生成
+    if args.binary:
+        generate_binary(args.binary)
 
     # 検証
-    verify_data()
+    verify_data(years, grids)
 
     print("\n" + "=" * 60)
     print("🎉 全処理完了！")
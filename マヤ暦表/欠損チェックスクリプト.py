@@ -1,59 +1,308 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-統合CSVファイルの欠損データをチェックするスクリプト
+マヤ暦表の検証スクリプト（欠損・連続性・フォルダ名）
+
+年別CSV（{年}年_*/{年}年_Kin換算表.csv）をプロセスプールで並列に1回ずつ読み、次を検証する。
+- 各月の日数どおりにKin番号が入っているか（欠損・存在しない日への記入・不正な値）
+- Kin番号が1日ごとに +1（260の次は1）で連続しているか（月・年の境目を含む）
+- フォルダ名が 52年周期の {年}年_{年-52}年_{年+52}年 になっているか
+- 統合CSV（全年代統合_Kin換算表.csv）が年別CSVと同じ日付・Kin番号を持つか
+  （Kin番号が空欄の行・数値でない行は行番号つきで報告する）
+
+結果はJSONのレポートとして出力する（問題があれば終了コード1）。
+
+使い方:
+    python 欠損チェックスクリプト.py [マヤ暦表のフォルダ] [--output レポート.json] [--workers N]
 """
 
-import csv
+import argparse
 import calendar
+import csv
+import json
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import date, timedelta
 
-# 統合CSVファイルのパス
-CSV_FILE = Path("/Users/matsumototoshihiko/div/算命学とマヤ暦コンサルシステム/マヤ暦表/マヤ暦表すべて換算表/全年代統合_Kin換算表.csv")
+import numpy as np
+
+DEFAULT_BASE_DIR = Path(__file__).resolve().parent
+INTEGRATED_CSV = Path("マヤ暦表すべて換算表") / "全年代統合_Kin換算表.csv"
+
+# 52年周期（フォルダ名の対応年）
+CYCLE_YEARS = 52
+
+HEADER = ["日", "1月", "2月", "3月", "4月", "5月", "6月", "7月", "8月", "9月", "10月", "11月", "12月"]
+
+YEAR_FOLDER_PATTERN = re.compile(r"^(\d{4})年_")
+
+# 1ファイルあたりに報告する問題の最大件数
+MAX_ERRORS_PER_FILE = 50
+
+# 空欄・数値でないセル
+EMPTY = 0
+INVALID = -1
 
-def check_missing_dates():
-    """統合CSVファイル内の欠損日付をチェック"""
 
-    # CSVファイルからデータを読み込む
-    existing_dates = set()
+def folder_name(year):
+    """年のフォルダ名（52年周期の対応年を含む）"""
+    return f"{year}年_{year - CYCLE_YEARS}年_{year + CYCLE_YEARS}年"
 
-    with open(CSV_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+
+def expected_cells(year):
+    """存在する日のマスク (31, 12)"""
+    days = np.array([calendar.monthrange(year, month)[1] for month in range(1, 13)])
+    return np.arange(1, 32)[:, None] <= days[None, :]
+
+
+def read_grid(csv_file):
+    """
+    年別CSVを (31, 12) の配列として読み込む
+
+    Returns:
+        tuple: (Kin番号の配列（空欄は0、数値でない・範囲外は-1）, ヘッダー, 32日目以降などの余分な行数)
+    """
+    grid = np.zeros((31, 12), dtype=np.int64)
+    extra_rows = 0
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
         for row in reader:
-            year = int(row['年'])
-            month = int(row['月'])
-            day = int(row['日'])
-            existing_dates.add((year, month, day))
+            if not row:
+                continue
+            if not row[0].strip().isdigit() or not 1 <= int(row[0]) <= 31:
+                extra_rows += 1
+                continue
+            day = int(row[0])
+            for month, value in enumerate(row[1:13]):
+                value = value.strip()
+                if not value:
+                    continue
+                grid[day - 1, month] = int(value) if value.isdigit() and 1 <= int(value) <= 260 else INVALID
+    return grid, header, extra_rows
+
+
+def validate_year(year, folder):
+    """
+    1年分のフォルダを検証（プロセスプールで実行）
+
+    Returns:
+        dict: {"year", "folder", "errors": [...], "kin": 日付順のKin番号（欠損は0）}
+    """
+    errors = []
+    if folder.name != folder_name(year):
+        errors.append({"type": "folder_name", "expected": folder_name(year), "actual": folder.name})
+
+    csv_file = folder / f"{year}年_Kin換算表.csv"
+    if not csv_file.exists():
+        errors.append({"type": "missing_file", "path": csv_file.name})
+        return {"year": year, "folder": folder.name, "errors": errors, "kin": None}
+
+    grid, header, extra_rows = read_grid(csv_file)
+    if header != HEADER:
+        errors.append({"type": "header", "expected": HEADER, "actual": header})
+    if extra_rows:
+        errors.append({"type": "extra_rows", "count": extra_rows})
+
+    mask = expected_cells(year)
+    for kind, cells in (
+        ("missing_cell", mask & (grid == EMPTY)),
+        ("invalid_kin", mask & (grid == INVALID)),
+        ("nonexistent_date", ~mask & (grid != EMPTY)),
+    ):
+        for day, month in zip(*np.nonzero(cells)):
+            errors.append({"type": kind, "date": f"{year}-{month + 1:02d}-{day + 1:02d}"})
+
+    # 日付順（月ごとに1日から）に並べて、前日 +1 になっているか
+    kin = grid.T[mask.T]
+    dates = [(month + 1, day + 1) for month, day in zip(*np.nonzero(mask.T))]
+    broken = np.flatnonzero((kin[1:] > 0) & (kin[:-1] > 0) & (kin[1:] != kin[:-1] % 260 + 1))
+    for i in broken:
+        month, day = dates[i + 1]
+        errors.append({"type": "discontinuity", "date": f"{year}-{month:02d}-{day:02d}",
+                       "expected": int(kin[i] % 260 + 1), "actual": int(kin[i + 1])})
+
+    return {"year": year, "folder": folder.name, "errors": errors, "kin": kin.tolist()}
+
+
+def _format_key(key):
+    """年月日のキー（年 * 10000 + 月 * 100 + 日）を YYYY-MM-DD にする"""
+    return f"{key // 10000}-{key // 100 % 100:02d}-{key % 100:02d}"
+
+
+def read_integrated(path):
+    """
+    統合CSV（年,月,日,Kin）を列ごとの配列として読み込む
+
+    Returns:
+        tuple: (年月日のキー, Kin番号（空欄は0）, ファイル上の行番号, 問題のリスト)
+        年月日が数値でない・列が足りない・Kin番号が数値でない行は配列に含めず invalid_row とし、
+        Kin番号が空欄の行は0として含めて missing_kin とする
+    """
+    keys, kin, row_numbers, errors = [], [], [], []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # ヘッダー行
+        for row_number, row in enumerate(reader, 2):
+            if not row:
+                continue
+            cells = [cell.strip() for cell in row]
+            if len(cells) < 4 or not all(cell.isdigit() for cell in cells[:3]) \
+                    or not (cells[3].isdigit() or not cells[3]):
+                errors.append({"type": "invalid_row", "row": row_number, "values": row})
+                continue
+            if not cells[3]:
+                errors.append({"type": "missing_kin", "row": row_number,
+                               "date": f"{cells[0]}-{int(cells[1]):02d}-{int(cells[2]):02d}"})
+            year, month, day = (int(cell) for cell in cells[:3])
+            keys.append(year * 10000 + month * 100 + day)
+            kin.append(int(cells[3]) if cells[3] else EMPTY)
+            row_numbers.append(row_number)
+    return (np.array(keys, dtype=np.int64), np.array(kin, dtype=np.int64),
+            np.array(row_numbers, dtype=np.int64), errors)
+
+
+def validate_integrated(path, year_results):
+    """
+    統合CSVを年別CSVと日付で照合
+
+    Returns:
+        dict: {"path", "rows", "errors": [...]}
+    """
+    if not path.exists():
+        return {"path": str(path), "rows": 0, "errors": [{"type": "missing_file"}]}
+
+    keys, kin, row_numbers, row_errors = read_integrated(path)
+
+    # 年別CSVの日付とKin番号（欠損・不正なセルは年別CSVの問題として報告済みのため除く）
+    expected_keys = []
+    expected_kin = []
+    for result in year_results:
+        if result["kin"] is None:
+            continue
+        months, days = np.nonzero(expected_cells(result["year"]).T)
+        expected_keys.append(result["year"] * 10000 + (months + 1) * 100 + days + 1)
+        expected_kin.append(np.array(result["kin"], dtype=np.int64))
+    expected_keys = np.concatenate(expected_keys) if expected_keys else np.empty(0, dtype=np.int64)
+    expected_kin = np.concatenate(expected_kin) if expected_kin else np.empty(0, dtype=np.int64)
+    filled = expected_kin > 0
+
+    errors = row_errors[:MAX_ERRORS_PER_FILE]
+    if len(row_errors) > MAX_ERRORS_PER_FILE:
+        errors.append({"type": "truncated", "kind": "row", "count": len(row_errors) - MAX_ERRORS_PER_FILE})
+    if len(keys) > 1 and (np.diff(keys) <= 0).any():
+        errors.append({"type": "unsorted_or_duplicate",
+                       "row": int(row_numbers[np.flatnonzero(np.diff(keys) <= 0)[0] + 1])})
+
+    # Kin番号が空欄の行は missing_kin として報告済みのため照合から除く
+    common, rows, expected_rows = np.intersect1d(keys, expected_keys[filled], return_indices=True)
+    different = np.flatnonzero((kin[rows] != expected_kin[filled][expected_rows]) & (kin[rows] != EMPTY))
+    problems = [
+        ("missing_row", np.setdiff1d(expected_keys, keys), None),
+        ("extra_row", np.setdiff1d(keys, expected_keys), None),
+        ("kin_mismatch", common[different], different),
+    ]
+    for kind, found, indices in problems:
+        for n, key in enumerate(found[:MAX_ERRORS_PER_FILE].tolist()):
+            error = {"type": kind, "date": _format_key(key)}
+            if indices is not None:
+                i = indices[n]
+                error.update(expected=int(expected_kin[filled][expected_rows[i]]), actual=int(kin[rows[i]]))
+            errors.append(error)
+        if len(found) > MAX_ERRORS_PER_FILE:
+            errors.append({"type": "truncated", "kind": kind, "count": len(found) - MAX_ERRORS_PER_FILE})
+
+    return {"path": str(path), "rows": len(keys) + sum(e["type"] == "invalid_row" for e in row_errors),
+            "errors": errors}
+
+
+def validate(base_dir, workers=None):
+    """
+    マヤ暦表のフォルダ全体を検証
+
+    Args:
+        base_dir: マヤ暦表のフォルダ
+        workers: 並列に検証するプロセス数（省略時はCPU数）
+
+    Returns:
+        dict: JSONレポート
+    """
+    folders = {}
+    duplicates = []
+    for folder in sorted(base_dir.iterdir()):
+        match = YEAR_FOLDER_PATTERN.match(folder.name)
+        if match and folder.is_dir():
+            year = int(match.group(1))
+            if year in folders:
+                duplicates.append({"type": "duplicate_year", "year": year, "folder": folder.name})
+            else:
+                folders[year] = folder
+
+    years = sorted(folders)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        year_results = list(executor.map(validate_year, years, [folders[y] for y in years],
+                                         chunksize=max(1, len(years) // 8)))
+
+    # 年の境目（12月31日 → 翌年1月1日）の連続性と、欠けている年
+    boundaries = []
+    for previous, current in zip(year_results, year_results[1:]):
+        if current["year"] != previous["year"] + 1:
+            boundaries.append({"type": "missing_years",
+                               "years": list(range(previous["year"] + 1, current["year"]))})
+        elif previous["kin"] and current["kin"] and previous["kin"][-1] > 0 and current["kin"][0] > 0:
+            expected = previous["kin"][-1] % 260 + 1
+            if current["kin"][0] != expected:
+                boundaries.append({"type": "discontinuity", "date": f"{current['year']}-01-01",
+                                   "expected": expected, "actual": current["kin"][0]})
+
+    integrated = validate_integrated(base_dir / INTEGRATED_CSV, year_results)
 
-    print("=" * 60)
-    print("欠損データチェック")
-    print("=" * 60)
+    files = []
+    for result in year_results:
+        errors = result["errors"]
+        files.append({
+            "year": result["year"],
+            "folder": result["folder"],
+            "ok": not errors,
+            "error_count": len(errors),
+            "errors": errors[:MAX_ERRORS_PER_FILE],
+        })
 
-    missing_count = 0
+    error_count = (sum(f["error_count"] for f in files) + len(duplicates)
+                   + len(boundaries) + len(integrated["errors"]))
+    return {
+        "ok": error_count == 0,
+        "base_dir": str(base_dir),
+        "years": {"start": years[0] if years else None, "end": years[-1] if years else None,
+                  "count": len(years)},
+        "error_count": error_count,
+        "duplicates": duplicates,
+        "boundaries": boundaries,
+        "files": files,
+        "integrated": integrated,
+    }
 
-    # 1962年から2013年まで各日をチェック
-    for year in range(1962, 2014):
-        missing_days = []
 
-        for month in range(1, 13):
-            days_in_month = calendar.monthrange(year, month)[1]
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="マヤ暦表の欠損・連続性・フォルダ名を検証する")
+    parser.add_argument('base_dir', nargs='?', type=Path, default=DEFAULT_BASE_DIR,
+                        help="マヤ暦表のフォルダ（既定: このスクリプトのあるフォルダ）")
+    parser.add_argument('--output', type=Path, default=None, help="レポートの出力先（既定: 標準出力）")
+    parser.add_argument('--workers', type=int, default=None, help="並列に検証するプロセス数")
+    args = parser.parse_args()
 
-            for day in range(1, days_in_month + 1):
-                if (year, month, day) not in existing_dates:
-                    missing_days.append(f"{year}/{month}/{day}")
-                    missing_count += 1
+    report = validate(args.base_dir, workers=args.workers)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding='utf-8')
+        print(f"検証結果: {'OK' if report['ok'] else 'NG'}（問題: {report['error_count']}件）→ {args.output}")
+    else:
+        print(text)
 
-        if missing_days:
-            print(f"\n{year}年 ({len(missing_days)}日欠損):")
-            for missing_day in missing_days[:10]:  # 最初の10個のみ表示
-                print(f"  - {missing_day}")
-            if len(missing_days) > 10:
-                print(f"  ... 他 {len(missing_days) - 10}日")
+    sys.exit(0 if report["ok"] else 1)
 
-    print("\n" + "=" * 60)
-    print(f"総欠損日数: {missing_count}日")
-    print("=" * 60)
 
 if __name__ == "__main__":
-    check_missing_dates()
+    main()
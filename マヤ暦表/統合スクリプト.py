@@ -1,148 +1,244 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-マヤ暦表の全52年分のCSVファイルを1つに統合するスクリプト
+マヤ暦表の年別CSVファイルを1つに統合するスクリプト
+
+- 年別CSV（{年}年_*/{年}年_Kin換算表.csv）をプロセスプールで並列に読み込み、
+  年ごとに日付順の中間ファイル（キャッシュ）に書き出す
+- 年別CSVの内容のハッシュをマニフェストに記録し、再実行時は変更された年だけを読み直す
+- 年ごとの中間ファイルを heapq.merge で日付順に併合しながら統合CSVに書き出す
+  （全データをメモリに保持しない）
+
+使い方:
+    python 統合スクリプト.py [マヤ暦表のフォルダ] [--output 統合CSV] [--workers N] [--full]
 """
 
-import os
-import csv
+import argparse
 import calendar
+import csv
+import hashlib
+import heapq
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-# 基本パス設定
-BASE_DIR = Path("/Users/matsumototoshihiko/div/算命学とマヤ暦コンサルシステム/マヤ暦表")
-OUTPUT_DIR = BASE_DIR / "マヤ暦表すべて換算表"
-OUTPUT_FILE = OUTPUT_DIR / "全年代統合_Kin換算表.csv"
+# 既定のパス（このスクリプトのあるフォルダ）
+DEFAULT_BASE_DIR = Path(__file__).resolve().parent
+OUTPUT_DIR_NAME = "マヤ暦表すべて換算表"
+OUTPUT_FILE_NAME = "全年代統合_Kin換算表.csv"
+
+# 年ごとの中間ファイルとマニフェスト（統合CSVと同じフォルダ）
+CACHE_DIR_NAME = ".cache"
+MANIFEST_FILE_NAME = "manifest.json"
+
+# 中間ファイルの形式を変えたら上げる（マニフェストの全エントリを無効にする）
+CACHE_VERSION = 1
+
+HEADER = ['年', '月', '日', 'Kin']
+
+YEAR_FOLDER_PATTERN = re.compile(r"^(\d{4})年_")
 
-# 出力ディレクトリが存在しない場合は作成
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-def get_days_in_month(year, month):
-    """指定された年月の日数を返す"""
-    return calendar.monthrange(year, month)[1]
+def file_sha256(path):
+    """ファイル内容のSHA-256（16進）"""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
 
-def process_year_csv(year):
+
+def find_year_files(base_dir):
     """
-    指定された年のCSVファイルを読み込み、データを返す
+    年別CSVを探す
 
     Returns:
-        list: [(年, 月, 日, Kin番号), ...] の形式のリスト
+        dict: {年: CSVのパス}（同じ年のフォルダが複数ある場合は名前順で最初のもの）
     """
-    # フォルダ名のパターンを探す
-    folder_pattern = f"{year}年_"
-    folders = [f for f in os.listdir(BASE_DIR) if f.startswith(folder_pattern) and os.path.isdir(BASE_DIR / f)]
-
-    if not folders:
-        print(f"警告: {year}年のフォルダが見つかりません")
-        return []
-
-    folder_name = folders[0]
-    csv_file = BASE_DIR / folder_name / f"{year}年_Kin換算表.csv"
+    year_files = {}
+    for folder in sorted(base_dir.iterdir()):
+        match = YEAR_FOLDER_PATTERN.match(folder.name)
+        if not match or not folder.is_dir():
+            continue
+
+        year = int(match.group(1))
+        csv_file = folder / f"{year}年_Kin換算表.csv"
+        if not csv_file.exists():
+            print(f"警告: {csv_file} が見つかりません")
+        elif year in year_files:
+            print(f"警告: {year}年のフォルダが複数あります（{year_files[year].parent.name} を使用）")
+        else:
+            year_files[year] = csv_file
+    return year_files
+
+
+def process_year_csv(year, csv_file, part_file):
+    """
+    年別CSVを読み込み、日付順の中間ファイルに書き出す（プロセスプールで実行）
 
-    if not csv_file.exists():
-        print(f"警告: {csv_file} が見つかりません")
-        return []
+    Returns:
+        tuple: (年, 行数, 警告メッセージのリスト)
+    """
+    warnings = []
+    rows = []
 
-    data = []
+    with open(csv_file, 'r', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # ヘッダー行（日,1月,2月,...,12月）をスキップ
 
-    try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            header = next(reader)  # ヘッダー行をスキップ
+        for row in reader:
+            if not row or len(row) < 2:  # 空行または不完全な行をスキップ
+                continue
 
-            # ヘッダーから月の順番を確認（1月,2月,...,12月）
-            # ヘッダー形式: "日,1月,2月,3月,4月,5月,6月,7月,8月,9月,10月,11月,12月"
-            months = header[1:]  # "日"を除く
+            day = int(row[0])
+            for month in range(1, min(len(row), 13)):
+                kin_value = row[month].strip()
+                if not kin_value:  # 空のセルをスキップ
+                    continue
 
-            # 各行を処理
-            for row in reader:
-                if not row or len(row) < 2:  # 空行または不完全な行をスキップ
+                # その月に存在しない日はスキップ
+                if day > calendar.monthrange(year, month)[1]:
                     continue
 
-                day = int(row[0])  # 日
+                try:
+                    rows.append((month, day, int(kin_value)))
+                except ValueError:
+                    warnings.append(f"無効なKin番号 '{kin_value}' at {year}/{month}/{day}")
 
-                # 各月のKin番号を処理（最大12ヶ月まで）
-                for month_idx in range(1, 13):  # 1月から12月まで
-                    if month_idx >= len(row):  # 列が足りない場合はスキップ
-                        break
+    rows.sort()
+    tmp_file = part_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        for month, day, kin in rows:
+            writer.writerow((year, month, day, kin))
+    os.replace(tmp_file, part_file)
 
-                    kin_value = row[month_idx]
-                    if not kin_value.strip():  # 空のセルをスキップ
-                        continue
+    return year, len(rows), warnings
 
-                    # その月に存在する日かチェック
-                    max_day = get_days_in_month(year, month_idx)
-                    if day > max_day:
-                        continue
 
-                    try:
-                        kin_number = int(kin_value)
-                        data.append((year, month_idx, day, kin_number))
-                    except ValueError:
-                        print(f"警告: 無効なKin番号 '{kin_value}' at {year}/{month_idx}/{day}")
-                        continue
+def read_part(part_file):
+    """中間ファイルの行を ((年, 月, 日), 行) として順に返す"""
+    with open(part_file, 'r', encoding='utf-8', newline='') as f:
+        for line in f:
+            year, month, day, _ = line.split(',', 3)
+            yield (int(year), int(month), int(day)), line
 
-        print(f"{year}年: {len(data)}件のデータを処理しました")
 
-    except Exception as e:
-        print(f"エラー: {csv_file} の処理中にエラーが発生しました: {e}")
-        return []
+def load_manifest(path):
+    """マニフェストを読み込む（存在しない・形式が違う場合は空）"""
+    try:
+        manifest = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != CACHE_VERSION:
+        return {}
+    return manifest.get('years', {})
 
-    return data
 
-def main():
-    """メイン処理"""
-    print("=" * 60)
-    print("マヤ暦表統合スクリプト開始")
-    print("=" * 60)
+def merge(base_dir, output_file, workers=None, full=False):
+    """
+    年別CSVを統合CSVに書き出す
 
-    all_data = []
+    Args:
+        base_dir: マヤ暦表のフォルダ
+        output_file: 統合CSVのパス
+        workers: 並列に読み込むプロセス数（省略時はCPU数）
+        full: キャッシュを使わず全ての年を読み直すか
 
-    # 1962年から2013年まで処理
-    for year in range(1962, 2014):
-        year_data = process_year_csv(year)
-        all_data.extend(year_data)
+    Returns:
+        dict: {年: データ行数}
+    """
+    cache_dir = output_file.parent / CACHE_DIR_NAME
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file = cache_dir / MANIFEST_FILE_NAME
+
+    year_files = find_year_files(base_dir)
+    cached = {} if full else load_manifest(manifest_file)
+
+    # 内容のハッシュが変わった年（と中間ファイルがない年）だけを読み直す
+    manifest = {}
+    changed = []
+    for year, csv_file in sorted(year_files.items()):
+        digest = file_sha256(csv_file)
+        entry = cached.get(str(year))
+        part_file = cache_dir / f"{year}.csv"
+        if entry and entry['sha256'] == digest and part_file.exists():
+            manifest[str(year)] = entry
+        else:
+            manifest[str(year)] = {'source': str(csv_file.relative_to(base_dir)), 'sha256': digest}
+            changed.append(year)
+
+    if changed:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(process_year_csv, year, year_files[year], cache_dir / f"{year}.csv")
+                for year in changed
+            ]
+            for future in futures:
+                year, count, warnings = future.result()
+                manifest[str(year)]['rows'] = count
+                for warning in warnings:
+                    print(f"警告: {warning}")
+                print(f"{year}年: {count}件のデータを処理しました")
+
+    print(f"変更された年: {len(changed)}年 / キャッシュを使用: {len(year_files) - len(changed)}年")
+
+    # 年ごとの中間ファイルを日付順に併合しながら書き出す
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = output_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerow(HEADER)
+        parts = [read_part(cache_dir / f"{year}.csv") for year in sorted(year_files)]
+        for _, line in heapq.merge(*parts, key=lambda item: item[0]):
+            f.write(line)
+    os.replace(tmp_file, output_file)
+
+    # 読み込み元から消えた年の中間ファイルを削除
+    for part_file in cache_dir.glob("*.csv"):
+        if part_file.stem not in manifest:
+            part_file.unlink()
+
+    manifest_file.write_text(
+        json.dumps({'version': CACHE_VERSION, 'years': manifest}, ensure_ascii=False, indent=2),
+        encoding='utf-8'
+    )
+
+    return {int(year): entry['rows'] for year, entry in manifest.items()}
 
-    # データを年月日順にソート
-    all_data.sort(key=lambda x: (x[0], x[1], x[2]))
 
-    # CSVファイルに書き込み
-    print(f"\n統合CSVファイルを作成中: {OUTPUT_FILE}")
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="マヤ暦表の年別CSVを1つの統合CSVにまとめる")
+    parser.add_argument('base_dir', nargs='?', type=Path, default=DEFAULT_BASE_DIR,
+                        help="マヤ暦表のフォルダ（既定: このスクリプトのあるフォルダ）")
+    parser.add_argument('--output', type=Path, default=None,
+                        help=f"統合CSVのパス（既定: <フォルダ>/{OUTPUT_DIR_NAME}/{OUTPUT_FILE_NAME}）")
+    parser.add_argument('--workers', type=int, default=None, help="並列に読み込むプロセス数")
+    parser.add_argument('--full', action='store_true', help="キャッシュを使わず全ての年を読み直す")
+    args = parser.parse_args()
 
-    with open(OUTPUT_FILE, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.writer(f)
+    output_file = args.output or args.base_dir / OUTPUT_DIR_NAME / OUTPUT_FILE_NAME
 
-        # ヘッダー行
-        writer.writerow(['年', '月', '日', 'Kin番号'])
+    print("=" * 60)
+    print("マヤ暦表統合スクリプト開始")
+    print("=" * 60)
 
-        # データ行
-        for row in all_data:
-            writer.writerow(row)
+    year_counts = merge(args.base_dir, output_file, workers=args.workers, full=args.full)
+    total = sum(year_counts.values())
 
     # 統計情報を出力
     print("\n" + "=" * 60)
     print("統合完了！")
     print("=" * 60)
-    print(f"出力ファイル: {OUTPUT_FILE}")
-    print(f"総行数: {len(all_data) + 1}行（ヘッダー含む）")
-    print(f"データ行数: {len(all_data)}行")
-
-    if all_data:
-        first_date = all_data[0]
-        last_date = all_data[-1]
-        print(f"データ範囲: {first_date[0]}/{first_date[1]}/{first_date[2]} (Kin {first_date[3]}) ～ {last_date[0]}/{last_date[1]}/{last_date[2]} (Kin {last_date[3]})")
-
-        # 年ごとのデータ数を確認
-        year_counts = {}
-        for year, month, day, kin in all_data:
-            year_counts[year] = year_counts.get(year, 0) + 1
+    print(f"出力ファイル: {output_file}")
+    print(f"総行数: {total + 1}行（ヘッダー含む）")
+    print(f"データ行数: {total}行")
 
+    if year_counts:
         print(f"\n年数: {len(year_counts)}年分")
-        print(f"対象年: {min(year_counts.keys())}年 ～ {max(year_counts.keys())}年")
+        print(f"対象年: {min(year_counts)}年 ～ {max(year_counts)}年")
 
         # 異常なデータがないかチェック
         print("\n各年のデータ数:")
-        for year in sorted(year_counts.keys()):
+        for year in sorted(year_counts):
             expected_days = 366 if calendar.isleap(year) else 365
             actual_days = year_counts[year]
             status = "OK" if actual_days == expected_days else f"注意 (期待値: {expected_days})"
@@ -150,5 +246,6 @@ def main():
 
     print("\n処理完了！")
 
+
 if __name__ == "__main__":
     main()